@@ -1,12 +1,36 @@
 from django.contrib import admin
 from .models import CV, Experience, Education, Skill, Project, Certification, Achievement, Reference
+from .snapshots import refresh_snapshot, refresh_snapshots
+
+# Admin changes go through these so the CV snapshot stays in sync
+# (the admin already wraps each change in a transaction)
+
+class CVAdmin(admin.ModelAdmin):
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        refresh_snapshot(form.instance.pk)
+
+class SectionAdmin(admin.ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        previous_cv_id = form.initial.get('cv')
+        super().save_model(request, obj, form, change)
+        refresh_snapshots({obj.cv_id, previous_cv_id} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_snapshot(obj.cv_id)
+
+    def delete_queryset(self, request, queryset):
+        cv_ids = set(queryset.values_list('cv_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_snapshots(cv_ids)
 
 # Register all models
-admin.site.register(CV)
-admin.site.register(Experience)
-admin.site.register(Education)
-admin.site.register(Skill)
-admin.site.register(Project)
-admin.site.register(Certification)
-admin.site.register(Achievement)
-admin.site.register(Reference)
\ No newline at end of file
+admin.site.register(CV, CVAdmin)
+admin.site.register(Experience, SectionAdmin)
+admin.site.register(Education, SectionAdmin)
+admin.site.register(Skill, SectionAdmin)
+admin.site.register(Project, SectionAdmin)
+admin.site.register(Certification, SectionAdmin)
+admin.site.register(Achievement, SectionAdmin)
+admin.site.register(Reference, SectionAdmin)
@@ -0,0 +1,339 @@
+"""
+Admission control for expensive endpoints.
+
+Each (user, endpoint) pair listed in ADMISSION_RATE_LIMITS gets a token
+bucket: a burst of requests is allowed, after which requests are admitted at
+the refill rate. PDF builds done inside a request additionally need one of
+PDF_BUILD_CONCURRENCY build slots; a few requests may wait briefly for a
+slot, the rest are turned away at once. Rejected requests get a 429 with a
+Retry-After header.
+
+State lives in process memory by default. Setting ADMISSION_SHARED_PATH to a
+local SQLite file makes every worker process on the host share the same
+buckets and build slots.
+"""
+import asyncio
+import functools
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+# How often a request waiting for a build slot checks for a free one
+SLOT_POLL_INTERVAL = 0.02
+
+# Slots held longer than this are assumed to belong to a stuck request
+SLOT_MAX_HOLD = 300
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f'Retry after {retry_after:.1f}s')
+        self.retry_after = retry_after
+
+
+class MemoryBackend:
+    """Buckets and slots shared by the threads of this process."""
+
+    path = None
+    blocking = False
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (tokens, updated, time the bucket is full again)
+        self.buckets = {}
+        # slot name -> holders
+        self.slots = {}
+
+    def take(self, key, burst, rate, now):
+        """Take a token; returns 0 on success, else seconds until one is available."""
+        with self.lock:
+            if len(self.buckets) > 10000:
+                # A bucket that has refilled is the same as no bucket
+                self.buckets = {k: v for k, v in self.buckets.items() if v[2] > now}
+            tokens, updated, _ = self.buckets.get(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            self.buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            return wait
+
+    def try_acquire(self, name, limit):
+        """Claim a slot without waiting; returns a holder id or None."""
+        with self.lock:
+            holders = self.slots.setdefault(name, set())
+            if len(holders) >= limit:
+                return None
+            holder = uuid.uuid4().hex
+            holders.add(holder)
+            return holder
+
+    def release(self, name, holder):
+        with self.lock:
+            self.slots.get(name, set()).discard(holder)
+
+
+class SQLiteBackend:
+    """
+    Buckets and slots in a SQLite file, shared by every process on the host.
+    Slots of processes that died are reclaimed by the next acquirer.
+    """
+
+    blocking = True
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS bucket (
+            key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS slot (
+            holder TEXT PRIMARY KEY, name TEXT NOT NULL, pid INTEGER NOT NULL, acquired REAL NOT NULL
+        );
+    '''
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # The state is disposable, losing the last writes on power loss is fine
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.executescript(self.SCHEMA)
+            self.local.connection = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def take(self, key, burst, rate, now):
+        with self.transaction() as conn:
+            if random.random() < 0.01:
+                conn.execute('DELETE FROM bucket WHERE full_at <= ?', (now,))
+            row = conn.execute('SELECT tokens, updated FROM bucket WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row or (burst, now)
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            conn.execute(
+                'INSERT OR REPLACE INTO bucket (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                (key, tokens, now, now + (burst - tokens) / rate),
+            )
+            return wait
+
+    def try_acquire(self, name, limit):
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM slot WHERE acquired < ?', (now - SLOT_MAX_HOLD,))
+            pids = [pid for (pid,) in conn.execute('SELECT DISTINCT pid FROM slot WHERE name = ?', (name,))]
+            dead = [pid for pid in pids if not _pid_alive(pid)]
+            if dead:
+                conn.executemany('DELETE FROM slot WHERE pid = ?', [(pid,) for pid in dead])
+
+            (used,) = conn.execute('SELECT COUNT(*) FROM slot WHERE name = ?', (name,)).fetchone()
+            if used >= limit:
+                return None
+            holder = uuid.uuid4().hex
+            conn.execute(
+                'INSERT INTO slot (holder, name, pid, acquired) VALUES (?, ?, ?, ?)',
+                (holder, name, os.getpid(), now),
+            )
+            return holder
+
+    def release(self, name, holder):
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM slot WHERE holder = ?', (holder,))
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else
+        return True
+    return True
+
+
+_backend = None
+_backend_lock = threading.Lock()
+# Requests of this process waiting for a PDF build slot
+_waiting = 0
+
+
+def backend():
+    global _backend
+    path = getattr(settings, 'ADMISSION_SHARED_PATH', None)
+    path = str(path) if path else None
+    with _backend_lock:
+        if _backend is None or _backend.path != path:
+            _backend = SQLiteBackend(path) if path else MemoryBackend()
+        return _backend
+
+
+def reset():
+    """Forget every bucket and slot of the in-process backend."""
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def rate_limit(endpoint):
+    """The (burst, rate) limit of an endpoint, or None when it is unlimited."""
+    limit = getattr(settings, 'ADMISSION_RATE_LIMITS', {}).get(endpoint)
+    if not limit:
+        return None
+    return limit['burst'], limit['rate']
+
+
+def build_concurrency():
+    return getattr(settings, 'PDF_BUILD_CONCURRENCY', 2)
+
+
+def build_queue_size():
+    return getattr(settings, 'PDF_BUILD_QUEUE_SIZE', 4)
+
+
+def build_queue_timeout():
+    return getattr(settings, 'PDF_BUILD_QUEUE_TIMEOUT', 2.0)
+
+
+def check_rate(user_id, endpoint):
+    """Charge one request to the user's bucket; raises Overloaded when it is empty."""
+    limit = rate_limit(endpoint)
+    if limit is None:
+        return
+    burst, rate = limit
+    wait = backend().take(f'{endpoint}:{user_id}', burst, rate, time.time())
+    if wait:
+        raise Overloaded(wait)
+
+
+def too_many_requests(retry_after, message='Too many requests, please try again shortly.'):
+    response = JsonResponse({'error': message}, status=429)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limited(endpoint):
+    """
+    View decorator applying the endpoint's rate limit per user. Goes under
+    @login_required so the user is known.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @functools.wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                user = await request.auser()
+                try:
+                    if backend().blocking:
+                        await asyncio.to_thread(check_rate, user.id, endpoint)
+                    else:
+                        check_rate(user.id, endpoint)
+                except Overloaded as exc:
+                    return too_many_requests(exc.retry_after)
+                return await view_func(request, *args, **kwargs)
+        else:
+            @functools.wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                try:
+                    check_rate(request.user.id, endpoint)
+                except Overloaded as exc:
+                    return too_many_requests(exc.retry_after)
+                return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _join_build_queue():
+    global _waiting
+    with _backend_lock:
+        if _waiting >= build_queue_size():
+            raise Overloaded(build_queue_timeout())
+        _waiting += 1
+
+
+def _leave_build_queue():
+    global _waiting
+    with _backend_lock:
+        _waiting -= 1
+
+
+@contextmanager
+def pdf_build_slot():
+    """
+    Hold one of the PDF_BUILD_CONCURRENCY build slots for the enclosed block.
+    Waits up to PDF_BUILD_QUEUE_TIMEOUT for a slot, unless PDF_BUILD_QUEUE_SIZE
+    requests of this process are already waiting; raises Overloaded otherwise.
+    """
+    slots = backend()
+    holder = slots.try_acquire('pdf_build', build_concurrency())
+    if holder is None:
+        _join_build_queue()
+        try:
+            deadline = time.monotonic() + build_queue_timeout()
+            while holder is None and time.monotonic() < deadline:
+                time.sleep(SLOT_POLL_INTERVAL)
+                holder = slots.try_acquire('pdf_build', build_concurrency())
+        finally:
+            _leave_build_queue()
+        if holder is None:
+            raise Overloaded(build_queue_timeout())
+    try:
+        yield
+    finally:
+        slots.release('pdf_build', holder)
+
+
+@asynccontextmanager
+async def apdf_build_slot():
+    """pdf_build_slot() for async views; waits without blocking the event loop."""
+    slots = backend()
+
+    async def try_acquire():
+        if slots.blocking:
+            return await asyncio.to_thread(slots.try_acquire, 'pdf_build', build_concurrency())
+        return slots.try_acquire('pdf_build', build_concurrency())
+
+    holder = await try_acquire()
+    if holder is None:
+        _join_build_queue()
+        try:
+            deadline = time.monotonic() + build_queue_timeout()
+            while holder is None and time.monotonic() < deadline:
+                await asyncio.sleep(SLOT_POLL_INTERVAL)
+                holder = await try_acquire()
+        finally:
+            _leave_build_queue()
+        if holder is None:
+            raise Overloaded(build_queue_timeout())
+    try:
+        yield
+    finally:
+        if slots.blocking:
+            await asyncio.to_thread(slots.release, 'pdf_build', holder)
+        else:
+            slots.release('pdf_build', holder)
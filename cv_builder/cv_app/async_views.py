@@ -0,0 +1,149 @@
+"""
+Native async versions of the busiest views, served instead of their views.py
+counterparts when ASYNC_VIEWS is on (the default under cv_builder/asgi.py).
+
+Reads go through the async ORM. Work that needs a transaction, and template
+rendering (which may load the session or the lazy request.user), runs on
+Django's sync thread. PDF renders are awaited on the bounded pdf_jobs pool so
+ReportLab never blocks the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, HttpResponseNotModified
+from django.shortcuts import redirect, render
+from django.utils.http import parse_etags
+
+from . import admission, autosave, instrumentation, listing, pdf_cache, pdf_jobs, template_registry
+from .cv_data import aload_cv_aggregate, cv_fingerprint, cv_to_dict
+from .models import CV
+from .snapshots import aload_cv_snapshot
+from .views import (
+    EDIT_CONFLICT_MESSAGE, cached_pdf_response, dashboard_context, pdf_bytes_response, pdf_file_response,
+    pdf_job_response, pdf_queue_full_response, render_preview, save_cv_from_post,
+)
+
+arender = sync_to_async(render)
+
+# User dashboard - protected, requires login
+@login_required
+async def dashboard(request):
+    try:
+        query = listing.CardQuery(request.GET)
+    except listing.InvalidQuery as exc:
+        return HttpResponseBadRequest(str(exc))
+    user = await request.auser()
+    recent = [cv async for cv in listing.summary(user)]
+    cvs = [cv async for cv in query.page(user)]
+    await template_registry.atemplates()
+    return await arender(request, 'cv_app/dashboard.html', dashboard_context(query, cvs, recent))
+
+# Dashboard cards - the next page of cards as an HTML fragment, for infinite scroll
+@login_required
+async def dashboard_cards(request):
+    try:
+        query = listing.CardQuery(request.GET)
+    except listing.InvalidQuery as exc:
+        return HttpResponseBadRequest(str(exc))
+    user = await request.auser()
+    recent = [cv async for cv in listing.summary(user)]
+    cvs = [cv async for cv in query.page(user)]
+    await template_registry.atemplates()
+    return await arender(request, 'cv_app/dashboard_cards.html', dashboard_context(query, cvs, recent))
+
+# Preview CV - protected, requires login
+@login_required
+async def preview_cv(request, cv_id):
+    user = await request.auser()
+    try:
+        cv = await aload_cv_snapshot(cv_id, user)
+    except CV.DoesNotExist:
+        messages.error(request, 'CV not found.')
+        return redirect('dashboard')
+
+    # Get template from URL parameter or use CV's template
+    template_id = request.GET.get('template')
+    template = template_registry.get(template_id) if template_id else None
+    if template is None:
+        template = cv.template
+
+    return await sync_to_async(render_preview)(request, cv, template)
+
+# Edit CV - protected, requires login
+@login_required
+async def edit_cv(request, cv_id):
+    user = await request.auser()
+    try:
+        aggregate = await aload_cv_aggregate(cv_id, user)
+    except CV.DoesNotExist:
+        return redirect('dashboard')
+    cv = aggregate.cv
+
+    if request.method == 'POST':
+        # The save runs in a transaction, which needs the sync thread
+        try:
+            await sync_to_async(save_cv_from_post)(cv, request.POST)
+        except autosave.Conflict:
+            messages.error(request, EDIT_CONFLICT_MESSAGE)
+            return redirect('edit_cv', cv_id=cv.id)
+        messages.success(request, 'CV updated successfully!')
+        return redirect('edit_cv', cv_id=cv.id)
+
+    context = {
+        'cv': aggregate,
+        'autosave_fields': autosave.form_fields(),
+    }
+    return await arender(request, 'cv_app/edit_cv.html', context)
+
+# Download CV as PDF - protected, requires login
+@login_required
+@admission.rate_limited('download_cv_pdf')
+async def download_cv_pdf(request, cv_id):
+    user = await request.auser()
+    try:
+        cv = await aload_cv_snapshot(cv_id, user)
+    except CV.DoesNotExist:
+        messages.error(request, 'CV not found.')
+        return redirect('dashboard')
+
+    # Fingerprint everything that goes into the PDF
+    data = cv_to_dict(cv)
+    fingerprint = cv_fingerprint(data)
+    etag = f'"{fingerprint}"'
+    filename = f'{cv.title.replace(" ", "_")}.pdf'
+
+    # The browser already has this exact PDF
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    # Only render when there is no cached copy of this content
+    response = cached_pdf_response(request, cv.id, fingerprint, filename, etag, asynchronous=True)
+    if response is not None:
+        return response
+
+    # Asynchronous mode: queue the render and let the client poll for it
+    wants_async = request.GET.get('async', '1' if settings.PDF_RENDER_ASYNC else '0') == '1'
+    if wants_async and pdf_jobs.async_enabled():
+        try:
+            job = pdf_jobs.submit(user.id, cv.id, fingerprint, filename, data)
+        except pdf_jobs.QueueFull:
+            return pdf_queue_full_response()
+        return pdf_job_response(job, status=202)
+
+    # Otherwise wait for the render on the worker pool, without blocking the event loop
+    try:
+        async with admission.apdf_build_slot():
+            with instrumentation.pdf_timer():
+                pdf_bytes = await pdf_jobs.render(data)
+    except admission.Overloaded as exc:
+        return pdf_queue_full_response(exc.retry_after)
+    except pdf_jobs.QueueFull:
+        return pdf_queue_full_response()
+    path = await sync_to_async(pdf_cache.put, thread_sensitive=False)(cv.id, fingerprint, pdf_bytes)
+    try:
+        return pdf_file_response(request, path, filename, etag, asynchronous=True)
+    except FileNotFoundError:
+        return pdf_bytes_response(pdf_bytes, filename, etag)
@@ -0,0 +1,149 @@
+"""
+Per-process cache of the users behind logged-in sessions.
+
+Django's AuthenticationMiddleware reads auth_user on every request that
+touches request.user. Sessions already come from the cache (the cached_db
+engine, see settings), so CachedAuthenticationMiddleware keeps recently seen
+users in memory too, keyed by user id, auth backend and the session's auth
+hash, for at most AUTH_USER_CACHE_TIMEOUT seconds.
+
+Logging out deletes the session, so its next request has no user to look up.
+Saving a user (a password change, deactivation) bumps a per-user token in the
+session cache; entries made under an older token are reloaded and verified by
+Django as usual, which logs out sessions whose auth hash no longer matches.
+Both only reach other processes through a cache they share, so the user cache
+is off, and a system check warns, when SESSION_CACHE_ALIAS is per-process.
+"""
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.functional import SimpleLazyObject
+
+TOKEN_KEY = 'auth_user:{}:token'
+
+# Session engines that serve sessions from SESSION_CACHE_ALIAS
+CACHED_SESSION_ENGINES = {
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+}
+
+_lock = threading.Lock()
+# (user id, backend, session auth hash) -> (user, token, expires at)
+_users = OrderedDict()
+
+
+def cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def shared():
+    """Whether what one process writes to the session cache is seen by the others."""
+    return not isinstance(cache(), (LocMemCache, DummyCache))
+
+
+def timeout():
+    return getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60)
+
+
+def max_entries():
+    return getattr(settings, 'AUTH_USER_CACHE_SIZE', 1000)
+
+
+def user_token(user_id):
+    key = TOKEN_KEY.format(user_id)
+    token = cache().get(key)
+    if token is None:
+        # Never set (or evicted): publish one, entries made under any earlier token are reloaded
+        cache().add(key, uuid.uuid4().hex, timeout=None)
+        token = cache().get(key)
+    return token
+
+
+def _entry_key(session):
+    user_id = session.get(auth.SESSION_KEY)
+    backend = session.get(auth.BACKEND_SESSION_KEY)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if user_id is None or not backend or not session_hash:
+        return None
+    return str(user_id), backend, session_hash
+
+
+def get_user(request):
+    """auth.get_user(request), from memory for recently seen sessions."""
+    key = _entry_key(request.session)
+    if key is None or timeout() <= 0 or not shared():
+        return auth.get_user(request)
+
+    # Read the token first, so a change made during the query is not cached as current
+    token = user_token(key[0])
+    now = time.monotonic()
+    with _lock:
+        entry = _users.get(key)
+        if entry is not None and entry[1] == token and entry[2] > now:
+            _users.move_to_end(key)
+            # A copy per request, so per-request state (permission caches) is not shared
+            return copy.copy(entry[0])
+
+    user = auth.get_user(request)
+    if user.is_authenticated and _entry_key(request.session) == key:
+        with _lock:
+            _users[key] = (copy.copy(user), token, now + timeout())
+            _users.move_to_end(key)
+            while len(_users) > max_entries():
+                _users.popitem(last=False)
+    return user
+
+
+def _request_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+async def _arequest_user(request):
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await sync_to_async(get_user)(request)
+    return request._acached_user
+
+
+def invalidate(user_id):
+    """Reload the user here and, via the shared token, in every other process."""
+    cache().set(TOKEN_KEY.format(user_id), uuid.uuid4().hex, timeout=None)
+
+
+def clear():
+    with _lock:
+        _users.clear()
+
+
+@checks.register(checks.Tags.caches)
+def check_session_cache(app_configs, **kwargs):
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES and isinstance(cache(), LocMemCache):
+        return [checks.Warning(
+            'SESSION_CACHE_ALIAS is a local-memory cache: a session logged out in one '
+            'process stays valid in the others, and the user cache is off.',
+            hint='Point SESSION_CACHE_ALIAS at a cache shared between processes, or use the db session engine.',
+            id='cv_app.W001',
+        )]
+    return []
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware with request.user and request.auser() served by get_user()."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(partial(_request_user, request))
+        request.auser = partial(_arequest_user, request)
@@ -0,0 +1,215 @@
+"""
+Field-level CV edits for the edit page's autosave.
+
+Each edit changes one part of a CV: some of its own fields, or one entry of a
+section (add, update, delete, or reorder the section). It costs one write to
+the section table and one conditional UPDATE of the CV row. The snapshot is
+patched from the stored one rather than rebuilt from the section tables, and
+the search row is only rewritten when searchable text changed.
+
+Edits are optimistic: each one names the CV version it is based on. Every save
+bumps CV.version (the full edit form too), and an edit based on an older
+version fails with Conflict, so two open tabs cannot overwrite each other.
+"""
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+from . import pdf_cache, search, template_registry
+from .cv_data import SECTION_RELATIONS, row_to_dict
+from .importing import clean_values, section_fields, section_model
+from .models import CV
+from .section_sync import SECTION_FORMS
+from .snapshots import SNAPSHOT_VERSION, build_snapshot
+
+# CV fields the edit page can change, besides the template
+CV_FIELDS = [
+    'title', 'full_name', 'email', 'phone', 'location', 'date_of_birth', 'gender', 'nationality',
+    'languages', 'marital_status', 'additional_info', 'professional_summary', 'linkedin_url', 'github_url',
+]
+
+# Fields a section entry cannot be saved without, as on the edit form
+REQUIRED_FIELDS = {section.relation: section.required for section in SECTION_FORMS}
+
+# Edit form inputs named differently from the CV field they set
+FORM_INPUTS = {'linkedin': 'linkedin_url', 'portfolio': 'github_url', 'cv_template': 'template'}
+
+
+class Conflict(Exception):
+    """The CV was saved since the version the edit is based on."""
+
+    def __init__(self, version):
+        super().__init__(f'The CV is at version {version}')
+        self.version = version
+
+
+class EditError(Exception):
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def form_fields():
+    """Which field each edit form input sets, for the edit page's autosave script."""
+    return {
+        'cv': {**{name: name for name in CV_FIELDS}, **FORM_INPUTS},
+        'sections': {
+            section.relation: {
+                'inputs': {input_name: field for field, input_name in section.fields.items()},
+                'required': section.required,
+            }
+            for section in SECTION_FORMS
+        },
+    }
+
+
+def current_sections(cv):
+    """{relation: [row dicts]} of a CV, from its snapshot when usable."""
+    snapshot = cv.snapshot
+    if snapshot and snapshot.get('version') == SNAPSHOT_VERSION:
+        return {relation: [dict(row) for row in snapshot[relation]] for relation in SECTION_RELATIONS}
+    prefetch_related_objects([cv], *SECTION_RELATIONS)
+    return {relation: [row_to_dict(obj) for obj in getattr(cv, relation).all()] for relation in SECTION_RELATIONS}
+
+
+def _find(rows, model, entry_id):
+    for row in rows:
+        if row['id'] == entry_id:
+            return row
+    raise model.DoesNotExist(f'No {model._meta.verbose_name} {entry_id} on this CV')
+
+
+def _clean(model, values, allowed, required, label):
+    if not isinstance(values, dict) or not values:
+        raise EditError(['Send the fields to change as a JSON object'])
+    unknown = sorted(set(values) - set(allowed))
+    if unknown:
+        raise EditError([f'{label}.{name}: unknown field' for name in unknown])
+    cleaned, errors = clean_values(model, values, required, label)
+    if errors:
+        raise EditError(errors)
+    return cleaned
+
+
+def apply_edit(cv_id, user, version, change):
+    """
+    Apply ``change(cv, sections)`` to one of the user's CVs in a transaction,
+    if the CV is still at ``version``. ``change`` writes to the section
+    tables, updates ``sections`` to match and returns (CV field updates,
+    result). Returns (cv, result); edits that change nothing save nothing.
+    Raises CV.DoesNotExist, Conflict and EditError.
+    """
+    with transaction.atomic():
+        cv = CV.objects.get(id=cv_id, user=user)
+        if cv.version != version:
+            raise Conflict(cv.version)
+
+        previous = cv.snapshot
+        sections = current_sections(cv)
+        updates, result = change(cv, sections)
+        for name, value in updates.items():
+            setattr(cv, name, value)
+        cv.snapshot = build_snapshot(cv, sections)
+        if cv.snapshot == previous:
+            return cv, result
+
+        cv.version = version + 1
+        cv.updated_at = timezone.now()
+        saved = CV.objects.filter(pk=cv.pk, version=version).update(
+            **updates, snapshot=cv.snapshot, version=cv.version, updated_at=cv.updated_at,
+        )
+        if not saved:
+            # Saved by someone else since it was read; roll back the section write
+            raise Conflict(CV.objects.filter(pk=cv.pk).values_list('version', flat=True).first())
+
+        if not previous or search.document(previous) != search.document(cv.snapshot):
+            search.index_snapshots([cv.snapshot])
+        transaction.on_commit(lambda: pdf_cache.invalidate(cv.id))
+    return cv, result
+
+
+def update_cv(cv_id, user, version, values):
+    """Change some of the CV's own fields; ``template`` takes a template id."""
+    if not isinstance(values, dict) or not values:
+        raise EditError(['Send the fields to change as a JSON object'])
+    values = dict(values)
+    cleaned = {}
+    if 'template' in values:
+        template = template_registry.get(values.pop('template'))
+        if template is None:
+            raise EditError(['cv.template: unknown template'])
+        cleaned['template_id'] = template.id
+    if values:
+        cleaned.update(_clean(CV, values, CV_FIELDS, ['full_name'] if 'full_name' in values else [], 'cv'))
+
+    def change(cv, sections):
+        return {name: value for name, value in cleaned.items() if getattr(cv, name) != value}, {}
+
+    return apply_edit(cv_id, user, version, change)
+
+
+def add_entry(cv_id, user, version, relation, values):
+    """Append an entry to a section; the result holds the new row."""
+    model = section_model(relation)
+    cleaned = _clean(model, values, section_fields(relation), REQUIRED_FIELDS[relation], relation)
+
+    def change(cv, sections):
+        rows = sections[relation]
+        sort_order = max((row['sort_order'] for row in rows), default=-1) + 1
+        row = row_to_dict(model.objects.create(cv=cv, sort_order=sort_order, **cleaned))
+        rows.append(row)
+        return {}, {'entry': row}
+
+    return apply_edit(cv_id, user, version, change)
+
+
+def update_entry(cv_id, user, version, relation, entry_id, values):
+    """Change some fields of a section entry; the result holds the row."""
+    model = section_model(relation)
+    required = [name for name in REQUIRED_FIELDS[relation] if name in (values or {})]
+    cleaned = _clean(model, values, section_fields(relation), required, relation)
+
+    def change(cv, sections):
+        row = _find(sections[relation], model, entry_id)
+        changed = {name: value for name, value in cleaned.items() if row.get(name) != value}
+        if changed:
+            model.objects.filter(pk=entry_id, cv=cv).update(**changed)
+            row.update(changed)
+        return {}, {'entry': row}
+
+    return apply_edit(cv_id, user, version, change)
+
+
+def delete_entry(cv_id, user, version, relation, entry_id):
+    model = section_model(relation)
+
+    def change(cv, sections):
+        rows = sections[relation]
+        rows.remove(_find(rows, model, entry_id))
+        model.objects.filter(pk=entry_id, cv=cv).delete()
+        return {}, {}
+
+    return apply_edit(cv_id, user, version, change)
+
+
+def reorder_entries(cv_id, user, version, relation, order):
+    """Put a section's entries in the order of ``order``, a list of all their ids."""
+    model = section_model(relation)
+
+    def change(cv, sections):
+        rows = sections[relation]
+        if not isinstance(order, list) or sorted(map(str, order)) != sorted(str(row['id']) for row in rows):
+            raise EditError([f'{relation}: order must list the id of every entry once'])
+        by_id = {str(row['id']): row for row in rows}
+        moved = []
+        for sort_order, entry_id in enumerate(order):
+            row = by_id[str(entry_id)]
+            if row['sort_order'] != sort_order:
+                row['sort_order'] = sort_order
+                moved.append(model(pk=row['id'], sort_order=sort_order))
+        if moved:
+            model.objects.bulk_update(moved, ['sort_order'])
+        sections[relation] = [by_id[str(entry_id)] for entry_id in order]
+        return {}, {'order': [row['id'] for row in sections[relation]]}
+
+    return apply_edit(cv_id, user, version, change)
@@ -0,0 +1,580 @@
+"""
+Benchmarks for the main CV entry points.
+
+Builds a synthetic corpus of users and CVs, drives the views through the
+Django test client and reports latency percentiles, query counts, peak Python
+memory and PDF throughput. Results are plain JSON so runs can be compared
+against a stored baseline.
+"""
+import asyncio
+import gc
+import math
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from . import pdf, pdf_cache
+from .cloning import clone_cvs
+from .file_responses import ranged_file_response
+from .models import CV, Experience, Education, Skill, Project, Certification, Achievement, Reference
+from .section_sync import SECTION_FORMS
+from .snapshots import refresh_snapshot
+
+# Rows per section for each CV size
+CV_SIZES = {
+    'small': {'experiences': 1, 'educations': 1, 'skills': 3, 'projects': 0,
+              'certifications': 0, 'achievements': 0, 'references': 0},
+    'median': {'experiences': 4, 'educations': 2, 'skills': 12, 'projects': 2,
+               'certifications': 2, 'achievements': 2, 'references': 2},
+    'huge': {'experiences': 15, 'educations': 5, 'skills': 40, 'projects': 10,
+             'certifications': 10, 'achievements': 10, 'references': 5},
+}
+
+# Metrics where a higher number than the baseline is a regression
+REGRESSION_METRICS = ['p50_ms', 'p95_ms', 'queries', 'peak_memory_kb']
+
+LOREM = (
+    'Led a cross-functional team delivering customer-facing features, '
+    'improving reliability and cutting costs across several quarters.'
+)
+
+
+def make_sections(cv, size):
+    counts = CV_SIZES[size]
+    Experience.objects.bulk_create([
+        Experience(cv=cv, sort_order=i, job_title=f'Engineer {i}', company=f'Company {i}', start_date='Jan 2020',
+                   end_date='Dec 2022', description=LOREM, achievements=LOREM)
+        for i in range(counts['experiences'])
+    ])
+    Education.objects.bulk_create([
+        Education(cv=cv, sort_order=i, institution=f'University {i}', degree='BSc', field_of_study='Computer Science',
+                  start_date='2014', end_date='2018', description=LOREM)
+        for i in range(counts['educations'])
+    ])
+    Skill.objects.bulk_create([
+        Skill(cv=cv, sort_order=i, name=f'Skill {i}', category=Skill.CATEGORY_CHOICES[i % len(Skill.CATEGORY_CHOICES)][0])
+        for i in range(counts['skills'])
+    ])
+    Project.objects.bulk_create([
+        Project(cv=cv, sort_order=i, name=f'Project {i}', technologies='Python, Django', project_url='https://example.com',
+                start_date='2021', end_date='2022', description=LOREM)
+        for i in range(counts['projects'])
+    ])
+    Certification.objects.bulk_create([
+        Certification(cv=cv, sort_order=i, name=f'Certificate {i}', issuing_organization='Institute', issue_date='2021',
+                      credential_url='https://example.com')
+        for i in range(counts['certifications'])
+    ])
+    Achievement.objects.bulk_create([
+        Achievement(cv=cv, sort_order=i, title=f'Award {i}', issuing_organization='Company', date='2022', description=LOREM)
+        for i in range(counts['achievements'])
+    ])
+    Reference.objects.bulk_create([
+        Reference(cv=cv, sort_order=i, name=f'Referee {i}', position='Manager', company='Company',
+                  email='referee@example.com', phone='+100000000', relationship='Manager')
+        for i in range(counts['references'])
+    ])
+
+
+def build_corpus(users=1, cvs_per_user=1, size='median'):
+    """Create synthetic users, each owning cvs_per_user CVs of the given size."""
+    owners = []
+    for u in range(users):
+        user = User.objects.create_user(f'bench_{u}_{time.time_ns()}', 'bench@example.com', 'bench-password')
+        cv = CV.objects.create(
+            user=user, template=None, title='Benchmark CV', full_name='Bench Marker',
+            email='bench@example.com', phone='+100000000', location='Lusaka, Zambia',
+            professional_summary=LOREM, linkedin_url='https://linkedin.com/in/bench',
+        )
+        make_sections(cv, size)
+        # Sections were bulk created, so build the snapshot the save path would have
+        refresh_snapshot(cv.id)
+        cv.refresh_from_db(fields=['snapshot'])
+        # Copy the first CV in bulk to reach the requested count
+        remaining = cvs_per_user - 1
+        while remaining > 0:
+            batch = min(remaining, 500)
+            clone_cvs([cv] * batch, user)
+            remaining -= batch
+        owners.append((user, cv))
+    return owners
+
+
+def edit_form_data(cv):
+    """The POST body edit_cv would receive for this CV, unchanged."""
+    data = {
+        'version': cv.version,
+        'full_name': cv.full_name,
+        'email': cv.email,
+        'phone': cv.phone,
+        'location': cv.location,
+        'professional_summary': cv.professional_summary,
+        'linkedin': cv.linkedin_url,
+        'portfolio': cv.github_url,
+    }
+    for section in SECTION_FORMS:
+        rows = list(getattr(cv, section.relation).all())
+        for field, input_name in section.fields.items():
+            data[input_name] = [getattr(row, field) for row in rows]
+    return data
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def measure(request, iterations, before=None):
+    """
+    Time ``request()`` and summarise it. ``before`` runs ahead of each call
+    and is not timed (e.g. to drop a cache).
+    """
+    timings = []
+    queries = 0
+    size = 0
+    for _ in range(iterations):
+        if before:
+            before()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request()
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            timings.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f'Benchmark request failed with HTTP {response.status_code}')
+        queries = len(captured)
+        size = len(body)
+
+    # Memory is measured on a separate call so tracing does not skew the timings
+    if before:
+        before()
+    tracemalloc.start()
+    try:
+        response = request()
+        if response.streaming:
+            b''.join(response.streaming_content)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'mean_ms': round(statistics.mean(timings) * 1000, 3),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'queries': queries,
+        'peak_memory_kb': round(peak / 1024, 1),
+        'response_bytes': size,
+        'total_seconds': sum(timings),
+    }
+
+
+def run(users=1, cvs_per_user=1, size='median', iterations=20):
+    """Build a corpus and benchmark every entry point; returns the results dict."""
+    owners = build_corpus(users=users, cvs_per_user=cvs_per_user, size=size)
+    user, cv = owners[0]
+    client = Client()
+    client.force_login(user)
+
+    dashboard_url = reverse('dashboard')
+    preview_url = reverse('preview_cv', args=[cv.id])
+    edit_url = reverse('edit_cv', args=[cv.id])
+    pdf_url = reverse('download_cv_pdf', args=[cv.id]) + '?async=0'
+    form = edit_form_data(cv)
+
+    # Measure the views themselves, not the admission limits
+    with override_settings(ADMISSION_RATE_LIMITS={}):
+        results = {
+            'dashboard': measure(lambda: client.get(dashboard_url), iterations),
+            'preview_cv': measure(lambda: client.get(preview_url), iterations),
+            'edit_cv_post': measure(lambda: client.post(edit_url, form), iterations),
+            # Cold renders: drop the cached PDF before every download
+            'download_cv_pdf': measure(
+                lambda: client.get(pdf_url), iterations, before=lambda: pdf_cache.invalidate(cv.id)),
+        }
+    pdf = results['download_cv_pdf']
+    pdf['pdf_bytes_per_sec'] = round(pdf['response_bytes'] * pdf['iterations'] / pdf['total_seconds'])
+
+    for entry in results.values():
+        entry.pop('total_seconds')
+
+    return {
+        'scale': {'users': users, 'cvs_per_user': cvs_per_user, 'cv_size': size, 'iterations': iterations},
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    List regressions of ``current`` against ``baseline``: any metric in
+    REGRESSION_METRICS more than ``threshold`` (a fraction) above the baseline.
+    """
+    regressions = []
+    for name, metrics in current['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        for metric in REGRESSION_METRICS:
+            old, new = previous.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold):
+                regressions.append(f'{name}.{metric}: {old} -> {new}')
+    return regressions
+
+
+# SQLite concurrency
+
+# What Django uses out of the box, for comparison with the tuned profile
+SQLITE_DEFAULT_PROFILE = {'timeout': 5, 'transaction_mode': 'DEFERRED', 'init_command': ''}
+
+
+def sqlite_profile(database):
+    """Timeout, transaction mode and pragmas configured for a DATABASES entry."""
+    options = database.get('OPTIONS', {})
+    return {
+        'timeout': options.get('timeout', 5),
+        'transaction_mode': options.get('transaction_mode') or 'DEFERRED',
+        'init_command': options.get('init_command', ''),
+    }
+
+
+def _sqlite_connect(path, profile):
+    conn = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None, check_same_thread=False)
+    for statement in profile['init_command'].split(';'):
+        if statement.strip():
+            conn.execute(statement)
+    return conn
+
+
+def sqlite_concurrency(profile, readers=4, writers=4, seconds=3.0, rows=1000):
+    """
+    Hammer a scratch SQLite database from reader and writer threads, the way
+    preview (read) and edit_cv (read-then-write transaction) requests do.
+    Returns operations per second and the number of "database is locked" errors.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        setup = _sqlite_connect(path, profile)
+        setup.execute('CREATE TABLE cv (id INTEGER PRIMARY KEY, title TEXT, summary TEXT, version INTEGER)')
+        setup.executemany(
+            'INSERT INTO cv (id, title, summary, version) VALUES (?, ?, ?, 0)',
+            [(i, f'CV {i}', LOREM) for i in range(rows)],
+        )
+        setup.close()
+
+        counts = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def reader(seed):
+            conn = _sqlite_connect(path, profile)
+            done = 0
+            locked = 0
+            while time.perf_counter() < deadline:
+                try:
+                    conn.execute('SELECT * FROM cv WHERE id = ?', ((seed * 7919 + done) % rows,)).fetchall()
+                    done += 1
+                except sqlite3.OperationalError:
+                    locked += 1
+            conn.close()
+            with lock:
+                counts['reads'] += done
+                counts['locked'] += locked
+
+        def writer(seed):
+            conn = _sqlite_connect(path, profile)
+            done = 0
+            locked = 0
+            while time.perf_counter() < deadline:
+                row_id = (seed * 104729 + done) % rows
+                try:
+                    conn.execute(f"BEGIN {profile['transaction_mode']}")
+                    conn.execute('SELECT version FROM cv WHERE id = ?', (row_id,)).fetchone()
+                    conn.execute('UPDATE cv SET version = version + 1, summary = ? WHERE id = ?', (LOREM, row_id))
+                    conn.execute('COMMIT')
+                    done += 1
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    locked += 1
+            conn.close()
+            with lock:
+                counts['writes'] += done
+                counts['locked'] += locked
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return {
+        'readers': readers,
+        'writers': writers,
+        'reads_per_sec': round(counts['reads'] / seconds),
+        'writes_per_sec': round(counts['writes'] / seconds),
+        'locked_errors': counts['locked'],
+    }
+
+
+# Incremental PDF builds
+
+def pdf_data(size='huge'):
+    """cv_to_dict()-shaped data for a synthetic CV, with every part at version 1."""
+    counts = CV_SIZES[size]
+    data = {
+        'cv': {'id': 0, 'full_name': 'Bench Marker', 'email': 'bench@example.com', 'phone': '+100000000',
+               'location': 'Lusaka, Zambia', 'linkedin_url': 'https://linkedin.com/in/bench', 'github_url': '',
+               'professional_summary': LOREM},
+        'template': None,
+        'experiences': [{'job_title': f'Engineer {i}', 'company': f'Company {i}', 'start_date': 'Jan 2020',
+                         'end_date': 'Dec 2022', 'description': LOREM, 'achievements': LOREM}
+                        for i in range(counts['experiences'])],
+        'educations': [{'institution': f'University {i}', 'degree': 'BSc', 'field_of_study': 'Computer Science',
+                        'start_date': '2014', 'end_date': '2018', 'description': LOREM}
+                       for i in range(counts['educations'])],
+        'skills': [{'name': f'Skill {i}', 'category': 'technical'} for i in range(counts['skills'])],
+        'projects': [{'name': f'Project {i}', 'technologies': 'Python, Django', 'description': LOREM}
+                     for i in range(counts['projects'])],
+        'certifications': [{'name': f'Certificate {i}', 'issuing_organization': 'Institute', 'issue_date': '2021'}
+                           for i in range(counts['certifications'])],
+        'achievements': [{'title': f'Award {i}', 'issuing_organization': 'Company', 'date': '2022',
+                          'description': LOREM} for i in range(counts['achievements'])],
+        'references': [],
+    }
+    data['versions'] = {part: 1 for part, _ in pdf.PART_BUILDERS}
+    return data
+
+
+
+def _render_timed(data):
+    """Seconds spent building the flowables and in the whole render."""
+    start = time.perf_counter()
+    elements = pdf.build_cv_elements(data)
+    built = time.perf_counter()
+    pdf.layout_pdf(elements)
+    return built - start, time.perf_counter() - start
+
+
+def pdf_incremental(size='huge', iterations=10):
+    """
+    Compare cold PDF builds (empty flowable cache) with rebuilds after a
+    one-field edit to one experience entry, which only invalidates that section.
+    """
+    data = pdf_data(size)
+    cold = []
+    for _ in range(iterations):
+        pdf.flowable_cache.clear()
+        cold.append(_render_timed(data))
+
+    edited = []
+    for i in range(iterations):
+        data['experiences'][0]['description'] = f'{LOREM} Edit {i}.'
+        data['versions']['experiences'] += 1
+        edited.append(_render_timed(data))
+
+    def summary(samples):
+        return {
+            'build_ms': round(statistics.median(build for build, _ in samples) * 1000, 3),
+            'render_ms': round(statistics.median(total for _, total in samples) * 1000, 3),
+        }
+
+    return {'cv_size': size, 'iterations': iterations, 'cold': summary(cold), 'after_one_field_edit': summary(edited)}
+
+
+# Download memory
+
+DOWNLOAD_MODES = ['buffered', 'streamed']
+
+
+def _rss_kb(field):
+    """VmRSS (current) or VmHWM (peak) of this process, in KiB; Linux only."""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise RuntimeError(f'{field} is not reported by /proc/self/status')
+
+
+def _download(mode, data, cache_dir, index):
+    if mode == 'buffered':
+        # Rendered into memory and handed to HttpResponse, which copies it again
+        response = HttpResponse(pdf.render_cv_pdf(data), content_type='application/pdf')
+    else:
+        with pdf_cache.writing(index, 'bench') as output:
+            pdf.write_cv_pdf(data, output)
+        request = RequestFactory().get('/')
+        response = ranged_file_response(request, pdf_cache.entry_path(index, 'bench'), 'application/pdf', 'cv.pdf', '"bench"')
+    # Drain the body the way a server writes it out
+    for _ in response:
+        pass
+    response.close()
+
+
+def _download_memory_worker(mode, concurrency, size, cache_dir):
+    """Runs in a fresh process so RSS reflects only this scenario."""
+    with override_settings(PDF_CACHE_DIR=cache_dir):
+        data = {**pdf_data(size), 'versions': None}
+        # Warm up imports, fonts and styles before taking the baseline
+        _download(mode, data, cache_dir, 0)
+        gc.collect()
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')  # reset the peak RSS counter
+        baseline = _rss_kb('VmRSS')
+
+        barrier = threading.Barrier(concurrency)
+
+        def run(index):
+            barrier.wait()
+            _download(mode, data, cache_dir, index)
+
+        threads = [threading.Thread(target=run, args=(i + 1,)) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        peak = _rss_kb('VmHWM')
+
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'baseline_rss_kb': baseline,
+        'peak_rss_kb': peak,
+        'per_download_kb': round((peak - baseline) / concurrency, 1),
+    }
+
+
+def download_memory(mode, concurrency=4, size='huge'):
+    """
+    Peak RSS growth per concurrent PDF download, rendering each PDF either
+    into memory ('buffered') or straight into a cache file served in chunks
+    ('streamed'). Linux only.
+    """
+    if mode not in DOWNLOAD_MODES:
+        raise ValueError(f'Unknown download mode {mode!r}')
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # The worker imports this module, which needs the app registry
+        with multiprocessing.get_context('spawn').Pool(1, initializer=django.setup) as pool:
+            return pool.apply(_download_memory_worker, (mode, concurrency, size, cache_dir))
+
+
+# HTTP load
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, keep_alive)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def _http_load(url, connections, seconds, headers):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+        + ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        + '\r\n'
+    ).encode('latin-1')
+
+    latencies = []
+    statuses = {}
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        nonlocal errors
+        writer = None
+        while time.perf_counter() < deadline:
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                start = time.perf_counter()
+                writer.write(request)
+                status, keep_alive = await _read_response(reader)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                errors += 1
+                if writer is not None:
+                    writer.close()
+                    writer = None
+                await asyncio.sleep(0.05)
+        if writer is not None:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'url': url,
+        'connections': connections,
+        'requests': len(latencies),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        'statuses': statuses,
+        'errors': errors,
+    }
+
+
+def http_load(url, connections=500, seconds=10.0, headers=None):
+    """
+    Keep ``connections`` HTTP/1.1 keep-alive connections busy with GET
+    requests to ``url`` for ``seconds`` and report throughput and latency.
+    Meant for comparing a WSGI and an ASGI server running the same code.
+    """
+    return asyncio.run(_http_load(url, connections, seconds, headers or {}))
+
+
+def login_session(username):
+    """Create a logged-in session for a user and return its session key."""
+    from importlib import import_module
+
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+
+    user = User.objects.get(username=username)
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return session.session_key
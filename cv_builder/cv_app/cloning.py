@@ -0,0 +1,73 @@
+"""
+Copy CVs together with everything that hangs off them.
+
+Child models are discovered from CV's reverse foreign keys, so a new section
+model is cloned without being listed here. Each model is copied with a single
+bulk_create, however many CVs are cloned at once.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import CV
+from .snapshots import refresh_snapshots
+
+# Filled in by the database on insert
+SKIPPED_FIELDS = {'id', 'created_at', 'updated_at'}
+
+
+def child_relations():
+    """Reverse relations of CV whose rows belong to a single CV."""
+    return [
+        relation for relation in CV._meta.related_objects
+        if (relation.one_to_many or relation.one_to_one) and relation.field.concrete
+    ]
+
+
+def copy_values(obj, exclude=()):
+    return {
+        field.attname: field.value_from_object(obj)
+        for field in obj._meta.concrete_fields
+        if not field.primary_key and field.name not in SKIPPED_FIELDS and field.name not in exclude
+    }
+
+
+def clone_cvs(cvs, user, **overrides):
+    """
+    Clone CVs and all of their child rows for the given user.
+
+    ``overrides`` are applied to every new CV, e.g. ``title=...``. The same CV
+    may appear several times to make several copies. Returns the new CVs in
+    the same order as ``cvs``.
+    """
+    sources = list(cvs)
+    if not sources:
+        return []
+
+    with transaction.atomic():
+        new_cvs = CV.objects.bulk_create([
+            CV(**{**copy_values(source, exclude={'user', 'snapshot'}), 'user': user, **overrides})
+            for source in sources
+        ])
+        new_ids = defaultdict(list)
+        for source, new_cv in zip(sources, new_cvs):
+            new_ids[source.pk].append(new_cv.pk)
+
+        for relation in child_relations():
+            model = relation.related_model
+            fk = relation.field
+            children = model.objects.filter(**{f'{fk.name}__in': list(new_ids)}).order_by('pk')
+            model.objects.bulk_create([
+                model(**{**copy_values(child, exclude={fk.name}), fk.attname: new_id})
+                for child in children
+                for new_id in new_ids[getattr(child, fk.attname)]
+            ])
+
+        refresh_snapshots(new_cv.pk for new_cv in new_cvs)
+
+    return new_cvs
+
+
+def clone_cv(cv, user, **overrides):
+    """Clone a single CV; see clone_cvs()."""
+    return clone_cvs([cv], user, **overrides)[0]
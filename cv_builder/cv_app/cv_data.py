@@ -0,0 +1,125 @@
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import template_registry
+from .models import CV
+
+# Reverse relations of CV that hold the CV sections, in display order
+SECTION_RELATIONS = [
+    'experiences',
+    'educations',
+    'skills',
+    'projects',
+    'certifications',
+    'achievements',
+    'references',
+]
+
+# Template fields that change how a CV is rendered
+TEMPLATE_STYLE_FIELDS = [
+    'id',
+    'primary_color',
+    'secondary_color',
+    'accent_color',
+    'font_family',
+    'layout_style',
+]
+
+# Bookkeeping fields that never show up in the rendered CV
+VOLATILE_FIELDS = {'created_at', 'updated_at', 'snapshot', 'version'}
+
+
+def row_to_dict(obj):
+    """Plain dict of a model row's concrete field values (minus timestamps)."""
+    return {
+        field.attname: field.value_from_object(obj)
+        for field in obj._meta.concrete_fields
+        if field.name not in VOLATILE_FIELDS
+    }
+
+
+class CVAggregate:
+    """
+    Read-only view of a CV with its template and every section already
+    loaded. Sections are tuples, so templates can test and loop over them
+    without touching the database again; any other attribute is read from
+    the underlying CV row.
+
+    Sections are taken from ``sections`` ({relation: rows}) when given,
+    otherwise from the CV's (prefetched) relations.
+    """
+
+    def __init__(self, cv, sections=None):
+        object.__setattr__(self, 'cv', cv)
+        object.__setattr__(self, 'template', template_registry.get(cv.template_id))
+        for relation in SECTION_RELATIONS:
+            rows = sections[relation] if sections is not None else getattr(cv, relation).all()
+            object.__setattr__(self, relation, tuple(rows))
+
+    def __getattr__(self, name):
+        if name == 'cv':
+            raise AttributeError(name)
+        return getattr(self.cv, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CVAggregate is read-only')
+
+
+def aggregate_queryset():
+    """
+    CVs with all sections prefetched (1 + 7 queries); templates come from the
+    template registry. Section rows come back in their sort_order.
+    """
+    return CV.objects.prefetch_related(*SECTION_RELATIONS)
+
+
+def load_cv_aggregate(cv_id, user):
+    """Load one of the user's CVs as a CVAggregate; raises CV.DoesNotExist."""
+    return CVAggregate(aggregate_queryset().get(id=cv_id, user=user))
+
+
+async def aload_cv_aggregate(cv_id, user):
+    """Async version of load_cv_aggregate()."""
+    await template_registry.atemplates()
+    return CVAggregate(await aggregate_queryset().aget(id=cv_id, user=user))
+
+
+def template_style(template):
+    """The styling fields of a CVTemplate as plain data, or None without a template."""
+    if template is None:
+        return None
+    return {name: getattr(template, name) for name in TEMPLATE_STYLE_FIELDS}
+
+
+def cv_to_dict(aggregate):
+    """
+    Serialize a CVAggregate (all sections plus template styling) into plain
+    Python data. This is everything the PDF renderer needs, so the result can
+    be fingerprinted or handed to another process. ``versions`` carries the
+    snapshot's part versions, which let the renderer reuse unchanged parts.
+    """
+    cv = aggregate.cv
+    template = aggregate.template
+    data = {
+        'cv': row_to_dict(cv),
+        'template': template_style(template),
+    }
+    for relation in SECTION_RELATIONS:
+        data[relation] = [row_to_dict(obj) for obj in getattr(aggregate, relation)]
+    data['versions'] = (cv.snapshot or {}).get('versions')
+    return data
+
+
+def cv_fingerprint(data):
+    """Stable SHA-256 of the content in the data returned by cv_to_dict()."""
+    content = {key: value for key, value in data.items() if key != 'versions'}
+    payload = json.dumps(content, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def content_version(content):
+    """Short hash of JSON-safe content: equal versions always mean equal content."""
+    payload = json.dumps(content, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
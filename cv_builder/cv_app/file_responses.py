@@ -0,0 +1,99 @@
+"""
+File downloads with HTTP Range support.
+
+Files are streamed from disk in fixed-size chunks, never read into memory as a
+whole, and always carry a Content-Length. A single ``bytes=`` range is
+answered with 206 Partial Content so interrupted downloads can resume;
+If-Range makes sure a resumed download still refers to the same file.
+Async views ask for an async body so the ASGI handler can stream it without
+a thread hop per chunk.
+"""
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_byte_range(header, size):
+    """
+    The (start, end) byte positions, inclusive, requested by a Range header.
+    Returns None when the whole file should be sent (no header, several
+    ranges or a syntax error) and raises ValueError when the range cannot be
+    satisfied.
+    """
+    match = _RANGE_RE.match(header.replace(' ', '')) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range starts beyond the end of the file')
+    return start, end
+
+
+def iter_file_range(file, start, end, chunk_size=CHUNK_SIZE):
+    with file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def aiter_file_range(file, start, end, chunk_size=CHUNK_SIZE):
+    # Chunks come from a local file, usually the page cache, so plain reads are fine here
+    for chunk in iter_file_range(file, start, end, chunk_size):
+        yield chunk
+
+
+def ranged_file_response(request, path, content_type, filename, etag, asynchronous=False):
+    """
+    Serve a file from disk as an attachment, honouring Range and If-Range.
+    With ``asynchronous`` the body is an async iterator. The file is opened
+    first, so once this returns it is served whole even if it is deleted
+    meanwhile; raises FileNotFoundError when it is already gone.
+    """
+    file = open(path, 'rb')
+    size = os.fstat(file.fileno()).st_size
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or etag in parse_etags(if_range):
+        try:
+            byte_range = parse_byte_range(request.headers.get('Range'), size)
+        except ValueError:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None and not asynchronous:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range or (0, size - 1)
+        chunks = (aiter_file_range if asynchronous else iter_file_range)(file, start, end)
+        response = StreamingHttpResponse(chunks, status=206 if byte_range else 200, content_type=content_type)
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,62 @@
+"""
+Per-section HTML fragment cache for the CV preview.
+
+Each block of preview_cv.html is cached under the CV id, the block's part
+name, the part's version (a hash of its content) from the CV snapshot and the
+template id. Saving a CV changes only the versions of the parts that changed,
+so every other fragment keeps hitting; stale entries are never read again and
+simply expire.
+Any Django cache backend works (FRAGMENT_CACHE_ALIAS).
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+
+def cache():
+    return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+
+def timeout():
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def fragment_version(cv, part):
+    """Version of one part of a CV, or None when it has no usable snapshot."""
+    snapshot = getattr(cv, 'snapshot', None) or {}
+    return (snapshot.get('versions') or {}).get(part)
+
+
+def fragment_key(cv_id, part, version, template_id):
+    return f'cv_fragment:{cv_id}:{part}:{version}:{template_id}'
+
+
+class FragmentStats:
+    """Hits and misses of the fragments rendered for one response."""
+
+    def __init__(self):
+        self.hits = []
+        self.misses = []
+
+    def header(self):
+        return f"hits={len(self.hits)}; misses={len(self.misses)}; missed={','.join(self.misses) or '-'}"
+
+
+def render_fragment(part, cv, template_id, render, stats=None):
+    """
+    Cached output of ``render()`` for one part of a CV. Renders uncached when
+    the CV has no version for the part (e.g. a snapshot is being rebuilt).
+    """
+    version = fragment_version(cv, part)
+    if version is None:
+        return render()
+
+    key = fragment_key(cv.id, part, version, template_id)
+    html = cache().get(key)
+    if html is None:
+        html = render()
+        cache().set(key, html, timeout())
+        if stats is not None:
+            stats.misses.append(part)
+    elif stats is not None:
+        stats.hits.append(part)
+    return html
@@ -0,0 +1,534 @@
+"""
+Bulk import of CVs from JSON Resume and CSV files.
+
+Files are parsed as a stream, one CV at a time, so an import never holds more
+than one batch in memory. Every batch is validated, then written in its own
+transaction: one bulk_create for the CVs, and for each section table one raw
+executemany INSERT followed by a single SELECT of the new ids. Section rows
+skip bulk_create, which builds a model instance per row and splits the INSERT
+into chunks that fit SQLite's bound-variable limit; a prepared executemany is
+cheaper at this volume. Snapshots (and so search index rows) are built from
+the values in hand and those ids, without reading the rows back.
+Records that fail validation are skipped and reported with their position in
+the file. import_records() reports after each committed batch how many
+records it has consumed, so an interrupted import can resume from there.
+
+JSON input is a single JSON Resume document (https://jsonresume.org/schema),
+an array of them or one per line. CSV input has one CV per row: the columns
+are CV field names plus ``username``, and one column per section holding a
+JSON list of entries keyed by the section model's field names (``skills`` may
+also be a ``;``-separated list of names).
+"""
+import csv
+import functools
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxLengthValidator
+from django.db import connection, models, transaction
+
+from . import search, template_registry
+from .cv_data import SECTION_RELATIONS
+from .models import CV
+from .snapshots import build_snapshot
+
+JSON = 'json'
+CSV = 'csv'
+FORMATS = (JSON, CSV)
+
+CHUNK_SIZE = 64 * 1024
+
+# A single JSON document larger than this is treated as a broken file
+MAX_DOCUMENT_SIZE = 16 * 1024 * 1024
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Rejected records listed in an upload's response
+MAX_REPORTED_ERRORS = 100
+
+# Fields an entry cannot do without
+REQUIRED_FIELDS = {
+    'cv': ['full_name'],
+    'experiences': ['job_title'],
+    'educations': ['institution'],
+    'skills': ['name'],
+    'projects': ['name'],
+    'certifications': ['name'],
+    'achievements': ['title'],
+    'references': ['name'],
+}
+
+# Fields an import may set; the owner, template, snapshot and timestamps are set here
+CV_FIELDS = [
+    'title', 'full_name', 'email', 'phone', 'location', 'date_of_birth', 'gender', 'nationality',
+    'languages', 'marital_status', 'additional_info', 'professional_summary', 'linkedin_url', 'github_url',
+]
+
+
+def max_upload_bytes():
+    return getattr(settings, 'IMPORT_MAX_UPLOAD_BYTES', 10 * 1024 * 1024)
+
+
+def max_upload_records():
+    return getattr(settings, 'IMPORT_MAX_RECORDS', 1000)
+
+
+class RecordError(Exception):
+    def __init__(self, messages):
+        super().__init__('; '.join(messages))
+        self.messages = messages
+
+
+def section_model(relation):
+    return CV._meta.get_field(relation).related_model
+
+
+def section_fields(relation):
+    model = section_model(relation)
+    return [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in ('cv', 'sort_order')
+    ]
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        return CSV
+    if extension in ('json', 'jsonl', 'ndjson'):
+        return JSON
+    return None
+
+
+# Streaming readers
+
+def iter_json_documents(stream, chunk_size=CHUNK_SIZE):
+    """
+    Yield the values of a JSON text stream holding one value, a top-level
+    array of values or one value per line, reading it a chunk at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    top_level_array = None
+
+    def fill():
+        nonlocal buffer, position, eof
+        if len(buffer) - position > MAX_DOCUMENT_SIZE:
+            raise ValueError('Invalid JSON: a document is too large or never ends')
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    while True:
+        # Skip whitespace, plus the brackets and commas of a top-level array
+        while True:
+            while position < len(buffer) and (
+                    buffer[position].isspace() or (top_level_array and buffer[position] in ',]')):
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            fill()
+        if position >= len(buffer):
+            return
+
+        if top_level_array is None:
+            top_level_array = buffer[position] == '['
+            if top_level_array:
+                position += 1
+                continue
+
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as exc:
+            if eof:
+                raise ValueError(f'Invalid JSON: {exc}') from None
+            fill()
+            continue
+        if end == len(buffer) and not eof and not isinstance(value, (dict, list)):
+            # A number or literal may continue in the next chunk
+            fill()
+            continue
+        position = end
+        yield value
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ', '.join(_text(item) for item in value if item not in (None, ''))
+    return str(value).strip()
+
+
+def _lines(value):
+    if isinstance(value, list):
+        return '\n'.join(_text(item) for item in value if item not in (None, ''))
+    return _text(value)
+
+
+def _dicts(value):
+    return [item for item in value if isinstance(item, dict)] if isinstance(value, list) else []
+
+
+def from_json_resume(document):
+    """(username, cv fields, {relation: entries}) of a JSON Resume document."""
+    if not isinstance(document, dict):
+        raise RecordError(['Expected a JSON object'])
+    basics = document.get('basics') if isinstance(document.get('basics'), dict) else {}
+    meta = document.get('meta') if isinstance(document.get('meta'), dict) else {}
+    location = basics.get('location') if isinstance(basics.get('location'), dict) else {}
+
+    profiles = {_text(p.get('network')).lower(): _text(p.get('url')) for p in _dicts(basics.get('profiles'))}
+    languages = _dicts(document.get('languages'))
+    cv = {
+        'title': _text(meta.get('title') or basics.get('label')) or 'Imported CV',
+        'full_name': _text(basics.get('name')),
+        'email': _text(basics.get('email')),
+        'phone': _text(basics.get('phone')),
+        'location': ', '.join(filter(None, (
+            _text(location.get(key)) for key in ('address', 'city', 'region', 'countryCode')))),
+        'professional_summary': _text(basics.get('summary')),
+        'linkedin_url': profiles.get('linkedin', ''),
+        'github_url': profiles.get('github', '') or _text(basics.get('url')),
+        'languages': ', '.join(_text(language.get('language')) for language in languages),
+    }
+
+    sections = {
+        'experiences': [{
+            'job_title': _text(work.get('position')),
+            'company': _text(work.get('name') or work.get('company')),
+            'start_date': _text(work.get('startDate')),
+            'end_date': _text(work.get('endDate')),
+            'description': _text(work.get('summary')),
+            'achievements': _lines(work.get('highlights')),
+        } for work in _dicts(document.get('work'))],
+        'educations': [{
+            'institution': _text(education.get('institution')),
+            'degree': _text(education.get('studyType')),
+            'field_of_study': _text(education.get('area')),
+            'start_date': _text(education.get('startDate')),
+            'end_date': _text(education.get('endDate')),
+            'description': _text(education.get('courses')),
+        } for education in _dicts(document.get('education'))],
+        'skills': [
+            {'name': _text(skill.get('name')), 'category': 'technical'}
+            for skill in _dicts(document.get('skills'))
+        ] + [
+            {'name': _text(language.get('language')), 'category': 'languages'}
+            for language in languages
+        ],
+        'projects': [{
+            'name': _text(project.get('name')),
+            'description': _text(project.get('description')),
+            'technologies': _text(project.get('keywords')),
+            'project_url': _text(project.get('url')),
+            'start_date': _text(project.get('startDate')),
+            'end_date': _text(project.get('endDate')),
+        } for project in _dicts(document.get('projects'))],
+        'certifications': [{
+            'name': _text(certificate.get('name')),
+            'issuing_organization': _text(certificate.get('issuer')),
+            'issue_date': _text(certificate.get('date')),
+            'credential_url': _text(certificate.get('url')),
+        } for certificate in _dicts(document.get('certificates'))],
+        'achievements': [{
+            'title': _text(award.get('title')),
+            'issuing_organization': _text(award.get('awarder')),
+            'date': _text(award.get('date')),
+            'description': _text(award.get('summary')),
+        } for award in _dicts(document.get('awards'))],
+        'references': [{
+            'name': _text(reference.get('name')),
+            'position': _text(reference.get('position')),
+            'company': _text(reference.get('company')),
+            'email': _text(reference.get('email')),
+            'phone': _text(reference.get('phone')),
+            'relationship': _text(reference.get('relationship') or reference.get('reference')),
+        } for reference in _dicts(document.get('references'))],
+    }
+    return _text(meta.get('username')), cv, sections
+
+
+def from_csv_row(row):
+    """(username, cv fields, {relation: entries}) of a CSV row."""
+    cv = {name: (row.get(name) or '').strip() for name in CV_FIELDS if name in row}
+    cv['title'] = cv.get('title') or 'Imported CV'
+    sections = {}
+    errors = []
+    for relation in SECTION_RELATIONS:
+        value = (row.get(relation) or '').strip()
+        if not value:
+            continue
+        if relation == 'skills' and not value.startswith('['):
+            sections[relation] = [{'name': name.strip()} for name in value.split(';') if name.strip()]
+            continue
+        try:
+            entries = json.loads(value)
+        except ValueError:
+            errors.append(f'{relation}: not a JSON list')
+            continue
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            errors.append(f'{relation}: not a JSON list of objects')
+            continue
+        fields = section_fields(relation)
+        sections[relation] = [
+            {name: _text(entry[name]) for name in fields if name in entry} for entry in entries
+        ]
+    if errors:
+        raise RecordError(errors)
+    return (row.get('username') or '').strip(), cv, sections
+
+
+def iter_records(stream, fmt):
+    """Yield (record number, parsed record or RecordError) for every record in a text stream."""
+    if fmt == CSV:
+        source, parse = csv.DictReader(stream), from_csv_row
+    else:
+        source, parse = iter_json_documents(stream), from_json_resume
+    for number, raw in enumerate(source, 1):
+        try:
+            yield number, parse(raw)
+        except RecordError as exc:
+            yield number, exc
+
+
+# Validation
+
+@functools.cache
+def field_cleaner(model, name):
+    """
+    (attname, clean function) of a model field. Text fields skip the generic
+    Field.clean() machinery, which dominates the cost of validating an import.
+    """
+    field = model._meta.get_field(name)
+    if not isinstance(field, (models.CharField, models.TextField)):
+        return field.attname, lambda value: field.clean(value, None)
+
+    max_length = field.max_length
+    choices = {str(key) for key, _ in field.flatchoices} if field.choices else None
+    validators = [validator for validator in field.validators if not isinstance(validator, MaxLengthValidator)]
+
+    def clean(value):
+        value = str(value)
+        if max_length is not None and len(value) > max_length:
+            raise ValidationError(f'Ensure this value has at most {max_length} characters (it has {len(value)}).')
+        if choices is not None and value not in choices:
+            raise ValidationError(f'Value {value!r} is not a valid choice.')
+        for validator in validators:
+            validator(value)
+        return value
+
+    return field.attname, clean
+
+
+def clean_values(model, values, required, label):
+    """Validate and convert a model's field values; returns ({attname: value}, errors)."""
+    cleaned = {}
+    errors = []
+    for name, value in values.items():
+        attname, clean = field_cleaner(model, name)
+        if value in ('', None):
+            # Blank values are fine, unless the field is required here
+            if name in required:
+                errors.append(f'{label}.{name}: this field is required')
+            cleaned[attname] = None if model._meta.get_field(name).null else ''
+            continue
+        try:
+            cleaned[attname] = clean(value)
+        except ValidationError as exc:
+            errors.append(f'{label}.{name}: {" ".join(exc.messages)}')
+    for name in required:
+        if name not in values:
+            errors.append(f'{label}.{name}: this field is required')
+    return cleaned, errors
+
+
+def clean_record(record):
+    username, cv_values, sections = record
+    cv, errors = clean_values(CV, cv_values, REQUIRED_FIELDS['cv'], 'cv')
+    cleaned_sections = {}
+    for relation, entries in sections.items():
+        model = section_model(relation)
+        cleaned_sections[relation] = []
+        for index, entry in enumerate(entries, 1):
+            values, entry_errors = clean_values(model, entry, REQUIRED_FIELDS[relation], f'{relation}[{index}]')
+            cleaned_sections[relation].append(values)
+            errors.extend(entry_errors)
+    if errors:
+        raise RecordError(errors)
+    return username, cv, cleaned_sections
+
+
+# Writing
+
+class TooManyRecords(ValueError):
+    """Raised once ``limit`` records were imported and more remain; ``first`` to ``last`` were skipped."""
+
+    def __init__(self, limit, first, last):
+        records = f'record {first} was' if first == last else f'records {first} to {last} were'
+        super().__init__(f'Only {limit} records are imported at a time: {records} skipped.')
+        self.limit = limit
+        self.first = first
+        self.last = last
+
+
+class BatchResult:
+    """What one committed batch did; ``consumed`` counts records from the start of the file."""
+
+    def __init__(self, consumed, imported, errors):
+        self.consumed = consumed
+        self.imported = imported
+        self.errors = errors
+
+
+def insert_sections(model, cvs, entries):
+    """
+    Insert the section rows of a batch of CVs with a single executemany, then
+    read back their ids, and return {cv id: [rows]} as row_to_dict() style dicts.
+    ``entries`` holds each CV's list of cleaned {attname: value} dicts.
+    """
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    defaults = {field.attname: field.get_default() for field in fields}
+    # Text and integer values are already what the database stores
+    plain = all(isinstance(field, (models.CharField, models.TextField, models.IntegerField, models.ForeignKey))
+                for field in fields)
+
+    values = []
+    for cv, cv_entries in sorted(zip(cvs, entries), key=lambda pair: pair[0].pk):
+        for index, entry in enumerate(cv_entries):
+            row = {**defaults, **entry, 'cv_id': cv.pk, 'sort_order': index}
+            values.append([row[field.attname] for field in fields])
+    if not values:
+        return {}
+    params = values if plain else [
+        [field.get_db_prep_save(value, connection) for field, value in zip(fields, row)] for row in values
+    ]
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    cv_ids = [cv.pk for cv in cvs]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(quote(field.column) for field in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))})",
+            params,
+        )
+        # The CVs are new, so these are exactly the rows just inserted, in the same order
+        cursor.execute(
+            f"SELECT id FROM {table} WHERE cv_id IN ({', '.join(['%s'] * len(cv_ids))}) ORDER BY cv_id, sort_order",
+            cv_ids,
+        )
+        ids = [row_id for (row_id,) in cursor.fetchall()]
+
+    attnames = ['id'] + [field.attname for field in fields]
+    rows = {}
+    for row_id, row in zip(ids, values):
+        row = dict(zip(attnames, [row_id, *row]))
+        rows.setdefault(row['cv_id'], []).append(row)
+    return rows
+
+
+def write_batch(records, template_id):
+    """
+    Insert a batch of cleaned (owner id, cv values, sections) records in one
+    transaction: a bulk_create for the CVs and one executemany per section
+    table, then their snapshots and search rows.
+    """
+    with transaction.atomic():
+        cvs = CV.objects.bulk_create([
+            CV(user_id=owner_id, template_id=template_id, **cv_values)
+            for owner_id, cv_values, _ in records
+        ])
+
+        cv_sections = {cv.pk: {} for cv in cvs}
+        for relation in SECTION_RELATIONS:
+            rows = insert_sections(
+                section_model(relation), cvs, [sections.get(relation, ()) for _, _, sections in records])
+            for cv in cvs:
+                cv_sections[cv.pk][relation] = rows.get(cv.pk, [])
+
+        snapshot_field = CV._meta.get_field('snapshot')
+        for cv in cvs:
+            cv.snapshot = build_snapshot(cv, cv_sections[cv.pk])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {connection.ops.quote_name(CV._meta.db_table)} SET snapshot = %s WHERE id = %s',
+                [(snapshot_field.get_db_prep_save(cv.snapshot, connection), cv.pk) for cv in cvs],
+            )
+        search.index_snapshots(cv.snapshot for cv in cvs)
+    return cvs
+
+
+def import_records(stream, fmt, owner=None, allow_usernames=True, template_id=None,
+                   batch_size=DEFAULT_BATCH_SIZE, skip=0, max_records=None):
+    """
+    Import every CV in a text stream, yielding a BatchResult after each
+    committed batch. CVs belong to ``owner`` unless ``allow_usernames`` is on
+    and the record names an existing user. The first ``skip`` records are
+    read but not imported, to resume an earlier run. With ``max_records``,
+    records past that many are only counted, and TooManyRecords is raised
+    after the last batch.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format "{fmt}"')
+
+    consumed = skip
+    batch = []
+    errors = []
+
+    def flush():
+        usernames = {record[0] for _, record in batch if record[0]} if allow_usernames else set()
+        users = User.objects.filter(username__in=usernames).in_bulk(field_name='username') if usernames else {}
+        ready = []
+        for number, (username, cv_values, sections) in batch:
+            if allow_usernames and username:
+                user = users.get(username)
+                if user is None:
+                    errors.append((number, cv_values.get('full_name', ''), [f'Unknown user "{username}"']))
+                    continue
+            elif owner is not None:
+                user = owner
+            else:
+                errors.append((number, cv_values.get('full_name', ''), ['No owner: give a username or a default user']))
+                continue
+            ready.append((user.pk, cv_values, sections))
+        if ready:
+            write_batch(ready, template_id)
+        return BatchResult(consumed, len(ready), errors)
+
+    records = iter_records(stream, fmt)
+    for number, record in records:
+        if number <= skip:
+            continue
+        if max_records is not None and number - skip > max_records:
+            if batch or errors:
+                yield flush()
+            last = number
+            for last, _ in records:
+                pass
+            raise TooManyRecords(max_records, number, last)
+        consumed = number
+        if isinstance(record, RecordError):
+            errors.append((number, '', record.messages))
+        else:
+            try:
+                batch.append((number, clean_record(record)))
+            except RecordError as exc:
+                errors.append((number, record[1].get('full_name', ''), exc.messages))
+        if len(batch) + len(errors) >= batch_size:
+            yield flush()
+            batch, errors = [], []
+
+    if batch or errors:
+        yield flush()
+
+
+def default_template_id():
+    """The model's default template, when it exists."""
+    template = template_registry.get(CV._meta.get_field('template').default)
+    return template.id if template else None
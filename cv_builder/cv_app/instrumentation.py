@@ -0,0 +1,241 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware times every sampled request and breaks it down into
+database, template and PDF build time. The breakdown is sent back in a
+Server-Timing header and folded into process-local histograms, which the
+metrics view exposes in the Prometheus text format.
+
+The middleware works for sync and async views alike: timings live in a
+context variable, which follows async ORM calls into the threads they run on,
+and every database connection carries one execute wrapper that charges
+queries to whichever request is current.
+"""
+import contextvars
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+
+# Upper bounds of the histogram buckets, in seconds (or queries for db_queries)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_current = contextvars.ContextVar('cv_request_timings', default=None)
+
+
+class RequestTimings:
+    """What one request spent its time on."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.pdf_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.db_queries += 1
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # view -> [per-bucket counts..., +Inf count, sum]
+        self.series = {}
+
+    def observe(self, view, value):
+        series = self.series.setdefault(view, [0] * (len(self.buckets) + 1) + [0.0])
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for view, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{view="{view}"}} {series[-1]}')
+            lines.append(f'{self.name}_count{{view="{view}"}} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.request_duration = Histogram(
+            'cv_request_duration_seconds', 'Wall time spent handling a request.', DURATION_BUCKETS)
+        self.db_duration = Histogram(
+            'cv_db_duration_seconds', 'Time spent in database queries per request.', DURATION_BUCKETS)
+        self.db_queries = Histogram(
+            'cv_db_queries', 'Database queries issued per request.', QUERY_BUCKETS)
+        self.template_duration = Histogram(
+            'cv_template_render_seconds', 'Time spent rendering templates per request.', DURATION_BUCKETS)
+        self.pdf_duration = Histogram(
+            'cv_pdf_build_seconds', 'Time spent building PDFs with ReportLab per request.', DURATION_BUCKETS)
+
+    def record(self, view, total, timings):
+        with self.lock:
+            self.request_duration.observe(view, total)
+            self.db_duration.observe(view, timings.db_seconds)
+            self.db_queries.observe(view, timings.db_queries)
+            if timings.template_seconds:
+                self.template_duration.observe(view, timings.template_seconds)
+            if timings.pdf_seconds:
+                self.pdf_duration.observe(view, timings.pdf_seconds)
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for histogram in (self.request_duration, self.db_duration, self.db_queries,
+                              self.template_duration, self.pdf_duration):
+                lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute_wrapper charging the query to the current request."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def install_query_timer(connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+# Connections opened later, e.g. on the threads async views query from
+connection_created.connect(install_query_timer)
+
+
+@contextmanager
+def pdf_timer():
+    """Attribute the enclosed block to PDF build time of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _current.get()
+        if timings is not None:
+            timings.pdf_seconds += time.perf_counter() - start
+
+
+def sample_rate():
+    return getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = sample_rate()
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        for alias in connections:
+            install_query_timer(connections[alias])
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, time.perf_counter() - start, timings)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, time.perf_counter() - start, timings)
+
+    def finish(self, request, response, total, timings):
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unmatched'
+        registry.record(view, total, timings)
+
+        response['Server-Timing'] = server_timing(total, timings)
+        return response
+
+
+def server_timing(total, timings):
+    metrics = [
+        f'total;dur={total * 1000:.2f}',
+        f'db;dur={timings.db_seconds * 1000:.2f};desc="{timings.db_queries} queries"',
+    ]
+    if timings.template_seconds:
+        metrics.append(f'tpl;dur={timings.template_seconds * 1000:.2f}')
+    if timings.pdf_seconds:
+        metrics.append(f'pdf;dur={timings.pdf_seconds * 1000:.2f}')
+    return ', '.join(metrics)
+
+
+class TimedTemplate:
+    """Wraps a Django template so its render time is charged to the request."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return self.template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timings.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The standard Django template backend, with render timing."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
@@ -0,0 +1,176 @@
+"""
+Keyset pagination of the dashboard's CV cards.
+
+The dashboard renders the first DASHBOARD_PAGE_SIZE cards, however many CVs
+the user has, and the rest are fetched a page at a time from the cards
+endpoint as the user scrolls. A page is addressed by a cursor holding the
+sort key of the last card shown, so every page is a range scan of one of the
+CV indexes instead of an OFFSET that reads and discards all earlier rows.
+"""
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import urlencode
+
+from .models import CV, Education, Experience, Skill
+
+# Sort name -> ordering; the id breaks ties so every CV has a unique position
+SORTS = {
+    'created': ('-created_at', '-id'),
+    'updated': ('-updated_at', '-id'),
+    'title': ('title', 'id'),
+}
+DEFAULT_SORT = 'created'
+
+# Columns a card shows; the snapshot and long text fields are never loaded
+CARD_FIELDS = ['id', 'user_id', 'template_id', 'title', 'full_name', 'email', 'created_at', 'updated_at']
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def page_size():
+    return getattr(settings, 'DASHBOARD_PAGE_SIZE', 24)
+
+
+def section_count(model):
+    # Correlated COUNT(*) over one section table, avoids join fan-out between sections
+    rows = model.objects.filter(cv=OuterRef('pk')).order_by().values('cv').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def encode_cursor(cv, sort):
+    field = SORTS[sort][0].lstrip('-')
+    value = getattr(cv, field)
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, cv.id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    try:
+        value, cv_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if SORTS[sort][0].lstrip('-') != 'title':
+            # Well-formed but impossible dates (2024-02-30) raise ValueError too
+            value = parse_datetime(value) if isinstance(value, str) else None
+    except (ValueError, TypeError):
+        raise InvalidQuery('Invalid cursor')
+    if not isinstance(value, (str, datetime.datetime)) or not isinstance(cv_id, int):
+        raise InvalidQuery('Invalid cursor')
+    return value, cv_id
+
+
+class CardQuery:
+    """The sort, filters and cursor of one dashboard or cards request."""
+
+    def __init__(self, params):
+        self.sort = params.get('sort') or DEFAULT_SORT
+        if self.sort not in SORTS:
+            raise InvalidQuery(f'sort must be one of {", ".join(SORTS)}')
+        self.title = params.get('title', '').strip()
+        self.template = params.get('template', '')
+        if self.template and not self.template.isdigit():
+            raise InvalidQuery('template must be a template id')
+        self.updated_after = self._date(params, 'updated_after')
+        self.updated_before = self._date(params, 'updated_before')
+        self.cursor = params.get('cursor', '')
+        self.after = decode_cursor(self.cursor, self.sort) if self.cursor else None
+
+    @staticmethod
+    def _date(params, name):
+        value = params.get(name, '')
+        if not value:
+            return ''
+        try:
+            if parse_date(value) is None:
+                raise ValueError
+        except ValueError:
+            raise InvalidQuery(f'{name} must be a date (YYYY-MM-DD)')
+        return value
+
+    @property
+    def filtered(self):
+        return bool(self.title or self.template or self.updated_after or self.updated_before)
+
+    def params(self, **overrides):
+        """Query string of this query, with some parameters replaced."""
+        params = {
+            'sort': self.sort if self.sort != DEFAULT_SORT else '',
+            'title': self.title,
+            'template': self.template,
+            'updated_after': self.updated_after,
+            'updated_before': self.updated_before,
+            'cursor': self.cursor,
+            **overrides,
+        }
+        return urlencode({name: value for name, value in params.items() if value})
+
+    def queryset(self, user):
+        """The user's CVs matching the filters, from the cursor on, in sort order."""
+        cvs = CV.objects.filter(user=user)
+        if self.title:
+            cvs = cvs.filter(title__icontains=self.title)
+        if self.template:
+            cvs = cvs.filter(template_id=int(self.template))
+        if self.updated_after:
+            cvs = cvs.filter(updated_at__gte=_start_of_day(self.updated_after))
+        if self.updated_before:
+            cvs = cvs.filter(updated_at__lt=_start_of_day(self.updated_before) + datetime.timedelta(days=1))
+
+        ordering = SORTS[self.sort]
+        if self.after is not None:
+            value, cv_id = self.after
+            field = ordering[0].lstrip('-')
+            direction = 'lt' if ordering[0].startswith('-') else 'gt'
+            # The first condition bounds the index range scan, the second drops the rows already shown
+            cvs = cvs.filter(
+                Q(**{f'{field}__{direction}e': value}),
+                Q(**{f'{field}__{direction}': value}) | Q(**{f'id__{direction}': cv_id}),
+            )
+        return cvs.order_by(*ordering)
+
+    def page(self, user):
+        """
+        Queryset of the next page of cards, one card longer than the page so
+        that split_page() can tell whether another page follows.
+        """
+        return (
+            self.queryset(user)
+            .only(*CARD_FIELDS)
+            .annotate(
+                experience_count=section_count(Experience),
+                education_count=section_count(Education),
+                skill_count=section_count(Skill),
+            )[:page_size() + 1]
+        )
+
+    def split_page(self, cvs):
+        """(cards to show, cursor of the next page or '')."""
+        size = page_size()
+        if len(cvs) <= size:
+            return cvs, ''
+        cvs = cvs[:size]
+        return cvs, encode_cursor(cvs[-1], self.sort)
+
+
+def _start_of_day(value):
+    return timezone.make_aware(datetime.datetime.combine(parse_date(value), datetime.time.min))
+
+
+def summary(user):
+    """Queryset of the user's most recent CV, annotated with their CV count."""
+    total = CV.objects.filter(user=user).order_by().values('user').annotate(total=Count('pk')).values('total')
+    return (
+        CV.objects.filter(user=user)
+        .only('id', 'created_at', 'updated_at')
+        .annotate(total_cvs=Subquery(total))
+        .order_by('-created_at', '-id')[:1]
+    )
@@ -0,0 +1,58 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from cv_app import benchmarks
+
+class Command(BaseCommand):
+    help = 'Benchmark dashboard, preview, edit and PDF download on a synthetic CV corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1, help='Number of synthetic users')
+        parser.add_argument('--cvs-per-user', type=int, default=1, help='CVs owned by each user (1 to 10000)')
+        parser.add_argument('--cv-size', choices=sorted(benchmarks.CV_SIZES), default='median', help='How many sections each CV has')
+        parser.add_argument('--iterations', type=int, default=20, help='Requests per entry point')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Compare against results stored in this JSON file')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown against the baseline (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['cvs_per_user'] <= 10000:
+            raise CommandError('--cvs-per-user must be between 1 and 10000')
+
+        # The corpus only lives for the duration of the run
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                override_settings(PDF_CACHE_DIR=cache_dir, ALLOWED_HOSTS=['testserver']), \
+                transaction.atomic():
+            results = benchmarks.run(
+                users=options['users'],
+                cvs_per_user=options['cvs_per_user'],
+                size=options['cv_size'],
+                iterations=options['iterations'],
+            )
+            transaction.set_rollback(True)
+
+        for name, metrics in results['results'].items():
+            self.stdout.write(
+                f"{name:<16} p50 {metrics['p50_ms']:>9.2f} ms  p95 {metrics['p95_ms']:>9.2f} ms  "
+                f"p99 {metrics['p99_ms']:>9.2f} ms  {metrics['queries']:>4} queries  "
+                f"{metrics['peak_memory_kb']:>9.1f} KiB peak"
+            )
+        pdf = results['results']['download_cv_pdf']
+        self.stdout.write(f"PDF throughput: {pdf['pdf_bytes_per_sec']} bytes/sec")
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                regressions = benchmarks.compare(results, json.load(baseline_file), options['threshold'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f'Regression: {regression}'))
+                raise CommandError(f'{len(regressions)} metrics regressed against the baseline')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
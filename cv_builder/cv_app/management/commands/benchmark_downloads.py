@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from cv_app import benchmarks
+
+class Command(BaseCommand):
+    help = 'Measure peak RSS per concurrent PDF download, buffered in memory vs streamed from disk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,4,16', help='Comma separated numbers of concurrent downloads')
+        parser.add_argument('--cv-size', choices=sorted(benchmarks.CV_SIZES), default='huge', help='How many sections the CV has')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma separated list of numbers')
+
+        results = []
+        for concurrency in levels:
+            for mode in benchmarks.DOWNLOAD_MODES:
+                result = benchmarks.download_memory(mode, concurrency=concurrency, size=options['cv_size'])
+                results.append(result)
+                self.stdout.write(
+                    f"{mode:<9} x{concurrency:<4} peak RSS {result['peak_rss_kb']:>8} KiB  "
+                    f"+{result['per_download_kb']:>8.1f} KiB per download"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,26 @@
+import json
+
+from django.core.management.base import BaseCommand
+from cv_app import benchmarks
+
+class Command(BaseCommand):
+    help = 'Compare cold PDF builds with rebuilds after a one-field edit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cv-size', choices=sorted(benchmarks.CV_SIZES), default='huge', help='How many sections the CV has')
+        parser.add_argument('--iterations', type=int, default=10, help='Builds per scenario')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        results = benchmarks.pdf_incremental(size=options['cv_size'], iterations=options['iterations'])
+
+        for name in ['cold', 'after_one_field_edit']:
+            self.stdout.write(
+                f"{name:<21} flowables {results[name]['build_ms']:>8.2f} ms  "
+                f"full render {results[name]['render_ms']:>8.2f} ms"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
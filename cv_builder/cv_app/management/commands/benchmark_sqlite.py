@@ -0,0 +1,39 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from cv_app import benchmarks
+
+class Command(BaseCommand):
+    help = "Compare SQLite reader/writer throughput with Django's defaults and with our tuned settings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent reader threads')
+        parser.add_argument('--writers', type=int, default=4, help='Concurrent writer threads')
+        parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each run')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        profiles = {
+            'default': benchmarks.SQLITE_DEFAULT_PROFILE,
+            'tuned': benchmarks.sqlite_profile(settings.DATABASES['default']),
+        }
+
+        results = {}
+        for name, profile in profiles.items():
+            results[name] = benchmarks.sqlite_concurrency(
+                profile,
+                readers=options['readers'],
+                writers=options['writers'],
+                seconds=options['seconds'],
+            )
+            self.stdout.write(
+                f"{name:<8} {results[name]['reads_per_sec']:>9} reads/s  "
+                f"{results[name]['writes_per_sec']:>7} writes/s  "
+                f"{results[name]['locked_errors']:>6} 'database is locked' errors"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from cv_app.cloning import clone_cvs
+from cv_app.models import CV
+
+class Command(BaseCommand):
+    help = "Copy CVs (with all their sections) to another user, e.g. to seed a new user from a company template"
+
+    def add_arguments(self, parser):
+        parser.add_argument('to_user', help='Username that receives the copies')
+        parser.add_argument('--from-user', help='Copy every CV owned by this username')
+        parser.add_argument('--ids', type=int, nargs='+', help='Copy these CV ids')
+
+    def handle(self, *args, **options):
+        if not (options['from_user'] or options['ids']):
+            raise CommandError('Choose the CVs to copy with --from-user or --ids')
+
+        try:
+            target = User.objects.get(username=options['to_user'])
+        except User.DoesNotExist:
+            raise CommandError(f'Unknown user "{options["to_user"]}"')
+
+        cvs = CV.objects.order_by('id')
+        if options['from_user']:
+            cvs = cvs.filter(user__username=options['from_user'])
+        if options['ids']:
+            cvs = cvs.filter(id__in=options['ids'])
+
+        new_cvs = clone_cvs(cvs, target)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Copied {len(new_cvs)} CVs to {target.username}')
+        )
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from cv_app.models import CV
+from cv_app.cv_data import aggregate_queryset
+from cv_app.snapshots import SNAPSHOT_VERSION, refresh_snapshots, snapshot_matches_sections
+
+class Command(BaseCommand):
+    help = 'Backfill or verify the denormalized JSON snapshots of CVs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild every snapshot, not just missing or outdated ones')
+        parser.add_argument('--verify', action='store_true', help='Compare stored snapshots with the section tables instead of rebuilding')
+        parser.add_argument('--fix', action='store_true', help='With --verify, rebuild the snapshots that do not match')
+        parser.add_argument('--batch-size', type=int, default=500, help='CVs per transaction')
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self.verify(options)
+        else:
+            self.backfill(options)
+
+    def backfill(self, options):
+        cvs = CV.objects.order_by('id')
+        if not options['all']:
+            cvs = cvs.exclude(snapshot__version=SNAPSHOT_VERSION)
+        cv_ids = list(cvs.values_list('id', flat=True))
+
+        rebuilt = 0
+        for start in range(0, len(cv_ids), options['batch_size']):
+            with transaction.atomic():
+                rebuilt += refresh_snapshots(cv_ids[start:start + options['batch_size']])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {rebuilt} CV snapshots')
+        )
+
+    def verify(self, options):
+        # The CVs are streamed and their sections prefetched batch_size CVs at a time
+        cvs = aggregate_queryset().order_by('id').iterator(chunk_size=options['batch_size'])
+        stale = [cv.id for cv in cvs if not snapshot_matches_sections(cv)]
+        for cv_id in stale:
+            self.stdout.write(self.style.WARNING(f'CV {cv_id}: snapshot is missing or out of date'))
+
+        if stale and options['fix']:
+            with transaction.atomic():
+                refresh_snapshots(stale)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(stale)} CV snapshots'))
+        elif stale:
+            raise CommandError(f'{len(stale)} CV snapshots are missing or out of date')
+        else:
+            self.stdout.write(self.style.SUCCESS('All CV snapshots are up to date'))
@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from cv_app import pdf_export
+
+class Command(BaseCommand):
+    help = 'Export CVs as PDFs into a ZIP archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP file to write')
+        parser.add_argument('--user', help='Only export CVs owned by this username')
+        parser.add_argument('--ids', type=int, nargs='+', help='Only export these CV ids')
+        parser.add_argument('--all', action='store_true', help='Export every CV')
+        parser.add_argument('--workers', type=int, default=None, help='Number of render processes (default: CPU count)')
+
+    def handle(self, *args, **options):
+        if not (options['user'] or options['ids'] or options['all']):
+            raise CommandError('Choose the CVs to export with --user, --ids or --all')
+
+        owner = None
+        if options['user']:
+            try:
+                owner = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'Unknown user "{options["user"]}"')
+
+        cvs = pdf_export.select_cvs(user=owner, ids=options['ids'])
+        with open(options['output'], 'wb') as output:
+            count = pdf_export.write_zip(cvs, output, workers=options['workers'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Exported {count} CVs to {options["output"]}')
+        )
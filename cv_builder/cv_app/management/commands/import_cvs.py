@@ -0,0 +1,96 @@
+import csv
+import json
+import os
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from cv_app import importing, template_registry
+
+class Command(BaseCommand):
+    help = 'Import CVs from a JSON Resume (.json, .jsonl) or CSV file in batches; --resume continues an interrupted run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--format', choices=importing.FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--user', help='Owner of CVs that do not name an existing username')
+        parser.add_argument('--template', type=int, help='Template id for the new CVs (defaults to the model default)')
+        parser.add_argument('--batch-size', type=int, default=importing.DEFAULT_BATCH_SIZE,
+                            help='CVs written per transaction')
+        parser.add_argument('--resume', action='store_true', help='Skip the records a previous run already imported')
+        parser.add_argument('--progress', help='Progress file (default: <path>.progress.json)')
+        parser.add_argument('--errors', help='CSV report of rejected records (default: <path>.errors.csv)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or importing.detect_format(path)
+        if fmt is None:
+            raise CommandError('Cannot tell the format from the file name, pass --format')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        owner = None
+        if options['user']:
+            try:
+                owner = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'Unknown user "{options["user"]}"')
+
+        if options['template'] is not None:
+            if template_registry.get(options['template']) is None:
+                raise CommandError(f'Unknown template {options["template"]}')
+            template_id = options['template']
+        else:
+            template_id = importing.default_template_id()
+
+        progress_path = options['progress'] or f'{path}.progress.json'
+        errors_path = options['errors'] or f'{path}.errors.csv'
+        progress = {'source': os.path.abspath(path), 'consumed': 0, 'imported': 0, 'failed': 0}
+        if options['resume'] and os.path.exists(progress_path):
+            with open(progress_path) as progress_file:
+                progress = json.load(progress_file)
+            if progress['source'] != os.path.abspath(path):
+                raise CommandError(f'{progress_path} belongs to an import of {progress["source"]}')
+            self.stdout.write(f"Resuming after record {progress['consumed']}")
+        else:
+            with open(errors_path, 'w', newline='') as errors_file:
+                csv.writer(errors_file).writerow(['record', 'full_name', 'errors'])
+
+        start = time.perf_counter()
+        imported = 0
+        with open(path, encoding='utf-8-sig', newline='') as stream, \
+                open(errors_path, 'a', newline='') as errors_file:
+            report = csv.writer(errors_file)
+            try:
+                for result in importing.import_records(
+                        stream, fmt, owner=owner, template_id=template_id,
+                        batch_size=options['batch_size'], skip=progress['consumed']):
+                    for number, name, messages in result.errors:
+                        report.writerow([number, name, '; '.join(messages)])
+                    errors_file.flush()
+
+                    # Saved after the batch committed: a crash in between re-imports at most one batch
+                    imported += result.imported
+                    progress.update(
+                        consumed=result.consumed,
+                        imported=progress['imported'] + result.imported,
+                        failed=progress['failed'] + len(result.errors),
+                    )
+                    with open(f'{progress_path}.tmp', 'w') as progress_file:
+                        json.dump(progress, progress_file)
+                    os.replace(f'{progress_path}.tmp', progress_path)
+
+                    self.stdout.write(
+                        f"{progress['consumed']} records read, {progress['imported']} imported, "
+                        f"{progress['failed']} rejected"
+                    )
+            except ValueError as exc:
+                raise CommandError(f'{exc} (after record {progress["consumed"]}, rerun with --resume)')
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {progress['imported']} CVs, {progress['failed']} rejected "
+            f"({imported / elapsed if elapsed else 0:.0f} CVs/sec this run)"
+        ))
+        if progress['failed']:
+            self.stdout.write(f'Rejected records are listed in {errors_path}')
@@ -0,0 +1,50 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from cv_app import benchmarks
+
+class Command(BaseCommand):
+    help = 'Load test running servers (e.g. WSGI vs ASGI) with many concurrent keep-alive connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='name=base URL of a running server, e.g. wsgi=http://127.0.0.1:8001 (repeatable)')
+        parser.add_argument('--path', action='append', default=None,
+                            help='Path to request on every target, e.g. /dashboard/ (repeatable)')
+        parser.add_argument('--connections', type=int, default=500, help='Concurrent connections')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Duration of each run')
+        parser.add_argument('--user', help='Send the requests logged in as this user (the servers must share this database)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, base_url = target.partition('=')
+            if not sep or not base_url.startswith('http://'):
+                raise CommandError(f'--target must look like name=http://host:port, got "{target}"')
+            targets.append((name, base_url.rstrip('/')))
+
+        headers = {}
+        if options['user']:
+            session_key = benchmarks.login_session(options['user'])
+            headers['Cookie'] = f'{settings.SESSION_COOKIE_NAME}={session_key}'
+
+        results = []
+        for path in options['path'] or ['/dashboard/']:
+            for name, base_url in targets:
+                result = benchmarks.http_load(
+                    base_url + path, connections=options['connections'], seconds=options['seconds'], headers=headers,
+                )
+                result['target'] = name
+                results.append(result)
+                self.stdout.write(
+                    f"{name:<6} {path:<28} {result['requests_per_sec']:>8} req/s  "
+                    f"p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  "
+                    f"statuses {result['statuses']}  {result['errors']} errors"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
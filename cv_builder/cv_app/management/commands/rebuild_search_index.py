@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from cv_app import search
+from cv_app.models import CV
+from cv_app.snapshots import SNAPSHOT_VERSION, refresh_snapshots
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text CV search index from the CV snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='CVs per transaction')
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            raise CommandError('The search index needs an SQLite database with FTS5')
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            search.clear()
+
+        # Walk the CVs in id order, one batch per transaction, so no id list is ever held whole
+        indexed = 0
+        last_id = 0
+        while True:
+            rows = list(CV.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'snapshot')[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            current = [snapshot for _, snapshot in rows if snapshot and snapshot.get('version') == SNAPSHOT_VERSION]
+            # CVs without a usable snapshot are rebuilt, which also indexes them
+            stale = [cv_id for cv_id, snapshot in rows if not snapshot or snapshot.get('version') != SNAPSHOT_VERSION]
+            with transaction.atomic():
+                search.index_snapshots(current)
+                if stale:
+                    refresh_snapshots(stale)
+            indexed += len(rows)
+
+        # Merge the index b-trees written batch by batch into one
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {search.TABLE} ({search.TABLE}) VALUES ('optimize')")
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} CVs')
+        )
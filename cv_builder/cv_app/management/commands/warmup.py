@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from cv_app import warmup
+
+class Command(BaseCommand):
+    help = (
+        'Compile the Django templates, load the CV template registry and warm the PDF renderer, '
+        'reporting the time each step takes (workers do this on startup, see WARMUP_ON_STARTUP)'
+    )
+
+    def handle(self, *args, **options):
+        total = 0
+        for step, detail, seconds in warmup.run():
+            total += seconds
+            self.stdout.write(f'{step}: {detail} in {seconds * 1000:.0f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Warmed up in {total * 1000:.0f} ms'))
@@ -0,0 +1,134 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+SECTION_MODELS = ['Experience', 'Education', 'Skill', 'Project', 'Certification', 'Achievement', 'Reference']
+
+
+def number_existing_rows(apps, schema_editor):
+    # Freeze the current (insertion) order of every section into sort_order
+    for model_name in SECTION_MODELS:
+        model = apps.get_model('cv_app', model_name)
+        batch = []
+        current_cv = None
+        position = 0
+        for row in model.objects.order_by('cv_id', 'id').only('id', 'cv_id').iterator():
+            if row.cv_id != current_cv:
+                current_cv = row.cv_id
+                position = 0
+            row.sort_order = position
+            position += 1
+            batch.append(row)
+            if len(batch) >= 1000:
+                model.objects.bulk_update(batch, ['sort_order'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['sort_order'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_app', '0004_cvtemplate_cv_template'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='achievement',
+            options={'ordering': ['sort_order', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='certification',
+            options={'ordering': ['sort_order', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='education',
+            options={'ordering': ['sort_order', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='experience',
+            options={'ordering': ['sort_order', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='project',
+            options={'ordering': ['sort_order', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='reference',
+            options={'ordering': ['sort_order', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='skill',
+            options={'ordering': ['sort_order', 'id']},
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='sort_order',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='certification',
+            name='sort_order',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='education',
+            name='sort_order',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='experience',
+            name='sort_order',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='sort_order',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reference',
+            name='sort_order',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='sort_order',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='achievement',
+            index=models.Index(fields=['cv', 'sort_order'], name='achievement_cv_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certification',
+            index=models.Index(fields=['cv', 'sort_order'], name='certification_cv_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=models.Index(fields=['user', '-created_at'], name='cv_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='education',
+            index=models.Index(fields=['cv', 'sort_order'], name='education_cv_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='experience',
+            index=models.Index(fields=['cv', 'sort_order'], name='experience_cv_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['cv', 'sort_order'], name='project_cv_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reference',
+            index=models.Index(fields=['cv', 'sort_order'], name='reference_cv_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(fields=['cv', 'sort_order'], name='skill_cv_order_idx'),
+        ),
+        migrations.RunPython(number_existing_rows, migrations.RunPython.noop),
+    ]
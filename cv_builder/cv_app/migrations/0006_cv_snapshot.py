@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_app', '0005_section_order_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cv',
+            name='snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
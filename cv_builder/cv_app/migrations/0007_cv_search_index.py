@@ -0,0 +1,30 @@
+from django.db import migrations
+
+# The search table as it was at this migration; later changes need migrations of their own
+CREATE_SEARCH_TABLE = (
+    'CREATE VIRTUAL TABLE cv_app_cv_search USING fts5('
+    'user_id UNINDEXED, title, full_name, summary, experience, education, skills, projects, other, '
+    "tokenize='porter unicode61')"
+)
+
+
+def create_search_table(apps, schema_editor):
+    # FTS5 is SQLite only; other databases simply get no search index
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CREATE_SEARCH_TABLE)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS cv_app_cv_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_app', '0006_cv_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
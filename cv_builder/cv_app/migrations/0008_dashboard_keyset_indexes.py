@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_app', '0007_cv_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cv',
+            name='cv_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='cv_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='cv_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=models.Index(fields=['user', 'title', 'id'], name='cv_user_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=models.Index(fields=['user', 'template', '-created_at', '-id'], name='cv_user_template_idx'),
+        ),
+    ]
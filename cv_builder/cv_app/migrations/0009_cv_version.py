@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_app', '0008_dashboard_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cv',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
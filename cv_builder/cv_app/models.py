@@ -59,10 +59,37 @@ class CV(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Denormalized copy of the CV and all its sections, see cv_app.snapshots
+    snapshot = models.JSONField(null=True, blank=True, editable=False)
+    
+    # Bumped by every save from the edit page, see cv_app.autosave
+    version = models.PositiveIntegerField(default=0, editable=False)
+    
+    class Meta:
+        indexes = [
+            # Dashboard: a user's CVs in each sort order of cv_app.listing, the id breaking ties
+            models.Index(fields=['user', '-created_at', '-id'], name='cv_user_created_idx'),
+            models.Index(fields=['user', '-updated_at', '-id'], name='cv_user_updated_idx'),
+            models.Index(fields=['user', 'title', 'id'], name='cv_user_title_idx'),
+            # Dashboard filtered by template, newest first
+            models.Index(fields=['user', 'template', '-created_at', '-id'], name='cv_user_template_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.full_name} - {self.title}"
 
-class Experience(models.Model):
+class CVSection(models.Model):
+    # Position of the entry within its section on the CV
+    sort_order = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        abstract = True
+        ordering = ['sort_order', 'id']
+        indexes = [
+            models.Index(fields=['cv', 'sort_order'], name='%(class)s_cv_order_idx'),
+        ]
+
+class Experience(CVSection):
     cv = models.ForeignKey(CV, on_delete=models.CASCADE, related_name='experiences')
     job_title = models.CharField(max_length=100)
     company = models.CharField(max_length=100)
@@ -74,7 +101,7 @@ class Experience(models.Model):
     def __str__(self):
         return f"{self.job_title} at {self.company}"
 
-class Education(models.Model):
+class Education(CVSection):
     cv = models.ForeignKey(CV, on_delete=models.CASCADE, related_name='educations')
     institution = models.CharField(max_length=100)
     degree = models.CharField(max_length=100)
@@ -86,7 +113,7 @@ class Education(models.Model):
     def __str__(self):
         return f"{self.degree} at {self.institution}"
 
-class Skill(models.Model):
+class Skill(CVSection):
     CATEGORY_CHOICES = [
         ('technical', 'Technical Skills'),
         ('soft', 'Soft Skills'), 
@@ -101,7 +128,7 @@ class Skill(models.Model):
     def __str__(self):
         return f"{self.name} ({self.category})"
 
-class Project(models.Model):
+class Project(CVSection):
     cv = models.ForeignKey(CV, on_delete=models.CASCADE, related_name='projects')
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -113,7 +140,7 @@ class Project(models.Model):
     def __str__(self):
         return self.name
 
-class Certification(models.Model):
+class Certification(CVSection):
     cv = models.ForeignKey(CV, on_delete=models.CASCADE, related_name='certifications')
     name = models.CharField(max_length=100)
     issuing_organization = models.CharField(max_length=100)
@@ -124,7 +151,7 @@ class Certification(models.Model):
     def __str__(self):
         return self.name
 
-class Achievement(models.Model):
+class Achievement(CVSection):
     cv = models.ForeignKey(CV, on_delete=models.CASCADE, related_name='achievements')
     title = models.CharField(max_length=100)
     issuing_organization = models.CharField(max_length=100, blank=True)
@@ -134,7 +161,7 @@ class Achievement(models.Model):
     def __str__(self):
         return self.title
 
-class Reference(models.Model):
+class Reference(CVSection):
     cv = models.ForeignKey(CV, on_delete=models.CASCADE, related_name='references')
     name = models.CharField(max_length=100)
     position = models.CharField(max_length=100)
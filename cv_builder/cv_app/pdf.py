@@ -0,0 +1,342 @@
+"""
+PDF rendering of CVs serialized by cv_data.cv_to_dict().
+
+Each part of the CV (header, summary and every section) has its own builder.
+The flowables a builder returns are cached in process memory under the CV id,
+a hash of the part's own data and the template's style version, so after an
+edit only the changed parts are rebuilt. Cached paragraphs also keep
+their line breaks, which makes most of the layout pass free for unchanged
+parts. Every render works on shallow copies, so concurrent renders never share
+a flowable that ReportLab is drawing.
+"""
+import copy
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.units import inch
+
+from .pdf_styles import get_styles, style_version
+
+
+class ReusableParagraph(Paragraph):
+    """
+    A Paragraph that remembers its line breaks per available width. Shallow
+    copies share the memo, so a paragraph is broken into lines once however
+    many PDFs it ends up in. Splitting at a page break edits the fragments of
+    the line breaks in place, so a paragraph that is split breaks its lines
+    again for itself and leaves the shared memo untouched.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._layouts = {}
+
+    def wrap(self, availWidth, availHeight):
+        layout = self._layouts.get(availWidth)
+        if layout is not None:
+            self.width = availWidth
+            self.blPara, self._wrapWidths, self.height = layout
+            return self.width, self.height
+        width, height = super().wrap(availWidth, availHeight)
+        if width:
+            self._layouts[availWidth] = (self.blPara, self._wrapWidths, height)
+        return width, height
+
+    def split(self, availWidth, availHeight):
+        self._layouts = {}
+        if hasattr(self, 'blPara'):
+            del self.blPara
+        return super().split(availWidth, availHeight)
+
+
+def build_header(data, styles):
+    cv = data['cv']
+    elements = []
+
+    # Header Section
+    elements.append(ReusableParagraph(cv['full_name'] or "Your Name", styles.title))
+
+    # Contact Information
+    contact_info = []
+    if cv['email']:
+        contact_info.append(cv['email'])
+    if cv['phone']:
+        contact_info.append(cv['phone'])
+    if cv['location']:
+        contact_info.append(cv['location'])
+
+    if contact_info:
+        elements.append(ReusableParagraph(" • ".join(contact_info), styles.normal))
+
+    # Links
+    links = []
+    if cv['linkedin_url']:
+        links.append("LinkedIn")
+    if cv['github_url']:
+        links.append("GitHub")
+
+    if links:
+        elements.append(ReusableParagraph(" • ".join(links), styles.normal))
+
+    elements.append(Spacer(1, 0.2 * inch))
+    return elements
+
+
+def build_summary(data, styles):
+    cv = data['cv']
+    elements = []
+    if cv['professional_summary']:
+        elements.append(ReusableParagraph("PROFESSIONAL SUMMARY", styles.heading))
+        elements.append(ReusableParagraph(cv['professional_summary'], styles.normal))
+        elements.append(Spacer(1, 0.2 * inch))
+    return elements
+
+
+def build_experiences(data, styles):
+    elements = []
+    if data['experiences']:
+        elements.append(ReusableParagraph("WORK EXPERIENCE", styles.heading))
+        for exp in data['experiences']:
+            # Job title and company
+            exp_title = f"<b>{exp['job_title']}</b> - {exp['company']}"
+            elements.append(ReusableParagraph(exp_title, styles.normal))
+
+            # Dates
+            date_range = f"{exp['start_date']} - {exp['end_date'] or 'Present'}"
+            elements.append(ReusableParagraph(date_range, styles.normal))
+
+            # Description
+            if exp['description']:
+                elements.append(ReusableParagraph(exp['description'], styles.normal))
+
+            # Achievements
+            if exp['achievements']:
+                elements.append(ReusableParagraph(f"<b>Achievements:</b> {exp['achievements']}", styles.normal))
+
+            elements.append(Spacer(1, 0.1 * inch))
+        elements.append(Spacer(1, 0.2 * inch))
+    return elements
+
+
+def build_educations(data, styles):
+    elements = []
+    if data['educations']:
+        elements.append(ReusableParagraph("EDUCATION", styles.heading))
+        for edu in data['educations']:
+            edu_title = f"<b>{edu['degree']}</b> - {edu['institution']}"
+            elements.append(ReusableParagraph(edu_title, styles.normal))
+
+            if edu['field_of_study']:
+                elements.append(ReusableParagraph(f"Field of Study: {edu['field_of_study']}", styles.normal))
+
+            date_range = f"{edu['start_date']} - {edu['end_date']}"
+            elements.append(ReusableParagraph(date_range, styles.normal))
+
+            if edu['description']:
+                elements.append(ReusableParagraph(edu['description'], styles.normal))
+
+            elements.append(Spacer(1, 0.1 * inch))
+        elements.append(Spacer(1, 0.2 * inch))
+    return elements
+
+
+def build_skills(data, styles):
+    elements = []
+    if data['skills']:
+        elements.append(ReusableParagraph("SKILLS", styles.heading))
+
+        # Group skills by category
+        skills_by_category = {}
+        for skill in data['skills']:
+            if skill['category'] not in skills_by_category:
+                skills_by_category[skill['category']] = []
+            skills_by_category[skill['category']].append(skill['name'])
+
+        for category, skill_list in skills_by_category.items():
+            category_name = category.replace('_', ' ').title()
+            skills_text = f"<b>{category_name}:</b> {', '.join(skill_list)}"
+            elements.append(ReusableParagraph(skills_text, styles.normal))
+
+        elements.append(Spacer(1, 0.2 * inch))
+    return elements
+
+
+def build_projects(data, styles):
+    elements = []
+    if data['projects']:
+        elements.append(ReusableParagraph("PROJECTS", styles.heading))
+        for project in data['projects']:
+            elements.append(ReusableParagraph(f"<b>{project['name']}</b>", styles.normal))
+
+            if project['technologies']:
+                elements.append(ReusableParagraph(f"Technologies: {project['technologies']}", styles.normal))
+
+            if project['description']:
+                elements.append(ReusableParagraph(project['description'], styles.normal))
+
+            elements.append(Spacer(1, 0.1 * inch))
+        elements.append(Spacer(1, 0.2 * inch))
+    return elements
+
+
+def build_certifications(data, styles):
+    elements = []
+    if data['certifications']:
+        elements.append(ReusableParagraph("CERTIFICATIONS", styles.heading))
+        for cert in data['certifications']:
+            cert_text = f"<b>{cert['name']}</b> - {cert['issuing_organization']}"
+            if cert['issue_date']:
+                cert_text += f" ({cert['issue_date']})"
+            elements.append(ReusableParagraph(cert_text, styles.normal))
+        elements.append(Spacer(1, 0.2 * inch))
+    return elements
+
+
+def build_achievements(data, styles):
+    elements = []
+    if data['achievements']:
+        elements.append(ReusableParagraph("ACHIEVEMENTS", styles.heading))
+        for achievement in data['achievements']:
+            achievement_text = f"<b>{achievement['title']}</b>"
+            if achievement['issuing_organization']:
+                achievement_text += f" - {achievement['issuing_organization']}"
+            if achievement['date']:
+                achievement_text += f" ({achievement['date']})"
+            elements.append(ReusableParagraph(achievement_text, styles.normal))
+
+            if achievement['description']:
+                elements.append(ReusableParagraph(achievement['description'], styles.normal))
+
+            elements.append(Spacer(1, 0.1 * inch))
+    return elements
+
+
+# CV fields the header and summary are built from (the snapshot parts of the same names)
+CV_PART_FIELDS = {
+    'header': ['full_name', 'email', 'phone', 'location', 'linkedin_url', 'github_url'],
+    'summary': ['professional_summary'],
+}
+
+# Parts of the PDF in page order; names match the snapshot part versions
+PART_BUILDERS = [
+    ('header', build_header),
+    ('summary', build_summary),
+    ('experiences', build_experiences),
+    ('educations', build_educations),
+    ('skills', build_skills),
+    ('projects', build_projects),
+    ('certifications', build_certifications),
+    ('achievements', build_achievements),
+]
+
+
+class FlowableCache:
+    """Least recently used cache of the flowables built for CV parts."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def max_entries(self):
+        return getattr(settings, 'PDF_FLOWABLE_CACHE_SIZE', 2000)
+
+    def get(self, key):
+        with self.lock:
+            elements = self.entries.get(key)
+            if elements is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return elements
+
+    def put(self, key, elements):
+        with self.lock:
+            self.entries[key] = elements
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries():
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+flowable_cache = FlowableCache()
+
+
+def part_hash(data, part):
+    """Hash of the data one part is built from."""
+    if part in CV_PART_FIELDS:
+        content = [data['cv'].get(field) for field in CV_PART_FIELDS[part]]
+    else:
+        content = data[part]
+    payload = json.dumps(content, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def build_cv_elements(data):
+    """
+    Build the list of ReportLab flowables for a CV serialized by cv_to_dict().
+    Parts with a version in ``data['versions']`` come from the flowable cache
+    when unchanged. The cache is keyed on the part's data rather than on the
+    version, so a version that does not match the data cannot serve a stale render.
+    """
+    # Styles, compiled once per template version
+    styles = get_styles(data['template'])
+    style_key = (data['template'] or {}).get('id'), style_version(data['template'])
+    versions = data.get('versions') or {}
+
+    elements = []
+    for part, builder in PART_BUILDERS:
+        version = versions.get(part)
+        if version is None:
+            elements.extend(builder(data, styles))
+            continue
+        key = (data['cv']['id'], part, part_hash(data, part), style_key)
+        part_elements = flowable_cache.get(key)
+        if part_elements is None:
+            part_elements = builder(data, styles)
+            flowable_cache.put(key, part_elements)
+        elements.extend(copy.copy(element) for element in part_elements)
+    return elements
+
+
+def layout_pdf(elements, output=None):
+    """
+    Lay out flowables on A4 pages. Writes the PDF to the ``output`` file
+    object when given, otherwise returns the PDF bytes.
+    """
+    buffer = io.BytesIO() if output is None else output
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72
+    )
+    doc.build(elements)
+    if output is None:
+        return buffer.getvalue()
+
+
+def render_cv_pdf(data):
+    """Render a CV serialized by cv_to_dict() and return the PDF bytes."""
+    return layout_pdf(build_cv_elements(data))
+
+
+def write_cv_pdf(data, output):
+    """Render a CV serialized by cv_to_dict() straight into a binary file object."""
+    layout_pdf(build_cv_elements(data), output)
@@ -0,0 +1,105 @@
+"""
+On-disk cache of rendered CV PDFs.
+
+Entries are content addressed: each file is named after the CV id and the
+fingerprint of everything that went into the render (see cv_data), so a stale
+entry can never be served for changed content. The directory is kept under
+PDF_CACHE_MAX_BYTES by evicting the least recently used files, using the file
+modification time as the access clock.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+def cache_dir():
+    path = Path(getattr(settings, 'PDF_CACHE_DIR', Path(settings.BASE_DIR) / 'pdf_cache'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def max_bytes():
+    return getattr(settings, 'PDF_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+
+def entry_path(cv_id, fingerprint):
+    return cache_dir() / f'cv{cv_id}-{fingerprint}.pdf'
+
+
+def get(cv_id, fingerprint):
+    """Return the path of the cached PDF, or None on a miss."""
+    path = entry_path(cv_id, fingerprint)
+    try:
+        # Touch the entry so it counts as recently used
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+@contextmanager
+def writing(cv_id, fingerprint):
+    """
+    Write a new entry through the yielded binary file, so a render can go
+    straight to disk. The entry only appears once the block completes.
+    """
+    path = entry_path(cv_id, fingerprint)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            yield tmp
+        # Drop older renders of the same CV, they can never be hit again
+        invalidate(cv_id)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    evict()
+
+
+def put(cv_id, fingerprint, pdf_bytes):
+    """Store rendered PDF bytes and return the path of the new entry."""
+    with writing(cv_id, fingerprint) as output:
+        output.write(pdf_bytes)
+    return entry_path(cv_id, fingerprint)
+
+
+def invalidate(cv_id):
+    """Remove every cached render of a CV."""
+    for path in cache_dir().glob(f'cv{cv_id}-*.pdf'):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def evict():
+    """Delete least recently used entries until the cache fits its size budget."""
+    entries = []
+    total = 0
+    for path in cache_dir().glob('cv*.pdf'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    limit = max_bytes()
+    if total <= limit:
+        return
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
@@ -0,0 +1,124 @@
+"""
+Bulk export of many CVs as a ZIP archive of PDFs.
+
+CVs are serialized here and rendered on a dedicated process pool. Each PDF
+is written into the archive as soon as it finishes, and the archive itself is
+produced as a stream of chunks, so neither the PDFs nor the ZIP are ever held
+in memory as a whole.
+"""
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from . import pdf_cache
+from .cv_data import CVAggregate, aggregate_queryset, cv_to_dict, cv_fingerprint
+from .pdf_renderer import load as load_renderer, render_cv_pdf
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def select_cvs(user=None, ids=None):
+    """CVs to export: all of them, or narrowed down by owner and/or ids."""
+    cvs = aggregate_queryset().select_related('user').order_by('id')
+    if user is not None:
+        cvs = cvs.filter(user=user)
+    if ids:
+        cvs = cvs.filter(id__in=ids)
+    return cvs
+
+
+def archive_name(cv):
+    title = cv.title.replace(' ', '_').replace('/', '_')
+    return f'{cv.user.username}/{cv.id}_{title}.pdf'
+
+
+def iter_rendered_pdfs(cvs, workers=None):
+    """
+    Yield (cv, pdf_bytes) pairs in completion order. Cached renders are used
+    as is; everything else is rendered in parallel, with only a few CVs in
+    flight at a time.
+    """
+    workers = workers or default_workers()
+    max_in_flight = workers * 2
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=load_renderer,
+    )
+    in_flight = {}
+    try:
+        for cv in cvs.iterator(chunk_size=100):
+            data = cv_to_dict(CVAggregate(cv))
+            fingerprint = cv_fingerprint(data)
+            path = pdf_cache.get(cv.id, fingerprint)
+            if path is not None:
+                try:
+                    with open(path, 'rb') as cached:
+                        pdf_bytes = cached.read()
+                except FileNotFoundError:
+                    pass  # Evicted since the lookup: render it like any other miss
+                else:
+                    yield cv, pdf_bytes
+                    continue
+
+            future = executor.submit(render_cv_pdf, data)
+            in_flight[future] = (cv, fingerprint)
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield _collect(in_flight, future)
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield _collect(in_flight, future)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _collect(in_flight, future):
+    cv, fingerprint = in_flight.pop(future)
+    pdf_bytes = future.result()
+    pdf_cache.put(cv.id, fingerprint, pdf_bytes)
+    return cv, pdf_bytes
+
+
+class _ChunkWriter:
+    """Write-only file object whose contents are drained after each entry."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(cvs, workers=None):
+    """Generate the bytes of a ZIP archive containing one PDF per CV."""
+    writer = _ChunkWriter()
+    # The writer is not seekable, so zipfile streams entries with data descriptors
+    with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for cv, pdf_bytes in iter_rendered_pdfs(cvs, workers):
+            archive.writestr(archive_name(cv), pdf_bytes)
+            yield writer.drain()
+    yield writer.drain()
+
+
+def write_zip(cvs, fileobj, workers=None):
+    """Write the archive to an open binary file; returns the number of CVs exported."""
+    count = 0
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for cv, pdf_bytes in iter_rendered_pdfs(cvs, workers):
+            archive.writestr(archive_name(cv), pdf_bytes)
+            count += 1
+    return count
@@ -0,0 +1,229 @@
+"""
+Background PDF rendering on a local process pool.
+
+ReportLab layout is pure-Python CPU work, so renders run in separate worker
+processes instead of request threads. Each web process has its own pool, but
+job state lives in PDF_JOB_CACHE_ALIAS, a cache every web process shares, and
+finished PDFs land in the shared pdf_cache, so any of them can answer the
+status and result polls of any job. Async views await renders on the same pool through
+render(), which keeps the event loop free while ReportLab runs.
+"""
+import asyncio
+import multiprocessing
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import pdf_cache
+from .pdf_renderer import load as load_renderer, render_cv_pdf
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+# Finished jobs are forgotten after this many seconds
+JOB_TTL = 600
+
+JOB_KEY = 'pdf_job:{}'
+# Id of the pending job rendering exactly this content, so duplicates can join it
+IN_FLIGHT_KEY = 'pdf_job:in_flight:{}:{}'
+
+_executor = None
+# Ids of the jobs queued on this process's pool
+_queued = set()
+_awaited_renders = 0
+_lock = threading.Lock()
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobTimeout(Exception):
+    pass
+
+
+class Job:
+    FIELDS = ['id', 'user_id', 'cv_id', 'fingerprint', 'filename', 'status', 'error', 'submitted_at']
+
+    def __init__(self, user_id, cv_id, fingerprint, filename, id=None, status=PENDING, error='', submitted_at=None):
+        self.id = id or uuid.uuid4().hex
+        self.user_id = user_id
+        self.cv_id = cv_id
+        self.fingerprint = fingerprint
+        self.filename = filename
+        self.status = status
+        self.error = error
+        # Wall clock, since other processes compare it with their own
+        self.submitted_at = time.time() if submitted_at is None else submitted_at
+
+    @classmethod
+    def load(cls, job_id):
+        record = cache().get(JOB_KEY.format(job_id))
+        return None if record is None else cls(**record)
+
+    def save(self):
+        cache().set(JOB_KEY.format(self.id), {name: getattr(self, name) for name in self.FIELDS}, timeout=JOB_TTL)
+
+    def finish(self, status, error=''):
+        self.status = status
+        self.error = error
+        self.save()
+
+    def check_timeout(self):
+        # Backstop for platforms where the worker cannot interrupt itself, or a process that died
+        if self.status == PENDING and time.time() - self.submitted_at > job_timeout() * 2:
+            self.finish(FAILED, 'Render timed out')
+
+    def as_dict(self):
+        return {
+            'job_id': self.id,
+            'cv_id': self.cv_id,
+            'status': self.status,
+            'error': self.error,
+        }
+
+
+def cache():
+    return caches[getattr(settings, 'PDF_JOB_CACHE_ALIAS', 'shared')]
+
+
+def async_enabled():
+    return worker_count() > 0
+
+
+def worker_count():
+    return getattr(settings, 'PDF_WORKERS', 2)
+
+
+def queue_size():
+    return getattr(settings, 'PDF_JOB_QUEUE_SIZE', 20)
+
+
+def job_timeout():
+    return getattr(settings, 'PDF_JOB_TIMEOUT', 30)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # Spawn rather than fork so workers never inherit open DB connections
+        _executor = ProcessPoolExecutor(
+            max_workers=worker_count(),
+            mp_context=multiprocessing.get_context('spawn'),
+            # Workers import ReportLab when they start, not during their first job
+            initializer=load_renderer,
+        )
+    return _executor
+
+
+def _raise_timeout(signum, frame):
+    raise JobTimeout()
+
+
+def _render_in_worker(data, timeout):
+    """Runs inside a pool process: render with a wall-clock limit."""
+    if hasattr(signal, 'SIGALRM'):
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return render_cv_pdf(data)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return render_cv_pdf(data)
+
+
+def submit(user_id, cv_id, fingerprint, filename, data):
+    """
+    Queue a render and return its Job. Raises QueueFull when too many jobs
+    are already waiting, so callers can push back on the client.
+    """
+    in_flight_key = IN_FLIGHT_KEY.format(cv_id, fingerprint)
+    with _lock:
+        # Reuse an in-flight job for exactly the same content, whichever process runs it
+        in_flight = cache().get(in_flight_key)
+        job = Job.load(in_flight) if in_flight else None
+        if job is not None:
+            job.check_timeout()
+            if job.status == PENDING:
+                return job
+
+        job = Job(user_id, cv_id, fingerprint, filename)
+        if pdf_cache.get(cv_id, fingerprint) is not None:
+            job.finish(DONE)
+            return job
+
+        if len(_queued) >= queue_size():
+            raise QueueFull()
+
+        future = _get_executor().submit(_render_in_worker, data, job_timeout())
+        _queued.add(job.id)
+        job.save()
+        cache().set(in_flight_key, job.id, timeout=job_timeout() * 2)
+
+    def on_done(future):
+        try:
+            pdf_bytes = future.result()
+        except JobTimeout:
+            job.finish(FAILED, 'Render timed out')
+        except Exception as exc:
+            job.finish(FAILED, str(exc) or exc.__class__.__name__)
+        else:
+            pdf_cache.put(cv_id, fingerprint, pdf_bytes)
+            job.finish(DONE)
+        with _lock:
+            _queued.discard(job.id)
+        cache().delete(in_flight_key)
+
+    future.add_done_callback(on_done)
+    return job
+
+
+def get_job(job_id, user_id):
+    """Look up a job owned by the given user, or None."""
+    job = Job.load(job_id)
+    if job is None or job.user_id != user_id:
+        return None
+    job.check_timeout()
+    return job
+
+
+async def render(data):
+    """
+    Render a PDF on the worker pool (or a thread when PDF_WORKERS is 0) and
+    return its bytes. Raises QueueFull when PDF_JOB_QUEUE_SIZE awaited renders
+    are already in progress, so the pool's queue stays bounded.
+    """
+    global _awaited_renders
+    with _lock:
+        if _awaited_renders >= queue_size():
+            raise QueueFull()
+        _awaited_renders += 1
+    try:
+        if async_enabled():
+            return await asyncio.wrap_future(_get_executor().submit(_render_in_worker, data, job_timeout()))
+        return await asyncio.to_thread(render_cv_pdf, data)
+    finally:
+        with _lock:
+            _awaited_renders -= 1
+
+
+@checks.register(checks.Tags.caches)
+def check_cache(app_configs, **kwargs):
+    if async_enabled() and isinstance(cache(), (LocMemCache, DummyCache)):
+        return [checks.Warning(
+            'PDF_JOB_CACHE_ALIAS is not shared between processes: a job status poll '
+            'answered by another process than the one that took the job gets a 404.',
+            hint='Point PDF_JOB_CACHE_ALIAS at a cache shared between processes.',
+            id='cv_app.W003',
+        )]
+    return []
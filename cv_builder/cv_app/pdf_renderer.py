@@ -0,0 +1,52 @@
+"""
+Lazily loaded entry point to the PDF renderer.
+
+Importing ReportLab is a good part of a worker's startup time and memory, so
+views, URLs and management commands never import cv_app.pdf at module level.
+They render through the functions here, which load it on first use. load()
+and warm() do that ahead of time, for processes that are about to render.
+
+This module is also what PDF worker processes unpickle their jobs from, so it
+imports nothing that needs the Django app registry.
+"""
+import sys
+
+
+def loaded():
+    """Whether ReportLab and the renderer have been imported in this process."""
+    return 'cv_app.pdf' in sys.modules
+
+
+def load():
+    from . import pdf
+    return pdf
+
+
+def render_cv_pdf(data):
+    """Render a CV serialized by cv_to_dict() and return the PDF bytes."""
+    return load().render_cv_pdf(data)
+
+
+def write_cv_pdf(data, output):
+    """Render a CV serialized by cv_to_dict() straight into a binary file object."""
+    load().write_cv_pdf(data, output)
+
+
+def warm():
+    """
+    Import the renderer, compile the ReportLab styles of every CV template and
+    lay out a sample PDF, so the first download does not pay for any of it.
+    Returns the number of stylesheets compiled.
+    """
+    from . import pdf_styles, template_registry
+    from .cv_data import SECTION_RELATIONS, CVAggregate, cv_to_dict, template_style
+    from .models import CV
+
+    styles = [None] + [template_style(template) for template in template_registry.templates().values()]
+    for style in styles:
+        pdf_styles.get_styles(style)
+
+    sample = CV(full_name='Warmup', email='warmup@example.com', phone='0', location='Here')
+    data = cv_to_dict(CVAggregate(sample, sections={relation: () for relation in SECTION_RELATIONS}))
+    render_cv_pdf(data)
+    return len(styles)
@@ -0,0 +1,148 @@
+"""
+Compiled ReportLab styles for each CV template.
+
+A stylesheet is built the first time a template is rendered and kept in
+process memory, keyed by the template id and a version stamp derived from its
+styling fields. Editing a template changes the stamp, so the next render
+compiles a fresh stylesheet and the stale one is dropped.
+"""
+import hashlib
+import threading
+
+from reportlab.lib import colors
+from reportlab.lib.fonts import addMapping
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+
+DEFAULT_PRIMARY_COLOR = '#2c3e50'
+DEFAULT_SECONDARY_COLOR = '#3498db'
+DEFAULT_ACCENT_COLOR = '#e74c3c'
+
+# Built-in PDF font families: family -> (regular, bold, italic, bold italic)
+FONT_FAMILIES = {
+    'Helvetica': ('Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique', 'Helvetica-BoldOblique'),
+    'Times': ('Times-Roman', 'Times-Bold', 'Times-Italic', 'Times-BoldItalic'),
+    'Courier': ('Courier', 'Courier-Bold', 'Courier-Oblique', 'Courier-BoldOblique'),
+}
+
+# CSS font names (as stored in CVTemplate.font_family) -> PDF font family
+CSS_FONTS = {
+    'arial': 'Helvetica',
+    'helvetica': 'Helvetica',
+    'helvetica neue': 'Helvetica',
+    'verdana': 'Helvetica',
+    'sans-serif': 'Helvetica',
+    'georgia': 'Times',
+    'times': 'Times',
+    'times new roman': 'Times',
+    'garamond': 'Times',
+    'serif': 'Times',
+    'courier': 'Courier',
+    'courier new': 'Courier',
+    'monospace': 'Courier',
+}
+
+_registry = {}
+_lock = threading.Lock()
+
+
+class CVStyles:
+    """The paragraph styles used by the PDF renderer."""
+
+    def __init__(self, title, heading, normal):
+        self.title = title
+        self.heading = heading
+        self.normal = normal
+
+
+def register_fonts():
+    """
+    Load the metrics of every face we may use and map bold/italic variants,
+    so no font lookup happens while a PDF is being built.
+    """
+    for family, faces in FONT_FAMILIES.items():
+        for face in faces:
+            pdfmetrics.getFont(face)
+        regular, bold, italic, bold_italic = faces
+        addMapping(regular, 0, 0, regular)
+        addMapping(regular, 1, 0, bold)
+        addMapping(regular, 0, 1, italic)
+        addMapping(regular, 1, 1, bold_italic)
+
+
+def resolve_font_family(css_font_family):
+    """First font in a CSS font-family list that maps to a PDF font family."""
+    for name in (css_font_family or '').split(','):
+        family = CSS_FONTS.get(name.strip().strip('\'"').lower())
+        if family:
+            return family
+    return 'Helvetica'
+
+
+def parse_color(value, default):
+    try:
+        return colors.HexColor(value)
+    except (TypeError, ValueError):
+        return colors.HexColor(default)
+
+
+def style_version(template):
+    """Version stamp of a template's styling fields."""
+    if not template:
+        return 'default'
+    payload = '|'.join(str(template.get(name, '')) for name in sorted(template))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def compile_styles(template):
+    template = template or {}
+    regular, bold = FONT_FAMILIES[resolve_font_family(template.get('font_family'))][:2]
+    styles = getSampleStyleSheet()
+
+    normal = ParagraphStyle('CVNormal', parent=styles['Normal'], fontName=regular)
+    title = ParagraphStyle(
+        'CVTitle',
+        parent=styles['Heading1'],
+        fontName=bold,
+        fontSize=18,
+        spaceAfter=12,
+        textColor=parse_color(template.get('primary_color'), DEFAULT_PRIMARY_COLOR)
+    )
+    heading = ParagraphStyle(
+        'CVHeading',
+        parent=styles['Heading2'],
+        fontName=bold,
+        fontSize=12,
+        spaceAfter=6,
+        textColor=parse_color(template.get('secondary_color'), DEFAULT_SECONDARY_COLOR)
+    )
+    return CVStyles(title=title, heading=heading, normal=normal)
+
+
+def get_styles(template):
+    """
+    Compiled styles for a template serialized by cv_data.cv_to_dict(), or the
+    default look when the CV has no template.
+    """
+    template_id = template.get('id') if template else None
+    version = style_version(template)
+    key = (template_id, version)
+    styles = _registry.get(key)
+    if styles is None:
+        with _lock:
+            styles = _registry.get(key)
+            if styles is None:
+                styles = compile_styles(template)
+                # Forget stylesheets compiled from older versions of this template
+                for stale in [k for k in _registry if k[0] == template_id]:
+                    del _registry[stale]
+                _registry[key] = styles
+    return styles
+
+
+def clear():
+    with _lock:
+        _registry.clear()
+
+
+register_fonts()
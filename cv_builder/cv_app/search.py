@@ -0,0 +1,142 @@
+"""
+Full-text CV search backed by an SQLite FTS5 table.
+
+The cv_app_cv_search table (created by migration 0007) has one row per CV,
+keyed by the CV id, with the searchable text of every section grouped into a
+few weighted columns. Rows are built from CV snapshots and replaced whenever a
+snapshot is written, so the index follows every write path that keeps
+snapshots current.
+"""
+from django.db import connection
+from django.utils.html import escape
+
+TABLE = 'cv_app_cv_search'
+
+# Indexed columns, in table order, with their bm25 weights
+COLUMNS = [
+    ('title', 2.0),
+    ('full_name', 2.0),
+    ('summary', 1.0),
+    ('experience', 3.0),
+    ('education', 1.0),
+    ('skills', 4.0),
+    ('projects', 1.0),
+    ('other', 0.5),
+]
+
+# Marks around matched terms in snippets, swapped for <mark> after escaping
+_OPEN, _CLOSE = '\x02', '\x03'
+
+
+def enabled():
+    return connection.vendor == 'sqlite'
+
+
+def _join(rows, fields):
+    return '\n'.join(' '.join(str(row[field]) for field in fields if row.get(field)) for row in rows)
+
+
+def document(snapshot):
+    """Column values to index for a CV snapshot."""
+    cv = snapshot['cv']
+    return [
+        cv['title'],
+        cv['full_name'],
+        '\n'.join(filter(None, [cv['professional_summary'], cv['additional_info'], cv['languages']])),
+        _join(snapshot['experiences'], ['job_title', 'company', 'description', 'achievements']),
+        _join(snapshot['educations'], ['degree', 'institution', 'field_of_study', 'description']),
+        _join(snapshot['skills'], ['name']),
+        _join(snapshot['projects'], ['name', 'technologies', 'description']),
+        '\n'.join([
+            _join(snapshot['certifications'], ['name', 'issuing_organization']),
+            _join(snapshot['achievements'], ['title', 'issuing_organization', 'description']),
+        ]),
+    ]
+
+
+def index_snapshots(snapshots):
+    """Add or replace the index rows of CVs, given their snapshots."""
+    if not enabled():
+        return
+    snapshots = [snapshot for snapshot in snapshots if snapshot]
+    if not snapshots:
+        return
+    placeholders = ', '.join(['%s'] * (len(COLUMNS) + 2))
+    columns = ', '.join(name for name, _ in COLUMNS)
+    with connection.cursor() as cursor:
+        remove_cvs([snapshot['cv']['id'] for snapshot in snapshots])
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, user_id, {columns}) VALUES ({placeholders})',
+            [[snapshot['cv']['id'], snapshot['cv']['user_id']] + document(snapshot) for snapshot in snapshots],
+        )
+
+
+def remove_cvs(cv_ids):
+    if not enabled():
+        return
+    cv_ids = list(cv_ids)
+    if not cv_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid IN ({', '.join(['%s'] * len(cv_ids))})", cv_ids)
+
+
+def clear():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+
+def match_expression(query):
+    """
+    Turn free text into a safe FTS5 query: every word must match, as a
+    prefix, and FTS5 operators typed by the user are treated as plain text.
+    """
+    terms = [term.replace('"', '') for term in query.split()]
+    return ' AND '.join(f'"{term}"*' for term in terms if term)
+
+
+def _highlight(text):
+    return escape(text).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+
+def search(query, page=1, per_page=20, user_id=None):
+    """
+    Ranked search over all indexed CVs. Returns (total, results) where each
+    result has the CV id, owner id, title, name, rank and an HTML snippet
+    with the matched terms in <mark> tags.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return 0, []
+
+    where = f'{TABLE} MATCH %s'
+    params = [expression]
+    if user_id is not None:
+        where += ' AND user_id = %s'
+        params.append(user_id)
+
+    weights = ', '.join(str(weight) for _, weight in COLUMNS)
+    offset = (page - 1) * per_page
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {TABLE} WHERE {where}', params)
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            f"SELECT rowid, user_id, title, full_name, bm25({TABLE}, 0, {weights}) AS rank, "
+            f"snippet({TABLE}, -1, '{_OPEN}', '{_CLOSE}', '…', 16) "
+            f"FROM {TABLE} WHERE {where} ORDER BY rank LIMIT %s OFFSET %s",
+            params + [per_page, offset],
+        )
+        rows = cursor.fetchall()
+
+    results = [
+        {
+            'cv_id': cv_id,
+            'user_id': int(owner_id),
+            'title': title,
+            'full_name': full_name,
+            'rank': round(rank, 4),
+            'snippet': _highlight(snippet),
+        }
+        for cv_id, owner_id, title, full_name, rank, snippet in rows
+    ]
+    return total, results
@@ -0,0 +1,132 @@
+"""
+Batched persistence of the repeating CV sections submitted by edit_cv.
+
+Submitted rows are matched to stored rows by position. Unchanged rows are
+left alone, changed rows go through one bulk_update, new rows through one
+bulk_create and dropped rows through one filtered delete per model.
+"""
+from .models import Experience, Education, Skill, Project, Certification, Achievement, Reference
+
+
+class SectionForm:
+    """How one section model maps onto the repeated inputs of the edit form."""
+
+    def __init__(self, model, relation, fields, required):
+        self.model = model
+        self.relation = relation
+        # Model field name -> form input name
+        self.fields = fields
+        # Rows missing any of these fields are ignored
+        self.required = required
+
+    def rows_from_post(self, post):
+        columns = {field: post.getlist(input_name) for field, input_name in self.fields.items()}
+        count = len(columns[self.required[0]])
+        return [
+            {field: values[i] if i < len(values) else '' for field, values in columns.items()}
+            for i in range(count)
+        ]
+
+
+SECTION_FORMS = [
+    SectionForm(Experience, 'experiences', {
+        'job_title': 'experience_job_title',
+        'company': 'experience_company',
+        'start_date': 'experience_start_date',
+        'end_date': 'experience_end_date',
+        'description': 'experience_description',
+        'achievements': 'experience_achievements',
+    }, required=['job_title', 'company']),
+    SectionForm(Education, 'educations', {
+        'institution': 'education_institution',
+        'degree': 'education_degree',
+        'field_of_study': 'education_field_of_study',
+        'start_date': 'education_start_date',
+        'end_date': 'education_end_date',
+        'description': 'education_description',
+    }, required=['institution', 'degree']),
+    SectionForm(Skill, 'skills', {
+        'name': 'skill_name',
+        'category': 'skill_category',
+    }, required=['name', 'category']),
+    SectionForm(Project, 'projects', {
+        'name': 'project_name',
+        'technologies': 'project_technologies',
+        'project_url': 'project_url',
+        'start_date': 'project_start_date',
+        'end_date': 'project_end_date',
+        'description': 'project_description',
+    }, required=['name']),
+    SectionForm(Certification, 'certifications', {
+        'name': 'certification_name',
+        'issuing_organization': 'certification_organization',
+        'issue_date': 'certification_issue_date',
+        'expiry_date': 'certification_expiry_date',
+        'credential_url': 'certification_url',
+    }, required=['name', 'issuing_organization']),
+    SectionForm(Achievement, 'achievements', {
+        'title': 'achievement_title',
+        'issuing_organization': 'achievement_organization',
+        'date': 'achievement_date',
+        'description': 'achievement_description',
+    }, required=['title']),
+    SectionForm(Reference, 'references', {
+        'name': 'reference_name',
+        'position': 'reference_position',
+        'company': 'reference_company',
+        'email': 'reference_email',
+        'phone': 'reference_phone',
+        'relationship': 'reference_relationship',
+    }, required=['name']),
+]
+
+
+def sync_section(cv, section, rows):
+    """
+    Bring the stored rows of one section in line with the submitted rows.
+    Returns the section's rows as now stored, in display order.
+    """
+    model = section.model
+    # Sorted in Python so rows prefetched by load_cv_aggregate() are reused
+    existing = sorted(getattr(cv, section.relation).all(), key=lambda obj: (obj.sort_order, obj.pk))
+
+    to_update = []
+    to_create = []
+    changed_fields = set()
+    for i, row in enumerate(rows):
+        if not all(row[field] for field in section.required):
+            continue
+        values = {**row, 'sort_order': i}
+        if i < len(existing):
+            obj = existing[i]
+            changed = [field for field, value in values.items() if getattr(obj, field) != value]
+            if changed:
+                for field in changed:
+                    setattr(obj, field, values[field])
+                changed_fields.update(changed)
+                to_update.append(obj)
+        else:
+            to_create.append(model(cv=cv, **values))
+
+    stale_ids = [obj.pk for obj in existing[len(rows):]]
+
+    if to_update:
+        model.objects.bulk_update(to_update, sorted(changed_fields))
+    if to_create:
+        model.objects.bulk_create(to_create)
+    if stale_ids:
+        model.objects.filter(pk__in=stale_ids).delete()
+
+    kept = existing[:len(rows)] + to_create
+    return tuple(sorted(kept, key=lambda obj: (obj.sort_order, obj.pk)))
+
+
+def sync_sections_from_post(cv, post):
+    """
+    Sync every section from an edit_cv POST. Call inside a transaction.
+    Returns {relation: rows as now stored} for every section.
+    """
+    return {
+        section.relation: sync_section(cv, section, section.rows_from_post(post))
+        for section in SECTION_FORMS
+    }
@@ -0,0 +1,33 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import auth_cache, search, template_registry
+from .models import CV, CVTemplate
+
+
+@receiver(post_delete, sender=CV)
+def remove_deleted_cv_from_search(sender, instance, **kwargs):
+    # Covers delete_cv, the admin and queryset deletes alike
+    search.remove_cvs([instance.pk])
+
+
+@receiver(post_save, sender=CVTemplate)
+@receiver(post_delete, sender=CVTemplate)
+def reload_template_registry(sender, instance, **kwargs):
+    # Reload here right away, and everywhere once other processes can see the change
+    template_registry.invalidate()
+    transaction.on_commit(template_registry.invalidate)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reload_cached_user(sender, instance, update_fields=None, **kwargs):
+    # Logging in only saves last_login, which cached copies can do without
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    auth_cache.invalidate(instance.pk)
+    transaction.on_commit(partial(auth_cache.invalidate, instance.pk))
@@ -0,0 +1,147 @@
+"""
+Denormalized JSON snapshots of whole CVs.
+
+CV.snapshot holds the CV's own fields (including template_id) and every
+section as plain JSON, so read paths can rebuild a CVAggregate from the CV row
+alone instead of querying seven section tables. Every write path that changes
+a CV refreshes the snapshot in the same transaction; readers fall back to the
+section tables when a snapshot is missing or from an older format.
+
+Each snapshot also carries a version per part of the CV (header, summary and
+each section), a hash of that part's content, which keys the preview fragment
+and PDF flowable caches. Writing a snapshot also refreshes the CV's row in the full-text search index.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import prefetch_related_objects
+
+from . import search, template_registry
+from .cv_data import SECTION_RELATIONS, CVAggregate, aggregate_queryset, content_version, row_to_dict
+from .models import CV
+
+# Bump when the snapshot layout changes; older snapshots are then ignored
+# (2: part versions are content hashes instead of counters)
+SNAPSHOT_VERSION = 2
+
+# CV fields versioned as their own parts, besides the sections
+CV_PARTS = {
+    'header': ['full_name', 'email', 'phone', 'location', 'linkedin_url', 'github_url'],
+    'summary': ['professional_summary'],
+}
+
+
+def snapshot_parts(snapshot):
+    """{part: content} of a snapshot, for every separately versioned part."""
+    parts = {part: [snapshot['cv'].get(field) for field in fields] for part, fields in CV_PARTS.items()}
+    for relation in SECTION_RELATIONS:
+        parts[relation] = snapshot.get(relation)
+    return parts
+
+
+def part_versions(snapshot):
+    """
+    Versions of a snapshot's parts, hashed from their content. Unchanged parts
+    keep their version across saves, and two saves of different content can
+    never share one, whatever snapshot they started from.
+    """
+    return {part: content_version(content) for part, content in snapshot_parts(snapshot).items()}
+
+
+def build_snapshot(cv, sections):
+    """
+    JSON-safe snapshot of a CV row and its {relation: rows} sections. Rows
+    are model instances or dicts already in row_to_dict() form.
+    """
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'cv': row_to_dict(cv),
+    }
+    for relation in SECTION_RELATIONS:
+        data[relation] = [obj if isinstance(obj, dict) else row_to_dict(obj) for obj in sections[relation]]
+    data = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+    data['versions'] = part_versions(data)
+    return data
+
+
+def aggregate_sections(aggregate):
+    return {relation: getattr(aggregate, relation) for relation in SECTION_RELATIONS}
+
+
+def save_snapshot(cv, sections):
+    """Store the snapshot of a CV whose current sections are already in hand."""
+    cv.snapshot = build_snapshot(cv, sections)
+    CV.objects.filter(pk=cv.pk).update(snapshot=cv.snapshot)
+    search.index_snapshots([cv.snapshot])
+
+
+def refresh_snapshots(cv_ids):
+    """Rebuild the snapshots of the given CVs from the section tables."""
+    cvs = list(aggregate_queryset().filter(pk__in=list(cv_ids)))
+    for cv in cvs:
+        cv.snapshot = build_snapshot(cv, aggregate_sections(CVAggregate(cv)))
+    CV.objects.bulk_update(cvs, ['snapshot'], batch_size=500)
+    search.index_snapshots(cv.snapshot for cv in cvs)
+    return len(cvs)
+
+
+def refresh_snapshot(cv_id):
+    refresh_snapshots([cv_id])
+
+
+def _instance(model, row):
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return model(**{
+        name: fields[name].to_python(value)
+        for name, value in row.items()
+        if name in fields
+    })
+
+
+def aggregate_from_snapshot(cv):
+    """CVAggregate built from the CV row's snapshot, or None if it cannot be used."""
+    snapshot = cv.snapshot
+    if not snapshot or snapshot.get('version') != SNAPSHOT_VERSION:
+        return None
+    sections = {}
+    for relation in SECTION_RELATIONS:
+        model = CV._meta.get_field(relation).related_model
+        sections[relation] = [_instance(model, row) for row in snapshot[relation]]
+    return CVAggregate(cv, sections=sections)
+
+
+def load_cv_snapshot(cv_id, user):
+    """
+    Load one of the user's CVs for display with a single query, using its
+    snapshot. Falls back to the section tables when there is no usable
+    snapshot. Raises CV.DoesNotExist.
+    """
+    cv = CV.objects.get(id=cv_id, user=user)
+    aggregate = aggregate_from_snapshot(cv)
+    if aggregate is None:
+        prefetch_related_objects([cv], *SECTION_RELATIONS)
+        aggregate = CVAggregate(cv)
+    return aggregate
+
+
+async def aload_cv_snapshot(cv_id, user):
+    """Async version of load_cv_snapshot()."""
+    await template_registry.atemplates()
+    cv = await CV.objects.aget(id=cv_id, user=user)
+    aggregate = aggregate_from_snapshot(cv)
+    if aggregate is None:
+        await sync_to_async(prefetch_related_objects)([cv], *SECTION_RELATIONS)
+        aggregate = CVAggregate(cv)
+    return aggregate
+
+
+def snapshot_is_current(cv):
+    """Whether a CV's stored snapshot matches its section tables."""
+    fresh = aggregate_queryset().get(pk=cv.pk)
+    return cv.snapshot == build_snapshot(fresh, aggregate_sections(CVAggregate(fresh)))
+
+
+def snapshot_matches_sections(cv):
+    """snapshot_is_current() for a CV loaded by aggregate_queryset(), without querying again."""
+    return cv.snapshot == build_snapshot(cv, aggregate_sections(CVAggregate(cv)))
@@ -0,0 +1,123 @@
+"""
+In-process registry of CV templates.
+
+There are only a handful of templates and they almost never change, so every
+process keeps all of them in memory and lookups in views, templates and the
+PDF path cost no queries. The registry is loaded on first use and reloaded
+after a template is saved or deleted (see signals). Other processes notice
+the change through a version token in the shared cache, which they check at
+most every TEMPLATE_REGISTRY_CHECK_INTERVAL seconds.
+"""
+import asyncio
+import threading
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .models import CV, CVTemplate
+
+VERSION_KEY = 'cv_templates:version'
+
+_lock = threading.Lock()
+_templates = {}
+_loaded_version = None
+_checked_at = None
+
+
+def cache():
+    return caches[getattr(settings, 'TEMPLATE_REGISTRY_CACHE_ALIAS', 'default')]
+
+
+def check_interval():
+    return getattr(settings, 'TEMPLATE_REGISTRY_CHECK_INTERVAL', 1.0)
+
+
+def shared_version():
+    version = cache().get(VERSION_KEY)
+    if version is None:
+        # First process up (or the key was evicted): publish a version everyone agrees on
+        cache().add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache().get(VERSION_KEY)
+    return version
+
+
+def _stale():
+    global _checked_at
+    now = time.monotonic()
+    if _checked_at is not None and now - _checked_at < check_interval():
+        return False
+    _checked_at = now
+    return shared_version() != _loaded_version
+
+
+def _load():
+    global _templates, _loaded_version, _checked_at
+    with _lock:
+        # Read the version first, so a change made during the query triggers another reload
+        version = shared_version()
+        _templates = {template.id: template for template in CVTemplate.objects.order_by('id')}
+        _loaded_version = version
+        _checked_at = time.monotonic()
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def templates():
+    """{id: CVTemplate} of every template."""
+    # On the event loop, serve what atemplates() loaded; reloading there would block it
+    if not (_in_event_loop() and _loaded_version is not None) and _stale():
+        _load()
+    return _templates
+
+
+async def atemplates():
+    """Async version of templates()."""
+    if _stale():
+        await sync_to_async(_load)()
+    return _templates
+
+
+def get(template_id):
+    """The template with this id, or None."""
+    try:
+        return templates().get(int(template_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def attach(cvs):
+    """Set each CV's template from the registry, so cv.template never queries."""
+    field = CV._meta.get_field('template')
+    for cv in cvs:
+        field.set_cached_value(cv, get(cv.template_id))
+
+
+def invalidate():
+    """Reload the registry here and, via the shared version, in every other process."""
+    global _checked_at
+    cache().set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    _checked_at = None
+
+
+@checks.register(checks.Tags.caches)
+def check_cache(app_configs, **kwargs):
+    if isinstance(cache(), (LocMemCache, DummyCache)):
+        return [checks.Warning(
+            'TEMPLATE_REGISTRY_CACHE_ALIAS is not shared between processes: a template '
+            'changed in one process is never reloaded by the others.',
+            hint='Point TEMPLATE_REGISTRY_CACHE_ALIAS at a cache shared between processes.',
+            id='cv_app.W002',
+        )]
+    return []
@@ -0,0 +1,37 @@
+from django import template
+
+from cv_app.fragment_cache import render_fragment
+
+register = template.Library()
+
+
+class CVFragmentNode(template.Node):
+    def __init__(self, part, nodelist):
+        self.part = part
+        self.nodelist = nodelist
+
+    def render(self, context):
+        cv = context['cv']
+        preview_template = context.get('template')
+        return render_fragment(
+            self.part,
+            cv,
+            preview_template.id if preview_template else None,
+            lambda: self.nodelist.render(context),
+            stats=context.get('fragment_stats'),
+        )
+
+
+@register.tag
+def cvfragment(parser, token):
+    """
+    Cache the enclosed block per CV, part, part version and template:
+
+        {% cvfragment "skills" %} ... {% endcvfragment %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 2 or bits[1][0] not in '"\'' or bits[1][0] != bits[1][-1]:
+        raise template.TemplateSyntaxError(f'{bits[0]} takes one quoted part name')
+    nodelist = parser.parse(('endcvfragment',))
+    parser.delete_first_token()
+    return CVFragmentNode(bits[1][1:-1], nodelist)
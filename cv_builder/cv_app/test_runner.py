@@ -0,0 +1,35 @@
+"""
+Test runner that keeps a test run out of the developer's shared cache.
+
+Sessions, user tokens, PDF jobs and the template registry version all live in
+the 'shared' cache, which is a directory next to the project. Tests run with
+'shared' pointed at a temporary directory instead, removed afterwards; it is
+exported as CV_SHARED_CACHE_DIR so processes the tests start share it too.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.shared_cache_dir = tempfile.mkdtemp(prefix='cv_shared_cache_')
+        self.previous_shared_cache_dir = os.environ.get('CV_SHARED_CACHE_DIR')
+        os.environ['CV_SHARED_CACHE_DIR'] = self.shared_cache_dir
+        shared = {**settings.CACHES['shared'], 'LOCATION': self.shared_cache_dir}
+        self.caches_override = override_settings(CACHES={**settings.CACHES, 'shared': shared})
+        self.caches_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches_override.disable()
+        if self.previous_shared_cache_dir is None:
+            del os.environ['CV_SHARED_CACHE_DIR']
+        else:
+            os.environ['CV_SHARED_CACHE_DIR'] = self.previous_shared_cache_dir
+        shutil.rmtree(self.shared_cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1478 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import datetime
+import importlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse, QueryDict
+from django.test import AsyncRequestFactory, LiveServerTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+from django.utils.http import urlencode
+from reportlab import rl_config
+
+from . import admission, async_views, auth_cache, autosave, benchmarks, file_responses, importing, instrumentation, listing, pdf, pdf_cache, pdf_jobs, pdf_renderer, pdf_styles, search, template_registry, urls, warmup
+from .cloning import clone_cvs
+from .cv_data import SECTION_RELATIONS, cv_fingerprint, load_cv_aggregate
+from .snapshots import build_snapshot, refresh_snapshot, snapshot_is_current
+from .views import save_cv_from_post
+from .models import CV, CVTemplate, Education, Experience, Reference, Skill
+
+
+class PdfCacheTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'password')
+        self.client.force_login(self.user)
+        self.cv = CV.objects.create(user=self.user, template=None, full_name='Alice', title='Alice CV')
+        Experience.objects.create(cv=self.cv, job_title='Engineer', company='Acme')
+        Skill.objects.create(cv=self.cv, name='Python')
+        self.url = reverse('download_cv_pdf', args=[self.cv.id])
+
+    def test_repeat_download_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'])
+        body = b''.join(first.streaming_content)
+        self.assertTrue(body.startswith(b'%PDF'))
+
+        second = self.client.get(self.url)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(b''.join(second.streaming_content), body)
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_section_change_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Skill.objects.create(cv=self.cv, name='Django')
+        self.assertNotEqual(self.client.get(self.url)['ETag'], etag)
+        # Only the newest render of a CV is kept
+        self.assertEqual(len(list(pdf_cache.cache_dir().glob(f'cv{self.cv.id}-*.pdf'))), 1)
+
+    def test_edit_cv_invalidates_entry(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('edit_cv', args=[self.cv.id]), {'full_name': 'Alice B'})
+        self.assertEqual(list(pdf_cache.cache_dir().glob(f'cv{self.cv.id}-*.pdf')), [])
+
+    def test_range_requests_resume_download(self):
+        full = self.client.get(self.url)
+        body = b''.join(full.streaming_content)
+        self.assertEqual(full['Accept-Ranges'], 'bytes')
+        self.assertEqual(int(full['Content-Length']), len(body))
+
+        partial = self.client.get(self.url, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE=full['ETag'])
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], f'bytes 100-{len(body) - 1}/{len(body)}')
+        self.assertEqual(b''.join(partial.streaming_content), body[100:])
+
+        tail = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(tail.streaming_content), body[-10:])
+
+        # A stale If-Range gets the whole (new) file instead of a broken splice
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+
+        beyond = self.client.get(self.url, HTTP_RANGE=f'bytes={len(body)}-')
+        self.assertEqual(beyond.status_code, 416)
+        self.assertEqual(beyond['Content-Range'], f'bytes */{len(body)}')
+
+    def test_entry_evicted_after_lookup_is_rendered_again(self):
+        self.client.get(self.url)
+        real_get = pdf_cache.get
+
+        def get_then_evict(cv_id, fingerprint):
+            path = real_get(cv_id, fingerprint)
+            if path is not None:
+                pdf_cache.invalidate(cv_id)
+            return path
+
+        pdf_cache.get = get_then_evict
+        self.addCleanup(setattr, pdf_cache, 'get', real_get)
+        # Every lookup's entry disappears before it is opened, the fresh render's too
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.getvalue().startswith(b'%PDF'))
+
+    @override_settings(PDF_CACHE_MAX_BYTES=0)
+    def test_render_larger_than_the_cache_is_sent_from_memory(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertEqual(list(pdf_cache.cache_dir().glob('cv*.pdf')), [])
+
+    def test_parse_byte_range(self):
+        self.assertEqual(file_responses.parse_byte_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(file_responses.parse_byte_range('bytes=90-200', 100), (90, 99))
+        self.assertEqual(file_responses.parse_byte_range('bytes=-200', 100), (0, 99))
+        self.assertIsNone(file_responses.parse_byte_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(file_responses.parse_byte_range('items=0-1', 100))
+        with self.assertRaises(ValueError):
+            file_responses.parse_byte_range('bytes=5-1', 100)
+
+    def test_eviction_keeps_cache_under_budget(self):
+        with override_settings(PDF_CACHE_MAX_BYTES=150):
+            pdf_cache.put(1, 'a', b'x' * 100)
+            pdf_cache.put(2, 'b', b'x' * 100)
+        self.assertIsNone(pdf_cache.get(1, 'a'))
+        self.assertIsNotNone(pdf_cache.get(2, 'b'))
+
+
+class PdfJobTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('bob', 'bob@example.com', 'password')
+        self.client.force_login(self.user)
+        self.cv = CV.objects.create(user=self.user, template=None, full_name='Bob', title='Bob CV')
+        self.url = reverse('download_cv_pdf', args=[self.cv.id]) + '?async=1'
+
+    def test_async_download_returns_job_and_result(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+
+        deadline = time.monotonic() + 60
+        while job['status'] == pdf_jobs.PENDING and time.monotonic() < deadline:
+            time.sleep(0.1)
+            job = self.client.get(job['status_url']).json()
+        self.assertEqual(job['status'], pdf_jobs.DONE)
+
+        result = self.client.get(job['result_url'])
+        self.assertEqual(result.status_code, 200)
+        self.assertTrue(b''.join(result.streaming_content).startswith(b'%PDF'))
+
+    @override_settings(PDF_JOB_QUEUE_SIZE=0)
+    def test_full_queue_returns_429(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_jobs_can_be_polled_from_any_process(self):
+        job = self.client.get(self.url).json()
+        code = (
+            'import django; django.setup(); from cv_app import pdf_jobs; '
+            f"job = pdf_jobs.get_job({job['job_id']!r}, {self.user.id}); print(job.cv_id, job.filename)"
+        )
+        child = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'cv_builder.settings'},
+        )
+        self.assertEqual(child.stdout.strip(), f'{self.cv.id} Bob_CV.pdf', child.stderr)
+
+    def test_jobs_are_private_to_their_owner(self):
+        job = self.client.get(self.url).json()
+        other = User.objects.create_user('eve', 'eve@example.com', 'password')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(job['status_url']).status_code, 404)
+
+
+class BulkExportTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'password', is_staff=True)
+        self.owner = User.objects.create_user('carol', 'carol@example.com', 'password')
+        self.cvs = [
+            CV.objects.create(user=self.owner, template=None, full_name='Carol', title=f'CV {i}')
+            for i in range(3)
+        ]
+
+    def test_endpoint_streams_zip_of_selected_cvs(self):
+        self.client.force_login(self.admin)
+        ids = f'{self.cvs[0].id},{self.cvs[2].id}'
+        response = self.client.get(reverse('bulk_export_cvs') + f'?ids={ids}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            [f'carol/{self.cvs[0].id}_CV_0.pdf', f'carol/{self.cvs[2].id}_CV_2.pdf'],
+        )
+        self.assertTrue(archive.read(archive.namelist()[0]).startswith(b'%PDF'))
+
+    def test_endpoint_is_staff_only(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('bulk_export_cvs') + '?all=1')
+        self.assertEqual(response.status_code, 302)
+
+    def test_command_writes_archive_for_user(self):
+        output = os.path.join(self.cache_dir, 'export.zip')
+        call_command('export_cvs', output, user='carol', workers=1, stdout=io.StringIO())
+        self.assertEqual(len(zipfile.ZipFile(output).namelist()), 3)
+
+
+class DashboardQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('dave', 'dave@example.com', 'password')
+        self.client.force_login(self.user)
+        self.template = CVTemplate.objects.create(name='Modern Professional', description='')
+        # Loaded once per process, not per request, like the logged-in user
+        template_registry.templates()
+        self.client.get(reverse('dashboard'))
+
+    def add_cvs(self, count):
+        for i in range(count):
+            cv = CV.objects.create(user=self.user, template=self.template, full_name='Dave', title=f'CV {i}')
+            Experience.objects.create(cv=cv, job_title='Engineer', company='Acme')
+            Education.objects.create(cv=cv, institution='Uni', degree='BSc')
+            Skill.objects.create(cv=cv, name='Python')
+            Skill.objects.create(cv=cv, name='Django')
+
+    def dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_cvs(self):
+        self.add_cvs(1)
+        _, few = self.dashboard_queries()
+        self.add_cvs(20)
+        response, many = self.dashboard_queries()
+        self.assertEqual(few, many)
+        self.assertContains(response, '2 skills', count=21)
+        self.assertContains(response, '</i>Modern Professional', count=21)
+
+
+@override_settings(DASHBOARD_PAGE_SIZE=5)
+class DashboardPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('dora', 'dora@example.com', 'password')
+        self.client.force_login(self.user)
+        self.template = CVTemplate.objects.create(name='Modern Professional', description='')
+        template_registry.invalidate()
+        self.cvs = [
+            CV.objects.create(user=self.user, template=self.template if i % 3 == 0 else None,
+                              full_name='Dora', title=f'CV {i:02d}')
+            for i in range(12)
+        ]
+        # Same creation time for several CVs, so the id has to break ties
+        CV.objects.filter(pk__in=[cv.pk for cv in self.cvs[4:8]]).update(created_at=self.cvs[4].created_at)
+
+    def titles(self, response):
+        return [cv.title for cv in response.context['user_cvs']]
+
+    def all_pages(self, params=''):
+        response = self.client.get(f"{reverse('dashboard')}?{params}")
+        self.assertEqual(response.status_code, 200)
+        titles = self.titles(response)
+        while response.context['next_cards_url']:
+            response = self.client.get(response.context['next_cards_url'])
+            self.assertEqual(response.status_code, 200)
+            titles += self.titles(response)
+        return titles
+
+    def test_first_paint_has_a_fixed_number_of_cards(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['user_cvs']), 5)
+        self.assertEqual(response.context['total_cvs'], 12)
+        self.assertEqual(response.context['recent_cv'].title, 'CV 11')
+        self.assertContains(response, 'Latest', count=1)
+        self.assertContains(response, 'data-next=')
+
+    def test_cards_endpoint_pages_through_every_cv_once(self):
+        expected = [cv.title for cv in CV.objects.filter(user=self.user).order_by('-created_at', '-id')]
+        self.assertEqual(self.all_pages(), expected)
+        self.assertEqual(self.all_pages('sort=title'), sorted(expected))
+        self.assertEqual(self.all_pages('sort=title&title=CV+1'), ['CV 10', 'CV 11'])
+
+        cv = self.cvs[2]
+        cv.title = 'Edited'
+        cv.save()
+        self.assertEqual(self.all_pages('sort=updated')[0], 'Edited')
+
+    def test_filters(self):
+        self.assertEqual(self.all_pages(f'template={self.template.id}&sort=title'), ['CV 00', 'CV 03', 'CV 06', 'CV 09'])
+        today = self.cvs[0].updated_at.date()
+        self.assertEqual(len(self.all_pages(f'updated_after={today}&updated_before={today}')), 12)
+        self.assertEqual(self.all_pages(f'updated_after={today + datetime.timedelta(days=1)}'), [])
+
+        response = self.client.get(f"{reverse('dashboard')}?title=nothing")
+        self.assertContains(response, 'No matching CVs')
+
+    def test_other_users_cvs_and_bad_parameters(self):
+        other = User.objects.create_user('olga', 'olga@example.com', 'password')
+        CV.objects.create(user=other, full_name='Olga', title='Olga CV')
+        self.assertNotIn('Olga CV', self.all_pages())
+
+        for params in ('sort=size', 'cursor=not-a-cursor', 'updated_after=yesterday', 'template=x'):
+            self.assertEqual(self.client.get(f"{reverse('dashboard_cards')}?{params}").status_code, 400)
+
+        # Well-formed cursor with an impossible date
+        raw = json.dumps(['2024-02-30T00:00:00', self.cvs[0].id]).encode()
+        cursor = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+        for name in ('dashboard', 'dashboard_cards'):
+            self.assertEqual(self.client.get(f'{reverse(name)}?cursor={cursor}').status_code, 400)
+
+    def test_page_query_uses_the_keyset_index(self):
+        query = listing.CardQuery({'cursor': listing.encode_cursor(self.cvs[6], 'created')})
+        sql, params = query.page(self.user).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('cv_user_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class SectionSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('erin', 'erin@example.com', 'password')
+        self.client.force_login(self.user)
+        self.cv = CV.objects.create(user=self.user, template=None, full_name='Erin', title='Erin CV')
+        self.url = reverse('edit_cv', args=[self.cv.id])
+        # Load the user into auth_cache, so only the first request would read it
+        self.client.get(self.url)
+
+    def post_skills(self, names):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, {
+                'full_name': 'Erin',
+                'skill_name': names,
+                'skill_category': ['technical'] * len(names),
+            })
+        return [q['sql'] for q in queries]
+
+    def test_rows_are_created_updated_and_deleted_by_position(self):
+        self.post_skills(['Python', 'Django', 'SQL'])
+        self.post_skills(['Python', 'Flask'])
+        self.assertEqual(list(self.cv.skills.order_by('pk').values_list('name', flat=True)), ['Python', 'Flask'])
+
+    def test_rows_are_stored_with_their_form_position(self):
+        self.post_skills(['Python', 'Django', 'SQL'])
+        self.assertEqual(
+            list(self.cv.skills.values_list('name', 'sort_order')),
+            [('Python', 0), ('Django', 1), ('SQL', 2)],
+        )
+
+    def test_sections_follow_sort_order_not_insertion_order(self):
+        Skill.objects.create(cv=self.cv, name='Second', sort_order=1)
+        Skill.objects.create(cv=self.cv, name='First', sort_order=0)
+        self.assertEqual(list(load_cv_aggregate(self.cv.id, self.user).skills), list(self.cv.skills.all()))
+        self.assertEqual([skill.name for skill in self.cv.skills.all()], ['First', 'Second'])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        few = self.post_skills([f'Skill {i}' for i in range(2)])
+        self.cv.skills.all().delete()
+        many = self.post_skills([f'Skill {i}' for i in range(50)])
+        self.assertEqual(len(few), len(many))
+
+    def test_unchanged_rows_are_not_written(self):
+        self.post_skills(['Python', 'Django'])
+        queries = self.post_skills(['Python', 'Django'])
+        self.assertFalse([sql for sql in queries if 'cv_app_skill' in sql and not sql.startswith('SELECT')])
+
+
+class CloneTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('frank', 'frank@example.com', 'password')
+        self.client.force_login(self.user)
+        self.cv = CV.objects.create(user=self.user, template=None, full_name='Frank', title='Frank CV')
+        for i in range(15):
+            Experience.objects.create(cv=self.cv, job_title=f'Job {i}', company='Acme')
+        for i in range(40):
+            Skill.objects.create(cv=self.cv, name=f'Skill {i}')
+        Reference.objects.create(cv=self.cv, name='Grace', position='CTO', company='Acme')
+
+    def test_duplicate_copies_all_sections_in_few_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('duplicate_cv', args=[self.cv.id]))
+        copy = CV.objects.exclude(pk=self.cv.pk).get()
+        self.assertRedirects(response, reverse('edit_cv', args=[copy.id]), fetch_redirect_response=False)
+        self.assertEqual(copy.title, 'Frank CV (Copy #2)')
+        self.assertEqual(
+            list(copy.experiences.order_by('pk').values_list('job_title', flat=True)),
+            [f'Job {i}' for i in range(15)],
+        )
+        self.assertEqual(copy.skills.count(), 40)
+        self.assertEqual(copy.references.get().name, 'Grace')
+        inserts = [q for q in queries if q['sql'].startswith('INSERT')]
+        self.assertLessEqual(len(inserts), 8)
+
+    def test_clone_many_cvs_for_new_user(self):
+        second = CV.objects.create(user=self.user, template=None, full_name='Frank', title='Second')
+        Skill.objects.create(cv=second, name='Go')
+        new_user = User.objects.create_user('heidi', 'heidi@example.com', 'password')
+        copies = clone_cvs(CV.objects.filter(user=self.user).order_by('pk'), new_user)
+        self.assertEqual([cv.title for cv in copies], ['Frank CV', 'Second'])
+        self.assertEqual(copies[0].skills.count(), 40)
+        self.assertEqual(list(copies[1].skills.values_list('name', flat=True)), ['Go'])
+        self.assertTrue(all(cv.user == new_user for cv in copies))
+
+
+class AggregateLoaderTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('ivan', 'ivan@example.com', 'password')
+        self.client.force_login(self.user)
+        self.cv = CV.objects.create(user=self.user, template=None, full_name='Ivan', title='Ivan CV')
+
+    def fill_sections(self):
+        for i in range(5):
+            Experience.objects.create(cv=self.cv, job_title=f'Job {i}', company='Acme')
+            Education.objects.create(cv=self.cv, institution='Uni', degree=f'Degree {i}')
+            Skill.objects.create(cv=self.cv, name=f'Skill {i}')
+            Reference.objects.create(cv=self.cv, name=f'Ref {i}', position='CTO', company='Acme')
+
+    def app_queries(self, url_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name, args=[self.cv.id]))
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in queries if 'cv_app_' in q['sql']]
+
+    def test_pages_use_a_fixed_number_of_queries(self):
+        for url_name in ['preview_cv', 'edit_cv', 'download_cv_pdf']:
+            empty = self.app_queries(url_name)
+            self.assertLessEqual(len(empty), 8)
+            self.fill_sections()
+            self.assertEqual(len(self.app_queries(url_name)), len(empty))
+            for relation in ['experiences', 'educations', 'skills', 'references']:
+                getattr(self.cv, relation).all().delete()
+
+    def test_aggregate_is_read_only(self):
+        aggregate = load_cv_aggregate(self.cv.id, self.user)
+        self.assertEqual(aggregate.full_name, 'Ivan')
+        self.assertEqual(aggregate.experiences, ())
+        with self.assertRaises(AttributeError):
+            aggregate.full_name = 'Someone else'
+
+
+class PdfStyleTests(TestCase):
+    template = {
+        'id': 7,
+        'primary_color': '#1a1a1a',
+        'secondary_color': '#666666',
+        'accent_color': '#8b4513',
+        'font_family': 'Georgia, serif',
+        'layout_style': 'classic',
+    }
+
+    def test_styles_are_compiled_once_per_template_version(self):
+        first = pdf_styles.get_styles(self.template)
+        self.assertIs(pdf_styles.get_styles(dict(self.template)), first)
+
+        changed = pdf_styles.get_styles({**self.template, 'primary_color': '#ff0000'})
+        self.assertIsNot(changed, first)
+        self.assertEqual(changed.title.textColor.hexval(), '0xff0000')
+
+    def test_styles_follow_template_colours_and_fonts(self):
+        styles = pdf_styles.get_styles(self.template)
+        self.assertEqual(styles.normal.fontName, 'Times-Roman')
+        self.assertEqual(styles.heading.fontName, 'Times-Bold')
+        self.assertEqual(styles.heading.textColor.hexval(), '0x666666')
+
+    def test_missing_template_uses_default_look(self):
+        styles = pdf_styles.get_styles(None)
+        self.assertEqual(styles.normal.fontName, 'Helvetica')
+        self.assertEqual(styles.title.textColor.hexval(), '0x2c3e50')
+
+
+class BenchmarkTests(TestCase):
+    def test_run_reports_every_entry_point(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        with override_settings(PDF_CACHE_DIR=cache_dir):
+            results = benchmarks.run(cvs_per_user=3, size='small', iterations=2)
+        self.assertEqual(CV.objects.count(), 3)
+        self.assertEqual(Skill.objects.count(), 9)
+        self.assertEqual(
+            sorted(results['results']),
+            ['dashboard', 'download_cv_pdf', 'edit_cv_post', 'preview_cv'],
+        )
+        self.assertGreater(results['results']['download_cv_pdf']['pdf_bytes_per_sec'], 0)
+
+    def test_corpus_cvs_have_snapshots(self):
+        (user, cv), = benchmarks.build_corpus(cvs_per_user=3, size='small')
+        self.assertTrue(all(snapshot_is_current(copy) for copy in CV.objects.filter(user=user)))
+        self.assertEqual(cv.snapshot, CV.objects.get(pk=cv.pk).snapshot)
+        # Views read the corpus from the snapshot, not the section tables
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('preview_cv', args=[cv.id]))
+        self.assertFalse([q for q in queries if 'cv_app_skill' in q['sql']])
+
+    def test_tuned_sqlite_profile_has_no_lock_errors(self):
+        profile = benchmarks.sqlite_profile(settings.DATABASES['default'])
+        self.assertIn('journal_mode=WAL', profile['init_command'])
+        results = benchmarks.sqlite_concurrency(profile, readers=2, writers=2, seconds=0.3, rows=50)
+        self.assertEqual(results['locked_errors'], 0)
+        self.assertGreater(results['writes_per_sec'], 0)
+
+    def test_download_memory_reports_peak_rss(self):
+        result = benchmarks.download_memory('streamed', concurrency=2, size='small')
+        self.assertGreaterEqual(result['peak_rss_kb'], result['baseline_rss_kb'])
+
+    def test_compare_flags_regressions(self):
+        baseline = {'results': {'dashboard': {'p50_ms': 10, 'p95_ms': 20, 'queries': 3, 'peak_memory_kb': 100}}}
+        current = {'results': {'dashboard': {'p50_ms': 11, 'p95_ms': 30, 'queries': 3, 'peak_memory_kb': 100}}}
+        self.assertEqual(benchmarks.compare(current, baseline, threshold=0.2), ['dashboard.p95_ms: 20 -> 30'])
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.registry.reset()
+        self.user = User.objects.create_user('judy', 'judy@example.com', 'password')
+        self.client.force_login(self.user)
+
+    def test_server_timing_header_breaks_down_request(self):
+        response = self.client.get(reverse('dashboard'))
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertRegex(timing, r'db;dur=[0-9.]+;desc="[1-9][0-9]* queries"')
+        self.assertIn('tpl;dur=', timing)
+
+    def test_metrics_endpoint_exposes_histograms(self):
+        self.client.get(reverse('dashboard'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE cv_request_duration_seconds histogram', body)
+        self.assertIn('cv_request_duration_seconds_count{view="dashboard"} 1', body)
+        self.assertIn('cv_template_render_seconds_bucket{view="dashboard",le="+Inf"} 1', body)
+
+    def test_metrics_endpoint_is_local_only(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.9')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_timed(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        # create_cv relies on the default template (id 1)
+        CVTemplate.objects.create(id=1, name='Modern Professional', description='')
+        self.user = User.objects.create_user('kate', 'kate@example.com', 'password')
+        self.client.force_login(self.user)
+        self.client.get(reverse('create_cv'))
+        self.cv = CV.objects.get(user=self.user)
+
+    def post_edit(self, **extra):
+        data = {'full_name': 'Kate', 'skill_name': ['Python', 'Go'], 'skill_category': ['technical', 'tools']}
+        data.update(extra)
+        self.client.post(reverse('edit_cv', args=[self.cv.id]), data)
+        self.cv.refresh_from_db()
+
+    def test_edit_keeps_snapshot_current(self):
+        self.assertTrue(snapshot_is_current(self.cv))
+        self.post_edit()
+        self.assertTrue(snapshot_is_current(self.cv))
+        self.assertEqual([row['name'] for row in self.cv.snapshot['skills']], ['Python', 'Go'])
+
+    def test_preview_and_pdf_read_one_row(self):
+        self.post_edit()
+        for url_name in ['preview_cv', 'download_cv_pdf']:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(url_name, args=[self.cv.id]))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len([q for q in queries if 'cv_app_' in q['sql']]), 1)
+        self.assertContains(self.client.get(reverse('preview_cv', args=[self.cv.id])), 'Tools &amp; Technologies')
+
+    def test_duplicate_gets_its_own_snapshot(self):
+        self.post_edit()
+        self.client.get(reverse('duplicate_cv', args=[self.cv.id]))
+        copy = CV.objects.exclude(pk=self.cv.pk).get()
+        self.assertTrue(snapshot_is_current(copy))
+        self.assertEqual(copy.snapshot['cv']['id'], copy.id)
+
+    def test_admin_section_change_refreshes_snapshot(self):
+        self.post_edit()
+        skill = self.cv.skills.first()
+        admin_user = User.objects.create_superuser('root', 'root@example.com', 'password')
+        self.client.force_login(admin_user)
+        self.client.post(reverse('admin:cv_app_skill_change', args=[skill.id]), {
+            'cv': self.cv.id, 'name': 'Rust', 'category': 'technical', 'sort_order': 0,
+        })
+        self.cv.refresh_from_db()
+        self.assertEqual(self.cv.snapshot['skills'][0]['name'], 'Rust')
+        self.client.post(reverse('admin:cv_app_skill_delete', args=[skill.id]), {'post': 'yes'})
+        self.cv.refresh_from_db()
+        self.assertEqual([row['name'] for row in self.cv.snapshot['skills']], ['Go'])
+
+    def test_part_versions_identify_content(self):
+        self.post_edit()
+        before = self.cv.snapshot['versions']
+        skills = list(self.cv.skills.all())
+        # Two saves starting from the same snapshot, with different skills
+        skills[0].name = 'Rust'
+        rust = build_snapshot(self.cv, {**{relation: [] for relation in SECTION_RELATIONS}, 'skills': skills})
+        skills[0].name = 'Elixir'
+        elixir = build_snapshot(self.cv, {**{relation: [] for relation in SECTION_RELATIONS}, 'skills': skills})
+        self.assertNotEqual(rust['versions']['skills'], elixir['versions']['skills'])
+        self.assertNotEqual(rust['versions']['skills'], before['skills'])
+        # Content edited back gets its old version again, whatever came in between
+        self.post_edit(full_name='Kate Bush')
+        self.post_edit()
+        self.assertEqual(self.cv.snapshot['versions'], before)
+
+    def test_command_backfills_and_verifies(self):
+        CV.objects.filter(pk=self.cv.pk).update(snapshot=None)
+        with self.assertRaises(CommandError):
+            call_command('cv_snapshots', verify=True, stdout=io.StringIO())
+        call_command('cv_snapshots', stdout=io.StringIO())
+        call_command('cv_snapshots', verify=True, stdout=io.StringIO())
+
+    def test_verify_prefetches_sections_per_batch(self):
+        clone_cvs([self.cv] * 5, self.user)
+        with CaptureQueriesContext(connection) as queries:
+            call_command('cv_snapshots', verify=True, batch_size=2, stdout=io.StringIO())
+        # One streamed CV query, then one query per section table for each chunk of two
+        self.assertEqual(len(queries), 1 + 3 * len(SECTION_RELATIONS))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        CVTemplate.objects.create(id=1, name='Modern Professional', description='')
+        self.user = User.objects.create_user('lena', 'lena@example.com', 'password')
+        self.client.force_login(self.user)
+        self.client.get(reverse('create_cv'))
+        self.client.get(reverse('create_cv'))
+        self.first, self.second = CV.objects.filter(user=self.user).order_by('id')
+
+    def post_edit(self, cv, **data):
+        self.client.post(reverse('edit_cv', args=[cv.id]), {'full_name': 'Lena', **data})
+
+    def test_edit_updates_index_and_ranks_skills_first(self):
+        self.post_edit(self.first, skill_name=['Kubernetes'], skill_category=['technical'])
+        self.post_edit(self.second, professional_summary='Curious about kubernetes and cloud work')
+        total, results = search.search('kubernetes')
+        self.assertEqual(total, 2)
+        self.assertEqual([result['cv_id'] for result in results], [self.first.id, self.second.id])
+        self.assertIn('<mark>Kubernetes</mark>', results[0]['snippet'])
+
+        self.post_edit(self.first, skill_name=['Rust'], skill_category=['technical'])
+        self.assertEqual(search.search('kubernetes')[0], 1)
+        self.assertEqual(search.search('rus')[1][0]['cv_id'], self.first.id)
+
+    def test_migrated_table_has_the_indexed_columns(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA table_info({search.TABLE})')
+            columns = [row[1] for row in cursor.fetchall()]
+        self.assertEqual(columns, ['user_id'] + [name for name, _ in search.COLUMNS])
+
+    def test_delete_removes_cv(self):
+        self.post_edit(self.first, professional_summary='Logistics planner')
+        self.client.get(reverse('delete_cv', args=[self.first.id]))
+        self.assertEqual(search.search('logistics'), (0, []))
+
+    def test_operators_and_markup_are_plain_text(self):
+        self.post_edit(self.first, professional_summary='Fluent in <script> and C++ OR NEAR "quotes"')
+        total, results = search.search('NEAR OR "quotes')
+        self.assertEqual(total, 1)
+        self.assertNotIn('<script>', results[0]['snippet'])
+        self.assertEqual(search.search('*) AND ('), (0, []))
+
+    def test_endpoint_is_staff_only_and_paginates(self):
+        for cv in (self.first, self.second):
+            self.post_edit(cv, professional_summary='Data engineer')
+        self.assertEqual(self.client.get(reverse('search_cvs'), {'q': 'data'}).status_code, 302)
+
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'password'))
+        data = self.client.get(reverse('search_cvs'), {'q': 'data engineer', 'per_page': 1, 'page': 2}).json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(len(data['results']), 1)
+
+    def test_rebuild_command(self):
+        self.post_edit(self.first, professional_summary='Marine biologist')
+        search.clear()
+        CV.objects.filter(pk=self.second.pk).update(snapshot=None)
+        with CaptureQueriesContext(connection) as queries:
+            call_command('rebuild_search_index', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(search.search('marine')[1][0]['cv_id'], self.first.id)
+        # CVs are walked in id ranges, never by listing every stale id
+        self.assertFalse([q for q in queries if 'NOT (' in q['sql'] and '"id" IN' in q['sql']])
+        self.assertEqual(search.search('lena')[0], 2)
+
+
+@override_settings(FRAGMENT_CACHE_DEBUG_HEADER=True)
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.template = CVTemplate.objects.create(id=1, name='Modern Professional', description='')
+        CVTemplate.objects.create(id=2, name='Classic Executive', description='')
+        self.user = User.objects.create_user('mira', 'mira@example.com', 'password')
+        self.client.force_login(self.user)
+        self.client.get(reverse('create_cv'))
+        self.cv = CV.objects.get(user=self.user)
+        self.form = {
+            'full_name': 'Mira', 'professional_summary': 'Designer',
+            'experience_job_title': ['Designer'], 'experience_company': ['Studio'],
+            'skill_name': ['Figma'], 'skill_category': ['tools'],
+        }
+        self.client.post(reverse('edit_cv', args=[self.cv.id]), self.form)
+
+    def preview(self, **params):
+        response = self.client.get(reverse('preview_cv', args=[self.cv.id]), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_only_the_edited_section_misses(self):
+        self.assertTrue(self.preview()['X-Fragment-Cache'].startswith('hits=0; misses=9'))
+        self.assertEqual(self.preview()['X-Fragment-Cache'], 'hits=9; misses=0; missed=-')
+
+        self.client.post(reverse('edit_cv', args=[self.cv.id]), {**self.form, 'skill_name': ['Sketch']})
+        response = self.preview()
+        self.assertEqual(response['X-Fragment-Cache'], 'hits=8; misses=1; missed=skills')
+        self.assertContains(response, 'Sketch')
+        self.assertNotContains(response, 'Figma')
+
+    def test_template_is_part_of_the_key(self):
+        self.preview()
+        self.assertTrue(self.preview(template=2)['X-Fragment-Cache'].startswith('hits=0; misses=9'))
+
+    def test_file_based_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        file_cache = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}}
+        with override_settings(CACHES=file_cache):
+            first = self.preview()
+            second = self.preview()
+        self.assertEqual(second['X-Fragment-Cache'], 'hits=9; misses=0; missed=-')
+        self.assertEqual(first.content, second.content)
+
+
+class PdfFlowableCacheTests(TestCase):
+    def setUp(self):
+        pdf.flowable_cache.clear()
+        # Byte-stable output (no timestamps or random ids) so renders can be compared
+        self.addCleanup(setattr, rl_config, 'invariant', rl_config.invariant)
+        rl_config.invariant = 1
+        self.data = benchmarks.pdf_data('median')
+
+    def test_cached_parts_render_identically(self):
+        uncached = pdf.render_cv_pdf({**self.data, 'versions': None})
+        self.assertEqual(pdf.render_cv_pdf(self.data), uncached)
+        self.assertEqual(pdf.render_cv_pdf(self.data), uncached)
+        self.assertEqual(pdf.flowable_cache.hits, len(pdf.PART_BUILDERS))
+
+    def test_paragraphs_split_across_pages_render_identically(self):
+        # Long marked-up paragraphs, so some are split at a page break
+        description = ' '.join(f'<b>Result {i}:</b> {benchmarks.LOREM}' for i in range(8))
+        data = benchmarks.pdf_data('huge')
+        data['experiences'] = [
+            {**experience, 'description': description, 'achievements': description}
+            for experience in data['experiences'] * 2
+        ]
+        uncached = pdf.render_cv_pdf({**data, 'versions': None})
+        self.assertGreater(uncached.count(b'/Type /Page\n'), 3)
+        for _ in range(3):
+            self.assertEqual(pdf.render_cv_pdf(data), uncached)
+
+    def test_part_data_not_version_identifies_cached_flowables(self):
+        pdf.render_cv_pdf(self.data)
+        # Different skills under the same version number, as two saves from one snapshot had
+        edited = {**self.data, 'skills': [{'name': 'Renamed skill', 'category': 'technical'}]}
+        self.assertEqual(edited['versions']['skills'], self.data['versions']['skills'])
+        self.assertEqual(pdf.render_cv_pdf(edited), pdf.render_cv_pdf({**edited, 'versions': None}))
+        self.assertEqual(pdf.flowable_cache.misses, len(pdf.PART_BUILDERS) + 1)
+
+    def test_only_changed_part_is_rebuilt(self):
+        pdf.render_cv_pdf(self.data)
+        misses = pdf.flowable_cache.misses
+        self.data['skills'][0]['name'] = 'Haskell'
+        self.data['versions']['skills'] += 1
+        output = pdf.render_cv_pdf(self.data)
+        self.assertEqual(pdf.flowable_cache.misses, misses + 1)
+        self.assertEqual(output, pdf.render_cv_pdf({**self.data, 'versions': None}))
+
+    def test_versions_do_not_change_fingerprint(self):
+        self.assertEqual(cv_fingerprint(self.data), cv_fingerprint({**self.data, 'versions': {'skills': 99}}))
+
+    def test_benchmark_reports_both_scenarios(self):
+        results = benchmarks.pdf_incremental(size='small', iterations=2)
+        self.assertGreater(results['cold']['render_ms'], 0)
+        self.assertGreater(results['after_one_field_edit']['render_ms'], 0)
+
+
+@override_settings(PDF_WORKERS=0, FRAGMENT_CACHE_DEBUG_HEADER=True)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        # Route the hot views to async_views, and back again once the setting is restored
+        self.addCleanup(self.reload_urls)
+        async_override = override_settings(ASYNC_VIEWS=True)
+        async_override.enable()
+        self.addCleanup(async_override.disable)
+        self.reload_urls()
+        caches['default'].clear()
+
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        CVTemplate.objects.create(id=1, name='Modern Professional', description='')
+        self.user = User.objects.create_user('nina', 'nina@example.com', 'password')
+        self.client.force_login(self.user)
+        self.client.get(reverse('create_cv'))
+        self.cv = CV.objects.get(user=self.user)
+
+    def reload_urls(self):
+        importlib.reload(urls)
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    def test_urls_use_async_views(self):
+        self.assertIs(urls.hot_views, async_views)
+        self.assertTrue(asyncio.iscoroutinefunction(async_views.dashboard))
+
+    async def test_dashboard_preview_and_edit(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.resolver_match.func, async_views.dashboard)
+        self.assertContains(response, "nina&#x27;s CV #1")
+        response = await self.async_client.get(reverse('dashboard_cards') + '?sort=title')
+        self.assertEqual(response.resolver_match.func, async_views.dashboard_cards)
+        self.assertContains(response, "nina&#x27;s CV #1")
+
+        response = await self.async_client.post(reverse('edit_cv', args=[self.cv.id]), {
+            'full_name': 'Nina', 'skill_name': ['Elixir'], 'skill_category': ['technical'],
+        })
+        self.assertEqual(response.status_code, 302)
+        cv = await CV.objects.aget(pk=self.cv.pk)
+        self.assertEqual(cv.snapshot['skills'][0]['name'], 'Elixir')
+        self.assertTrue(await sync_to_async(snapshot_is_current)(cv))
+
+        response = await self.async_client.get(reverse('edit_cv', args=[self.cv.id]))
+        self.assertContains(response, 'Elixir')
+        response = await self.async_client.get(reverse('preview_cv', args=[self.cv.id]))
+        self.assertContains(response, 'Elixir')
+        self.assertIn('misses=9', response['X-Fragment-Cache'])
+
+    async def test_pdf_download_renders_off_the_event_loop(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('download_cv_pdf', args=[self.cv.id])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(body))
+
+        cached = await self.async_client.get(url, headers={'Range': 'bytes=0-3'})
+        self.assertEqual(cached.status_code, 206)
+        self.assertEqual(b''.join([chunk async for chunk in cached.streaming_content]), b'%PDF')
+
+    async def test_render_queue_is_bounded(self):
+        with override_settings(PDF_JOB_QUEUE_SIZE=0):
+            with self.assertRaises(pdf_jobs.QueueFull):
+                await pdf_jobs.render(benchmarks.pdf_data('small'))
+
+
+class HttpLoadTests(LiveServerTestCase):
+    def test_reports_throughput_and_latency(self):
+        result = benchmarks.http_load(self.live_server_url + reverse('login'), connections=4, seconds=0.5)
+        self.assertGreater(result['requests'], 0)
+        self.assertEqual(set(result['statuses']), {200})
+        self.assertEqual(result['errors'], 0)
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_sends_session_cookie_for_user(self):
+        User.objects.create_user('load', 'load@example.com', 'password')
+        session_key = benchmarks.login_session('load')
+        result = benchmarks.http_load(
+            self.live_server_url + reverse('dashboard'), connections=2, seconds=0.3,
+            headers={'Cookie': f'{settings.SESSION_COOKIE_NAME}={session_key}'},
+        )
+        self.assertEqual(set(result['statuses']), {200})
+
+
+class AdmissionTests(TestCase):
+    def setUp(self):
+        admission.reset()
+        self.addCleanup(admission.reset)
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(PDF_CACHE_DIR=self.cache_dir, PDF_RENDER_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('oscar', 'oscar@example.com', 'password')
+        self.client.force_login(self.user)
+        self.cv = CV.objects.create(user=self.user, template=None, full_name='Oscar', title='Oscar CV')
+
+    @override_settings(ADMISSION_RATE_LIMITS={'duplicate_cv': {'burst': 2, 'rate': 0.01}})
+    def test_bucket_allows_a_burst_then_returns_429(self):
+        url = reverse('duplicate_cv', args=[self.cv.id])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '100')
+        self.assertEqual(CV.objects.filter(user=self.user).count(), 3)
+
+        # Buckets are per user
+        other = User.objects.create_user('pat', 'pat@example.com', 'password')
+        other_cv = CV.objects.create(user=other, template=None, title='Pat CV')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('duplicate_cv', args=[other_cv.id])).status_code, 302)
+
+    def test_bucket_refills_at_its_rate(self):
+        backend = admission.MemoryBackend()
+        self.assertEqual(backend.take('k', 1, 2.0, now=100.0), 0)
+        self.assertAlmostEqual(backend.take('k', 1, 2.0, now=100.25), 0.25)
+        self.assertEqual(backend.take('k', 1, 2.0, now=100.5), 0)
+
+    @override_settings(PDF_BUILD_CONCURRENCY=1, PDF_BUILD_QUEUE_TIMEOUT=0.05)
+    def test_pdf_builds_over_the_cap_get_429(self):
+        url = reverse('download_cv_pdf', args=[self.cv.id])
+        with admission.pdf_build_slot():
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response['Retry-After'])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(PDF_BUILD_CONCURRENCY=1, PDF_BUILD_QUEUE_SIZE=0, PDF_BUILD_QUEUE_TIMEOUT=10)
+    def test_full_wait_queue_rejects_immediately(self):
+        start = time.monotonic()
+        with admission.pdf_build_slot():
+            with self.assertRaises(admission.Overloaded):
+                with admission.pdf_build_slot():
+                    pass
+        self.assertLess(time.monotonic() - start, 1)
+
+    @override_settings(ADMISSION_RATE_LIMITS={'download_cv_pdf': {'burst': 1, 'rate': 0.5}})
+    async def test_async_views_are_rate_limited(self):
+        @admission.rate_limited('download_cv_pdf')
+        async def view(request):
+            return HttpResponse('ok')
+
+        async def auser():
+            return self.user
+
+        request = AsyncRequestFactory().get('/')
+        request.auser = auser
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        self.assertEqual((await view(request)).status_code, 200)
+        response = await view(request)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+
+    def test_shared_backend_coordinates_processes(self):
+        path = os.path.join(self.cache_dir, 'admission.sqlite3')
+        first, second = admission.SQLiteBackend(path), admission.SQLiteBackend(path)
+
+        holder = first.try_acquire('pdf_build', 1)
+        self.assertIsNotNone(holder)
+        self.assertIsNone(second.try_acquire('pdf_build', 1))
+        first.release('pdf_build', holder)
+        self.assertIsNotNone(second.try_acquire('pdf_build', 1))
+
+        self.assertEqual(first.take('k', 1, 0.5, now=10.0), 0)
+        self.assertEqual(second.take('k', 1, 0.5, now=10.0), 2.0)
+
+    def test_shared_backend_reclaims_slots_of_dead_processes(self):
+        path = os.path.join(self.cache_dir, 'admission.sqlite3')
+        backend = admission.SQLiteBackend(path)
+        child = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True, text=True)
+        with backend.transaction() as conn:
+            conn.execute(
+                'INSERT INTO slot (holder, name, pid, acquired) VALUES (?, ?, ?, ?)',
+                ('gone', 'pdf_build', int(child.stdout), time.time()),
+            )
+        self.assertIsNotNone(backend.try_acquire('pdf_build', 1))
+
+
+class TemplateRegistryTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        # Downloads and the shared version stay out of the real PDF and shared caches
+        registry_cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                          'LOCATION': os.path.join(self.cache_dir, 'registry')}
+        settings_override = override_settings(
+            PDF_CACHE_DIR=os.path.join(self.cache_dir, 'pdf'),
+            CACHES={**settings.CACHES, 'registry': registry_cache},
+            TEMPLATE_REGISTRY_CACHE_ALIAS='registry',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('quinn', 'quinn@example.com', 'password')
+        self.client.force_login(self.user)
+        self.modern = CVTemplate.objects.create(name='Modern Professional', description='')
+        self.classic = CVTemplate.objects.create(name='Classic Executive', description='')
+        self.cv = CV.objects.create(user=self.user, template=self.modern, full_name='Quinn', title='Quinn CV')
+        refresh_snapshot(self.cv.id)
+        template_registry.templates()
+
+    def template_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in queries if 'cv_app_cvtemplate' in q['sql']]
+
+    def test_views_read_templates_without_queries(self):
+        response, queries = self.template_queries(reverse('dashboard'))
+        self.assertContains(response, 'Modern Professional')
+        self.assertEqual(queries, [])
+
+        url = reverse('preview_cv', args=[self.cv.id]) + f'?template={self.classic.id}'
+        response, queries = self.template_queries(url)
+        self.assertEqual(response.context['template'], self.classic)
+        self.assertEqual(queries, [])
+
+        _, queries = self.template_queries(reverse('download_cv_pdf', args=[self.cv.id]) + '?async=0')
+        self.assertEqual(queries, [])
+
+    def test_unknown_template_parameter_falls_back_to_cv_template(self):
+        response = self.client.get(reverse('preview_cv', args=[self.cv.id]) + '?template=nope')
+        self.assertEqual(response.context['template'], self.modern)
+
+    def test_saving_a_template_reloads_the_registry(self):
+        self.modern.name = 'Modern Plus'
+        self.modern.save()
+        self.assertEqual(template_registry.get(self.modern.id).name, 'Modern Plus')
+        self.classic.delete()
+        self.assertIsNone(template_registry.get(self.classic.id))
+
+    @override_settings(TEMPLATE_REGISTRY_CHECK_INTERVAL=0)
+    def test_other_processes_are_invalidated_through_the_shared_version(self):
+        # Another process changed a template: its rows and the shared version changed
+        CVTemplate.objects.filter(pk=self.modern.pk).update(name='Renamed elsewhere')
+        self.assertEqual(template_registry.get(self.modern.id).name, 'Modern Professional')
+        template_registry.cache().set(template_registry.VERSION_KEY, 'changed elsewhere', timeout=None)
+        self.assertEqual(template_registry.get(self.modern.id).name, 'Renamed elsewhere')
+
+    def test_version_is_kept_in_a_cache_every_process_reads(self):
+        self.assertEqual(template_registry.check_cache(None), [])
+        with override_settings(TEMPLATE_REGISTRY_CACHE_ALIAS='default'):
+            self.assertEqual([error.id for error in template_registry.check_cache(None)], ['cv_app.W002'])
+
+
+def json_resume(name, **extra):
+    return {
+        'basics': {
+            'name': name, 'label': 'Engineer', 'email': f'{name.lower()}@example.com',
+            'location': {'city': 'Nairobi', 'countryCode': 'KE'},
+            'profiles': [{'network': 'GitHub', 'url': f'https://github.com/{name.lower()}'}],
+        },
+        'work': [{'name': 'Acme', 'position': 'Developer', 'startDate': '2019-01', 'highlights': ['Shipped it']}],
+        'education': [{'institution': 'University', 'studyType': 'BSc', 'area': 'CS'}],
+        'skills': [{'name': 'Python'}, {'name': 'Django'}],
+        'languages': [{'language': 'Swahili'}],
+        **extra,
+    }
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('rita', 'rita@example.com', 'password')
+        # Templates created by earlier tests were rolled back without a signal
+        template_registry.invalidate()
+        admission.reset()
+        self.addCleanup(admission.reset)
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as output:
+            output.write(content)
+        return path
+
+    def test_json_stream_reader_handles_arrays_lines_and_small_chunks(self):
+        documents = [{'n': i, 'text': 'x' * i} for i in range(5)] + [12345]
+        for content in (json.dumps(documents), '\n'.join(json.dumps(d) for d in documents)):
+            self.assertEqual(list(importing.iter_json_documents(io.StringIO(content), chunk_size=3)), documents)
+        with self.assertRaises(ValueError):
+            list(importing.iter_json_documents(io.StringIO('[{"n": 1}, {"n": '), chunk_size=4))
+
+    def test_command_imports_json_resumes_with_sections_snapshots_and_search(self):
+        path = self.write('cvs.json', json.dumps([json_resume('Alma'), json_resume('Bruno')]))
+        call_command('import_cvs', path, user='rita', stdout=io.StringIO())
+
+        cvs = CV.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([cv.full_name for cv in cvs], ['Alma', 'Bruno'])
+        cv = cvs[0]
+        self.assertEqual(cv.location, 'Nairobi, KE')
+        self.assertEqual(cv.github_url, 'https://github.com/alma')
+        self.assertEqual(cv.experiences.get().achievements, 'Shipped it')
+        self.assertEqual(
+            list(cv.skills.values_list('name', 'category', 'sort_order')),
+            [('Python', 'technical', 0), ('Django', 'technical', 1), ('Swahili', 'languages', 2)],
+        )
+        self.assertTrue(snapshot_is_current(cv))
+        if search.enabled():
+            self.assertEqual(search.search('Bruno')[0], 1)
+
+    def test_invalid_records_are_reported_and_skipped(self):
+        records = [json_resume('Alma'), json_resume(''), 'not an object', json_resume('Carla')]
+        records[3]['basics']['email'] = 'not-an-email'
+        path = self.write('cvs.jsonl', '\n'.join(json.dumps(record) for record in records))
+        call_command('import_cvs', path, user='rita', stdout=io.StringIO())
+
+        self.assertEqual(list(CV.objects.values_list('full_name', flat=True)), ['Alma'])
+        with open(path + '.errors.csv') as report:
+            rows = list(csv.reader(report))[1:]
+        self.assertEqual([row[0] for row in rows], ['2', '3', '4'])
+        self.assertIn('cv.full_name: this field is required', rows[0][2])
+        self.assertIn('cv.email', rows[2][2])
+
+    def test_resume_skips_records_already_imported(self):
+        path = self.write('cvs.json', json.dumps([json_resume(f'Person{i}') for i in range(5)]))
+        with open(path) as stream:
+            # Stop after the first batch, as if the import had been interrupted
+            first = next(importing.import_records(stream, importing.JSON, owner=self.user, batch_size=2))
+        self.assertEqual((first.consumed, first.imported), (2, 2))
+        with open(path + '.progress.json', 'w') as progress:
+            json.dump({'source': os.path.abspath(path), 'consumed': 2, 'imported': 2, 'failed': 0}, progress)
+
+        call_command('import_cvs', path, user='rita', resume=True, batch_size=2, stdout=io.StringIO())
+        self.assertEqual(CV.objects.count(), 5)
+        with open(path + '.progress.json') as progress:
+            self.assertEqual(json.load(progress)['imported'], 5)
+
+    def test_csv_rows_map_to_cvs(self):
+        User.objects.create_user('sam', 'sam@example.com', 'password')
+        experiences = json.dumps([{'job_title': 'Chef', 'company': 'Bistro'}]).replace('"', '""')
+        path = self.write('cvs.csv', (
+            'username,title,full_name,email,skills,experiences\n'
+            f'sam,Sam CV,Sam,sam@example.com,Cooking; Baking,"{experiences}"\n'
+            f',,Rita,rita@example.com,,\n'
+            f'nobody,,Nemo,,,\n'
+        ))
+        call_command('import_cvs', path, user='rita', stdout=io.StringIO())
+
+        sam_cv = CV.objects.get(user__username='sam')
+        self.assertEqual(sam_cv.title, 'Sam CV')
+        self.assertEqual(list(sam_cv.skills.values_list('name', flat=True)), ['Cooking', 'Baking'])
+        self.assertEqual(sam_cv.experiences.get().company, 'Bistro')
+        self.assertEqual(CV.objects.get(user=self.user).full_name, 'Rita')
+        self.assertFalse(CV.objects.filter(full_name='Nemo').exists())
+
+    def test_upload_endpoint_imports_for_the_uploader(self):
+        self.client.force_login(self.user)
+        User.objects.create_user('tom', 'tom@example.com', 'password')
+        records = [json_resume('Alma', meta={'username': 'tom'}), json_resume('')]
+        upload = SimpleUploadedFile('cvs.json', json.dumps(records).encode(), content_type='application/json')
+        response = self.client.post(reverse('import_cvs'), {'file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['consumed'], report['imported'], report['rejected']), (2, 1, 1))
+        self.assertEqual(report['errors'][0]['record'], 2)
+        # Only staff can import into other accounts
+        self.assertEqual(CV.objects.get().user, self.user)
+
+    @override_settings(IMPORT_MAX_UPLOAD_BYTES=100)
+    def test_upload_larger_than_the_limit_is_not_read(self):
+        self.client.force_login(self.user)
+        records = [json_resume(f'Person{i}') for i in range(5)]
+        upload = SimpleUploadedFile('cvs.json', json.dumps(records).encode(), content_type='application/json')
+        response = self.client.post(reverse('import_cvs'), {'file': upload})
+
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('100 bytes', response.json()['error'])
+        self.assertFalse(CV.objects.exists())
+
+    @override_settings(IMPORT_MAX_RECORDS=2)
+    def test_upload_stops_after_the_record_limit(self):
+        self.client.force_login(self.user)
+        content = json.dumps([json_resume(f'Person{i}') for i in range(5)]).encode()
+        upload = SimpleUploadedFile('cvs.json', content, content_type='application/json')
+        response = self.client.post(reverse('import_cvs'), {'file': upload})
+
+        self.assertEqual(response.status_code, 413)
+        report = response.json()
+        self.assertEqual((report['consumed'], report['imported']), (2, 2))
+        self.assertEqual(report['skipped'], {'first': 3, 'last': 5})
+        self.assertIn('records 3 to 5 were skipped', report['error'])
+        self.assertIn('skip=2', report['error'])
+
+        # Resuming picks up where the limit stopped
+        upload = SimpleUploadedFile('cvs.json', content, content_type='application/json')
+        response = self.client.post(reverse('import_cvs'), {'file': upload, 'skip': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(CV.objects.order_by('id').values_list('full_name', flat=True)),
+                         ['Person0', 'Person1', 'Person4'])
+
+
+
+class AutosaveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ava', 'ava@example.com', 'password')
+        self.client.force_login(self.user)
+        self.cv = CV.objects.create(user=self.user, template=None, full_name='Ava', title='Ava CV')
+        self.python = Skill.objects.create(cv=self.cv, name='Python', category='technical', sort_order=0)
+        self.sql = Skill.objects.create(cv=self.cv, name='SQL', category='technical', sort_order=1)
+        refresh_snapshot(self.cv.id)
+
+    def send(self, method, url, version=None, **body):
+        self.cv.refresh_from_db()
+        body['version'] = self.cv.version if version is None else version
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, json.dumps(body), content_type='application/json')
+        self.queries = [q['sql'] for q in queries]
+        self.cv.refresh_from_db()
+        return response
+
+    def writes(self):
+        return [sql for sql in self.queries if sql.split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+
+    def test_basic_fields_are_patched_with_one_write(self):
+        response = self.send('patch', reverse('cv_api', args=[self.cv.id]), fields={'phone': '555 0100'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'version': 1})
+        self.assertEqual(self.cv.phone, '555 0100')
+        self.assertTrue(snapshot_is_current(self.cv))
+        # The phone number is not searchable, so the search row is left alone
+        self.assertEqual(len(self.writes()), 1)
+
+        self.send('patch', reverse('cv_api', args=[self.cv.id]), fields={'full_name': 'Ava Lovelace'})
+        if search.enabled():
+            self.assertEqual(search.search('Lovelace')[0], 1)
+
+    def test_entries_are_added_updated_reordered_and_deleted(self):
+        url = reverse('cv_api_section', args=[self.cv.id, 'skills'])
+        response = self.send('post', url, fields={'name': 'Django', 'category': 'technical'})
+        self.assertEqual(response.status_code, 201)
+        django_id = response.json()['entry']['id']
+        self.assertEqual(response.json()['entry']['sort_order'], 2)
+
+        entry_url = reverse('cv_api_entry', args=[self.cv.id, 'skills', self.sql.id])
+        self.assertEqual(self.send('patch', entry_url, fields={'name': 'PostgreSQL'}).status_code, 200)
+        self.assertEqual(Skill.objects.get(pk=self.sql.pk).name, 'PostgreSQL')
+
+        order = [django_id, self.sql.id, self.python.id]
+        response = self.send('post', reverse('cv_api_order', args=[self.cv.id, 'skills']), order=order)
+        self.assertEqual(response.json()['order'], order)
+        self.assertEqual(list(self.cv.skills.values_list('name', flat=True)), ['Django', 'PostgreSQL', 'Python'])
+
+        self.assertEqual(self.send('delete', entry_url).status_code, 200)
+        self.assertEqual([row['name'] for row in self.cv.snapshot['skills']], ['Django', 'Python'])
+        self.assertEqual(self.cv.version, 4)
+        self.assertTrue(snapshot_is_current(self.cv))
+
+    def test_stale_version_is_rejected(self):
+        url = reverse('cv_api', args=[self.cv.id])
+        self.send('patch', url, fields={'phone': '1'})
+        response = self.send('patch', url, version=0, fields={'phone': '2'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['version'], 1)
+        self.assertEqual(self.cv.phone, '1')
+
+        # Saving the full form also moves the version on
+        self.client.post(reverse('edit_cv', args=[self.cv.id]), {'full_name': 'Ava'})
+        self.assertEqual(self.send('patch', url, version=1, fields={'phone': '3'}).status_code, 409)
+
+    def test_full_form_save_after_an_autosave(self):
+        url = reverse('edit_cv', args=[self.cv.id])
+        stale_form = benchmarks.edit_form_data(self.cv)
+        # The page is loaded, then an autosave adds a skill before the form is saved
+        aggregate = load_cv_aggregate(self.cv.id, self.user)
+        autosave.add_entry(self.cv.id, self.user, 0, 'skills', {'name': 'Go', 'category': 'technical'})
+        with self.assertRaises(autosave.Conflict):
+            save_cv_from_post(aggregate.cv, QueryDict(urlencode(stale_form, doseq=True)))
+
+        # A tab still at version 0 gets a conflict instead of overwriting the autosave
+        response = self.client.post(url, stale_form, follow=True)
+        self.assertContains(response, 'changed elsewhere')
+        self.cv.refresh_from_db()
+        self.assertEqual(self.cv.version, 1)
+        self.assertEqual(sorted(self.cv.skills.values_list('name', flat=True)), ['Go', 'Python', 'SQL'])
+        self.assertTrue(snapshot_is_current(self.cv))
+
+        # The autosaving tab posts the version it autosaved to
+        form = benchmarks.edit_form_data(self.cv)
+        form['full_name'] = 'Ava Lovelace'
+        self.assertEqual(form['version'], 1)
+        self.client.post(url, form)
+        self.cv.refresh_from_db()
+        self.assertEqual((self.cv.version, self.cv.full_name), (2, 'Ava Lovelace'))
+        self.assertEqual([row['name'] for row in self.cv.snapshot['skills']], ['Python', 'SQL', 'Go'])
+        self.assertTrue(snapshot_is_current(self.cv))
+
+    def test_unchanged_values_save_nothing(self):
+        url = reverse('cv_api_entry', args=[self.cv.id, 'skills', self.python.id])
+        response = self.send('patch', url, fields={'name': 'Python'})
+        self.assertEqual(response.json()['version'], 0)
+        self.assertEqual(self.writes(), [])
+
+    def test_invalid_edits(self):
+        section_url = reverse('cv_api_section', args=[self.cv.id, 'skills'])
+        cases = [
+            (self.send('patch', reverse('cv_api', args=[self.cv.id]), fields={'email': 'nope'}), 400),
+            (self.send('patch', reverse('cv_api', args=[self.cv.id]), fields={'user_id': 2}), 400),
+            (self.send('patch', reverse('cv_api', args=[self.cv.id]), fields={'template': 999}), 400),
+            (self.send('post', section_url, fields={'category': 'technical'}), 400),
+            (self.send('post', reverse('cv_api_order', args=[self.cv.id, 'skills']), order=[self.python.id]), 400),
+            (self.send('patch', reverse('cv_api_entry', args=[self.cv.id, 'skills', 999]), fields={'name': 'X'}), 404),
+            (self.send('post', reverse('cv_api_section', args=[self.cv.id, 'hobbies']), fields={'name': 'X'}), 404),
+            (self.client.get(reverse('cv_api', args=[self.cv.id])), 405),
+        ]
+        self.assertEqual([response.status_code for response, _ in cases], [status for _, status in cases])
+        self.assertEqual(self.client.patch(reverse('cv_api', args=[self.cv.id]), 'x').status_code, 400)
+        self.assertEqual(self.cv.version, 0)
+
+        other = User.objects.create_user('bob', 'bob@example.com', 'password')
+        self.client.force_login(other)
+        self.assertEqual(self.send('patch', reverse('cv_api', args=[self.cv.id]), fields={'phone': '1'}).status_code, 404)
+
+    def test_edit_page_has_autosave_hooks(self):
+        response = self.client.get(reverse('edit_cv', args=[self.cv.id]))
+        self.assertContains(response, f'data-entry-id="{self.python.id}"')
+        self.assertContains(response, 'id="autosave-fields"')
+        self.assertEqual(response.context['autosave_fields']['sections']['skills']['inputs']['skill_name'], 'name')
+
+
+class WarmupTests(TestCase):
+    def test_views_and_commands_do_not_import_reportlab(self):
+        code = (
+            'import sys, django; django.setup(); '
+            'import cv_app.urls, cv_app.views, cv_app.async_views, cv_app.pdf_jobs, cv_app.pdf_export; '
+            "print('reportlab' in sys.modules)"
+        )
+        child = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'cv_builder.settings'},
+        )
+        self.assertEqual(child.stdout.strip(), 'False', child.stderr)
+
+    def test_warmup_compiles_templates_and_styles(self):
+        CVTemplate.objects.create(name='Modern Professional', description='', font_family='Georgia')
+        template_registry.invalidate()
+        pdf_styles.clear()
+
+        out = io.StringIO()
+        call_command('warmup', stdout=out)
+        self.assertIn('templates: 7 compiled', out.getvalue())
+        self.assertIn('Warmed up', out.getvalue())
+        self.assertTrue(pdf_renderer.loaded())
+        # The default look plus one stylesheet per template, ready for the first download
+        self.assertEqual(len(pdf_styles._registry), 1 + len(template_registry.templates()))
+
+    @override_settings(WARMUP_ON_STARTUP=True)
+    def test_startup_warmup_never_raises(self):
+        real_run = warmup.run
+        warmup.run = lambda: 1 / 0
+        try:
+            with self.assertLogs('cv_app.warmup', 'WARNING'):
+                warmup.on_startup()
+        finally:
+            warmup.run = real_run
+
+
+class AuthCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('rosa', 'rosa@example.com', 'password')
+        self.client.force_login(self.user)
+        template = CVTemplate.objects.create(name='Modern Professional', description='')
+        self.cv = CV.objects.create(user=self.user, template=template, full_name='Rosa', title='Rosa CV')
+        refresh_snapshot(self.cv.id)
+        self.url = reverse('preview_cv', args=[self.cv.id])
+        auth_cache.clear()
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        tables = ('django_session', 'auth_user')
+        return response, [q['sql'] for q in queries if any(table in q['sql'] for table in tables)]
+
+    def assertLoggedOut(self, response):
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(settings.LOGIN_URL))
+
+    def test_hot_requests_read_neither_session_nor_user(self):
+        response, queries = self.auth_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        response, queries = self.auth_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(queries, [])
+
+    def test_logged_out_session_is_not_served_from_cache(self):
+        self.client.get(self.url)
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.client.get(reverse('logout'))
+        # Replaying the old cookie after logout
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        self.assertLoggedOut(self.client.get(self.url))
+
+    def test_password_change_logs_out_other_sessions(self):
+        self.client.get(self.url)
+        self.user.set_password('a new password')
+        self.user.save()
+        self.assertLoggedOut(self.client.get(self.url))
+
+    def test_other_processes_are_invalidated_through_the_shared_token(self):
+        self.client.get(self.url)
+        # Another process changed the password: the row and the shared token changed
+        User.objects.filter(pk=self.user.pk).update(password='changed elsewhere')
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        auth_cache.cache().set(auth_cache.TOKEN_KEY.format(self.user.pk), 'changed elsewhere', timeout=None)
+        self.assertLoggedOut(self.client.get(self.url))
+
+    @override_settings(SESSION_CACHE_ALIAS='default')
+    def test_per_process_session_cache_turns_the_user_cache_off(self):
+        self.assertFalse(auth_cache.shared())
+        self.assertEqual([error.id for error in auth_cache.check_session_cache(None)], ['cv_app.W001'])
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+        # Every request reads the user again
+        _, queries = self.auth_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertIn('auth_user', queries[0])
+
+    def test_sessions_are_not_written_to_the_project_shared_cache(self):
+        self.client.force_login(self.user)
+        location = Path(auth_cache.cache()._dir)
+        self.assertNotEqual(location, Path(settings.BASE_DIR) / 'shared_cache')
+        self.assertTrue(list(location.glob('*.djcache')))
+
+    def test_messages_are_kept_in_a_cookie(self):
+        response = self.client.get(reverse('delete_cv', args=[self.cv.id]))
+        self.assertIn('messages', response.cookies)
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'has been deleted successfully')
@@ -1,16 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the busiest pages are served by native async views
+hot_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('signup/', views.signup, name='signup'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', hot_views.dashboard, name='dashboard'),
+    path('dashboard/cards/', hot_views.dashboard_cards, name='dashboard_cards'),
     path('create-cv/', views.create_cv, name='create_cv'),
-    path('edit-cv/<int:cv_id>/', views.edit_cv, name='edit_cv'),
+    path('edit-cv/<int:cv_id>/', hot_views.edit_cv, name='edit_cv'),
+    path('cv-api/<int:cv_id>/', views.cv_api, name='cv_api'),
+    path('cv-api/<int:cv_id>/<str:section>/', views.cv_api_section, name='cv_api_section'),
+    path('cv-api/<int:cv_id>/<str:section>/order/', views.cv_api_order, name='cv_api_order'),
+    path('cv-api/<int:cv_id>/<str:section>/<int:entry_id>/', views.cv_api_entry, name='cv_api_entry'),
     path('delete-cv/<int:cv_id>/', views.delete_cv, name='delete_cv'), 
-    path('preview-cv/<int:cv_id>/', views.preview_cv, name='preview_cv'),  
+    path('preview-cv/<int:cv_id>/', hot_views.preview_cv, name='preview_cv'),  
     path('duplicate-cv/<int:cv_id>/', views.duplicate_cv, name='duplicate_cv'), 
-    path('download-cv-pdf/<int:cv_id>/', views.download_cv_pdf, name='download_cv_pdf'),
+    path('download-cv-pdf/<int:cv_id>/', hot_views.download_cv_pdf, name='download_cv_pdf'),
+    path('pdf-jobs/<str:job_id>/', views.pdf_job_status, name='pdf_job_status'),
+    path('pdf-jobs/<str:job_id>/result/', views.pdf_job_result, name='pdf_job_result'),
+    path('bulk-export/', views.bulk_export_cvs, name='bulk_export_cvs'),
+    path('search/', views.search_cvs, name='search_cvs'),
+    path('import/', views.import_cvs, name='import_cvs'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,17 +1,27 @@
+import io
+import json
+
 from django.shortcuts import render, redirect
 from django.contrib.auth.models import User
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import CV, Experience, Education, Skill, Project, Certification, Achievement, Reference, CVTemplate 
-from django.http import HttpResponse
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-import io
+from .models import CV, Experience, Education, Skill, Project, Certification, Achievement, Reference
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotFound, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import parse_etags
+from . import admission, autosave, fragment_cache, importing, instrumentation, listing, pdf_cache, pdf_export, pdf_jobs, search, template_registry
+from .cloning import clone_cv
+from .cv_data import SECTION_RELATIONS, cv_to_dict, cv_fingerprint, load_cv_aggregate
+from .file_responses import ranged_file_response
+from .pdf_renderer import render_cv_pdf, write_cv_pdf
+from .section_sync import sync_sections_from_post
+from .snapshots import build_snapshot, load_cv_snapshot, save_snapshot
 
 # Home page - public landing page
 def home(request):
@@ -58,22 +68,47 @@ def logout_view(request):
     logout(request)
     return redirect('home')
 
-# User dashboard - protected, requires login
+# User dashboard - protected, requires login. Shows the first page of cards; the rest
+# are loaded from dashboard_cards as the user scrolls (?sort=&title=&template=&updated_after=&updated_before=)
 @login_required
 def dashboard(request):
-    # Get all CVs for the current user, ordered by most recent
-    user_cvs = CV.objects.filter(user=request.user).order_by('-created_at')
-    
+    try:
+        query = listing.CardQuery(request.GET)
+    except listing.InvalidQuery as exc:
+        return HttpResponseBadRequest(str(exc))
+    recent = list(listing.summary(request.user))
+    cvs = list(query.page(request.user))
+    return render(request, 'cv_app/dashboard.html', dashboard_context(query, cvs, recent))
+
+# Dashboard cards - the next page of cards as an HTML fragment, for infinite scroll (?cursor=)
+@login_required
+def dashboard_cards(request):
+    try:
+        query = listing.CardQuery(request.GET)
+    except listing.InvalidQuery as exc:
+        return HttpResponseBadRequest(str(exc))
+    recent = list(listing.summary(request.user))
+    cvs = list(query.page(request.user))
+    return render(request, 'cv_app/dashboard_cards.html', dashboard_context(query, cvs, recent))
+
+def dashboard_context(query, cvs, recent):
+    # Card templates come from the template registry
+    user_cvs, next_cursor = query.split_page(cvs)
+    template_registry.attach(user_cvs)
+
     # Get CV statistics
-    total_cvs = user_cvs.count()
-    recent_cv = user_cvs.first()  # Most recent CV
+    recent_cv = recent[0] if recent else None  # Most recent CV
+    total_cvs = recent_cv.total_cvs if recent_cv else 0
     
-    context = {
+    return {
         'user_cvs': user_cvs,
         'total_cvs': total_cvs,
         'recent_cv': recent_cv,
+        'query': query,
+        'templates': template_registry.templates().values(),
+        'next_page_url': f"{reverse('dashboard')}?{query.params(cursor=next_cursor)}" if next_cursor else '',
+        'next_cards_url': f"{reverse('dashboard_cards')}?{query.params(cursor=next_cursor)}" if next_cursor else '',
     }
-    return render(request, 'cv_app/dashboard.html', context)
 
 # Delete CV - protected, requires login
 @login_required
@@ -82,6 +117,7 @@ def delete_cv(request, cv_id):
         cv = CV.objects.get(id=cv_id, user=request.user)
         cv_title = cv.title
         cv.delete()
+        pdf_cache.invalidate(cv_id)
         messages.success(request, f'CV "{cv_title}" has been deleted successfully.')
     except CV.DoesNotExist:
         messages.error(request, 'CV not found or you do not have permission to delete it.')
@@ -92,127 +128,40 @@ def delete_cv(request, cv_id):
 @login_required
 def preview_cv(request, cv_id):
     try:
-        cv = CV.objects.get(id=cv_id, user=request.user)
+        cv = load_cv_snapshot(cv_id, request.user)
     except CV.DoesNotExist:
         messages.error(request, 'CV not found.')
         return redirect('dashboard')
     
     # Get template from URL parameter or use CV's template
     template_id = request.GET.get('template')
-    if template_id:
-        try:
-            template = CVTemplate.objects.get(id=template_id)
-        except CVTemplate.DoesNotExist:
-            template = cv.template
-    else:
+    template = template_registry.get(template_id) if template_id else None
+    if template is None:
         template = cv.template
     
+    return render_preview(request, cv, template)
+
+def render_preview(request, cv, template):
+    # Section blocks are served from the fragment cache when unchanged
+    fragment_stats = fragment_cache.FragmentStats()
     context = {
         'cv': cv,
         'template': template,
+        'fragment_stats': fragment_stats,
     }
-    return render(request, 'cv_app/preview_cv.html', context)
+    response = render(request, 'cv_app/preview_cv.html', context)
+    if settings.FRAGMENT_CACHE_DEBUG_HEADER:
+        response['X-Fragment-Cache'] = fragment_stats.header()
+    return response
 @login_required
+@admission.rate_limited('duplicate_cv')
 def duplicate_cv(request, cv_id):
     try:
         original_cv = CV.objects.get(id=cv_id, user=request.user)
         
-        # Create new CV with "Copy" in title
+        # Create new CV with "Copy" in title, copying every section in bulk
         cv_count = CV.objects.filter(user=request.user).count() + 1
-        new_cv = CV.objects.create(
-            user=request.user,
-            title=f"{original_cv.title} (Copy #{cv_count})",
-            full_name=original_cv.full_name,
-            email=original_cv.email,
-            phone=original_cv.phone,
-            location=original_cv.location,
-            date_of_birth=original_cv.date_of_birth,
-            gender=original_cv.gender,
-            nationality=original_cv.nationality,
-            languages=original_cv.languages,
-            marital_status=original_cv.marital_status,
-            linkedin_url=original_cv.linkedin_url,
-            github_url=original_cv.github_url,
-            professional_summary=original_cv.professional_summary,
-            additional_info=original_cv.additional_info
-        )
-        
-        # Duplicate experiences
-        for experience in original_cv.experiences.all():
-            Experience.objects.create(
-                cv=new_cv,
-                job_title=experience.job_title,
-                company=experience.company,
-                start_date=experience.start_date,
-                end_date=experience.end_date,
-                description=experience.description,
-                achievements=experience.achievements
-            )
-        
-        # Duplicate education
-        for education in original_cv.educations.all():
-            Education.objects.create(
-                cv=new_cv,
-                institution=education.institution,
-                degree=education.degree,
-                field_of_study=education.field_of_study,
-                start_date=education.start_date,
-                end_date=education.end_date,
-                description=education.description
-            )
-        
-        # Duplicate skills
-        for skill in original_cv.skills.all():
-            Skill.objects.create(
-                cv=new_cv,
-                name=skill.name,
-                category=skill.category
-            )
-        
-        # Duplicate projects
-        for project in original_cv.projects.all():
-            Project.objects.create(
-                cv=new_cv,
-                name=project.name,
-                description=project.description,
-                technologies=project.technologies,
-                project_url=project.project_url,
-                start_date=project.start_date,
-                end_date=project.end_date
-            )
-        
-        # Duplicate certifications
-        for certification in original_cv.certifications.all():
-            Certification.objects.create(
-                cv=new_cv,
-                name=certification.name,
-                issuing_organization=certification.issuing_organization,
-                issue_date=certification.issue_date,
-                expiry_date=certification.expiry_date,
-                credential_url=certification.credential_url
-            )
-        
-        # Duplicate achievements
-        for achievement in original_cv.achievements.all():
-            Achievement.objects.create(
-                cv=new_cv,
-                title=achievement.title,
-                issuing_organization=achievement.issuing_organization,
-                date=achievement.date,
-                description=achievement.description
-            )
-        
-        # Duplicate references
-        for reference in original_cv.references.all():
-            Reference.objects.create(
-                cv=new_cv,
-                name=reference.name,
-                position=reference.position,
-                company=reference.company,
-                email=reference.email,
-                phone=reference.phone,
-                relationship=reference.relationship
-            )
+        new_cv = clone_cv(original_cv, request.user, title=f"{original_cv.title} (Copy #{cv_count})")
         
         messages.success(request, f'CV "{original_cv.title}" duplicated successfully!')
         return redirect('edit_cv', cv_id=new_cv.id)
@@ -230,490 +179,348 @@ def create_cv(request):
         title=f"{request.user.username}'s CV #{cv_count}",
         full_name=request.user.get_full_name() or request.user.username
     )
+    save_snapshot(cv, {relation: () for relation in SECTION_RELATIONS})
     messages.success(request, 'Creating new CV!')
     return redirect('edit_cv', cv_id=cv.id)
 
 @login_required
 def edit_cv(request, cv_id):
     try:
-        cv = CV.objects.get(id=cv_id, user=request.user)
+        aggregate = load_cv_aggregate(cv_id, request.user)
     except CV.DoesNotExist:
         return redirect('dashboard')
+    cv = aggregate.cv
     
     if request.method == 'POST':
-        print("Form submitted!")  # Debug line
-        
-        # Update CV basic information
-        cv.full_name = request.POST.get('full_name', '')
-        cv.email = request.POST.get('email', '')
-        cv.phone = request.POST.get('phone', '')
-        cv.location = request.POST.get('location', '')
-        
-        # Handle date field properly
-        date_of_birth = request.POST.get('date_of_birth')
-        cv.date_of_birth = date_of_birth if date_of_birth else None
-        
-        cv.gender = request.POST.get('gender', '')
-        cv.nationality = request.POST.get('nationality', '')
-        cv.languages = request.POST.get('languages', '')
-        cv.marital_status = request.POST.get('marital_status', '')
-        cv.linkedin_url = request.POST.get('linkedin', '')
-        cv.github_url = request.POST.get('portfolio', '')
-        cv.professional_summary = request.POST.get('professional_summary', '')
-        cv.additional_info = request.POST.get('additional_info', '')
-        
-        # Handle template selection
-        template_id = request.POST.get('cv_template')
-        if template_id:
-            try:
-                cv.template = CVTemplate.objects.get(id=template_id)
-            except CVTemplate.DoesNotExist:
-                pass  # Keep existing template if invalid
-        
-        cv.save()
-        
-        # Handle Work Experience
-        job_titles = request.POST.getlist('experience_job_title')
-        companies = request.POST.getlist('experience_company')
-        start_dates = request.POST.getlist('experience_start_date')
-        end_dates = request.POST.getlist('experience_end_date')
-        descriptions = request.POST.getlist('experience_description')
-        achievements = request.POST.getlist('experience_achievements')
-        
-        existing_experiences = list(cv.experiences.all())
-        
-        for i in range(len(job_titles)):
-            if job_titles[i] and companies[i]:
-                if i < len(existing_experiences):
-                    experience = existing_experiences[i]
-                    experience.job_title = job_titles[i]
-                    experience.company = companies[i]
-                    experience.start_date = start_dates[i]
-                    experience.end_date = end_dates[i]
-                    experience.description = descriptions[i]
-                    experience.achievements = achievements[i]
-                    experience.save()
-                else:
-                    Experience.objects.create(
-                        cv=cv,
-                        job_title=job_titles[i],
-                        company=companies[i],
-                        start_date=start_dates[i],
-                        end_date=end_dates[i],
-                        description=descriptions[i],
-                        achievements=achievements[i]
-                    )
-        
-        if len(job_titles) < len(existing_experiences):
-            for i in range(len(job_titles), len(existing_experiences)):
-                existing_experiences[i].delete()
-
-        # Handle Education
-        institutions = request.POST.getlist('education_institution')
-        degrees = request.POST.getlist('education_degree')
-        fields_of_study = request.POST.getlist('education_field_of_study')
-        education_start_dates = request.POST.getlist('education_start_date')
-        education_end_dates = request.POST.getlist('education_end_date')
-        education_descriptions = request.POST.getlist('education_description')
-        
-        existing_educations = list(cv.educations.all())
-        
-        for i in range(len(institutions)):
-            if institutions[i] and degrees[i]:
-                if i < len(existing_educations):
-                    education = existing_educations[i]
-                    education.institution = institutions[i]
-                    education.degree = degrees[i]
-                    education.field_of_study = fields_of_study[i]
-                    education.start_date = education_start_dates[i]
-                    education.end_date = education_end_dates[i]
-                    education.description = education_descriptions[i]
-                    education.save()
-                else:
-                    Education.objects.create(
-                        cv=cv,
-                        institution=institutions[i],
-                        degree=degrees[i],
-                        field_of_study=fields_of_study[i],
-                        start_date=education_start_dates[i],
-                        end_date=education_end_dates[i],
-                        description=education_descriptions[i]
-                    )
-        
-        if len(institutions) < len(existing_educations):
-            for i in range(len(institutions), len(existing_educations)):
-                existing_educations[i].delete()
-
-        # Handle Skills
-        skill_names = request.POST.getlist('skill_name')
-        skill_categories = request.POST.getlist('skill_category')
-        
-        existing_skills = list(cv.skills.all())
-        
-        for i in range(len(skill_names)):
-            if skill_names[i] and skill_categories[i]:
-                if i < len(existing_skills):
-                    # Update existing skill
-                    skill = existing_skills[i]
-                    skill.name = skill_names[i]
-                    skill.category = skill_categories[i]
-                    skill.save()
-                else:
-                    # Create new skill
-                    Skill.objects.create(
-                        cv=cv,
-                        name=skill_names[i],
-                        category=skill_categories[i]
-                    )
-        
-        # Delete any extra skills that are no longer needed
-        if len(skill_names) < len(existing_skills):
-            for i in range(len(skill_names), len(existing_skills)):
-                existing_skills[i].delete()
-
-        # Handle Projects
-        project_names = request.POST.getlist('project_name')
-        project_technologies = request.POST.getlist('project_technologies')
-        project_urls = request.POST.getlist('project_url')
-        project_start_dates = request.POST.getlist('project_start_date')
-        project_end_dates = request.POST.getlist('project_end_date')
-        project_descriptions = request.POST.getlist('project_description')
-        
-        existing_projects = list(cv.projects.all())
-        
-        for i in range(len(project_names)):
-            if project_names[i]:  # Only create if project name exists
-                if i < len(existing_projects):
-                    # Update existing project
-                    project = existing_projects[i]
-                    project.name = project_names[i]
-                    project.technologies = project_technologies[i]
-                    project.project_url = project_urls[i]
-                    project.start_date = project_start_dates[i]
-                    project.end_date = project_end_dates[i]
-                    project.description = project_descriptions[i]
-                    project.save()
-                else:
-                    # Create new project
-                    Project.objects.create(
-                        cv=cv,
-                        name=project_names[i],
-                        technologies=project_technologies[i],
-                        project_url=project_urls[i],
-                        start_date=project_start_dates[i],
-                        end_date=project_end_dates[i],
-                        description=project_descriptions[i]
-                    )
-        
-        # Delete any extra projects that are no longer needed
-        if len(project_names) < len(existing_projects):
-            for i in range(len(project_names), len(existing_projects)):
-                existing_projects[i].delete()
-
-        # Handle Certifications
-        certification_names = request.POST.getlist('certification_name')
-        certification_organizations = request.POST.getlist('certification_organization')
-        certification_issue_dates = request.POST.getlist('certification_issue_date')
-        certification_expiry_dates = request.POST.getlist('certification_expiry_date')
-        certification_urls = request.POST.getlist('certification_url')
-        
-        existing_certifications = list(cv.certifications.all())
-        
-        for i in range(len(certification_names)):
-            if certification_names[i] and certification_organizations[i]:
-                if i < len(existing_certifications):
-                    # Update existing certification
-                    certification = existing_certifications[i]
-                    certification.name = certification_names[i]
-                    certification.issuing_organization = certification_organizations[i]
-                    certification.issue_date = certification_issue_dates[i]
-                    certification.expiry_date = certification_expiry_dates[i]
-                    certification.credential_url = certification_urls[i]
-                    certification.save()
-                else:
-                    # Create new certification
-                    Certification.objects.create(
-                        cv=cv,
-                        name=certification_names[i],
-                        issuing_organization=certification_organizations[i],
-                        issue_date=certification_issue_dates[i],
-                        expiry_date=certification_expiry_dates[i],
-                        credential_url=certification_urls[i]
-                    )
-        
-        # Delete any extra certifications that are no longer needed
-        if len(certification_names) < len(existing_certifications):
-            for i in range(len(certification_names), len(existing_certifications)):
-                existing_certifications[i].delete()
-
-        # Handle Achievements
-        achievement_titles = request.POST.getlist('achievement_title')
-        achievement_organizations = request.POST.getlist('achievement_organization')
-        achievement_dates = request.POST.getlist('achievement_date')
-        achievement_descriptions = request.POST.getlist('achievement_description')
-        
-        existing_achievements = list(cv.achievements.all())
-        
-        for i in range(len(achievement_titles)):
-            if achievement_titles[i]:  # Only create if title exists
-                if i < len(existing_achievements):
-                    # Update existing achievement
-                    achievement = existing_achievements[i]
-                    achievement.title = achievement_titles[i]
-                    achievement.issuing_organization = achievement_organizations[i]
-                    achievement.date = achievement_dates[i]
-                    achievement.description = achievement_descriptions[i]
-                    achievement.save()
-                else:
-                    # Create new achievement
-                    Achievement.objects.create(
-                        cv=cv,
-                        title=achievement_titles[i],
-                        issuing_organization=achievement_organizations[i],
-                        date=achievement_dates[i],
-                        description=achievement_descriptions[i]
-                    )
-        
-        # Delete any extra achievements that are no longer needed
-        if len(achievement_titles) < len(existing_achievements):
-            for i in range(len(achievement_titles), len(existing_achievements)):
-                existing_achievements[i].delete()
-
-        # Handle References
-        reference_names = request.POST.getlist('reference_name')
-        reference_positions = request.POST.getlist('reference_position')
-        reference_companies = request.POST.getlist('reference_company')
-        reference_emails = request.POST.getlist('reference_email')
-        reference_phones = request.POST.getlist('reference_phone')
-        reference_relationships = request.POST.getlist('reference_relationship')
-        
-        existing_references = list(cv.references.all())
-        
-        for i in range(len(reference_names)):
-            if reference_names[i]:  # Only create if name exists
-                if i < len(existing_references):
-                    # Update existing reference
-                    reference = existing_references[i]
-                    reference.name = reference_names[i]
-                    reference.position = reference_positions[i]
-                    reference.company = reference_companies[i]
-                    reference.email = reference_emails[i]
-                    reference.phone = reference_phones[i]
-                    reference.relationship = reference_relationships[i]
-                    reference.save()
-                else:
-                    # Create new reference
-                    Reference.objects.create(
-                        cv=cv,
-                        name=reference_names[i],
-                        position=reference_positions[i],
-                        company=reference_companies[i],
-                        email=reference_emails[i],
-                        phone=reference_phones[i],
-                        relationship=reference_relationships[i]
-                    )
-        
-        # Delete any extra references that are no longer needed
-        if len(reference_names) < len(existing_references):
-            for i in range(len(reference_names), len(existing_references)):
-                existing_references[i].delete()
-        
-        print("CV with all sections and template saved successfully!")
+        try:
+            save_cv_from_post(cv, request.POST)
+        except autosave.Conflict:
+            messages.error(request, EDIT_CONFLICT_MESSAGE)
+            return redirect('edit_cv', cv_id=cv.id)
         messages.success(request, 'CV updated successfully!')
         return redirect('edit_cv', cv_id=cv.id)
     
     # For GET requests, pre-fill the form with existing data
     context = {
-        'cv': cv,
+        'cv': aggregate,
+        'autosave_fields': autosave.form_fields(),
     }
     return render(request, 'cv_app/edit_cv.html', context)
+
+EDIT_CONFLICT_MESSAGE = 'This CV was changed elsewhere after the page was opened, so your changes were not saved.'
+
+# Apply a submitted edit form to a CV (shared by the sync and async edit views).
+# The form posts the CV version it was rendered at; raises autosave.Conflict if the CV
+# has been saved since (by autosave or another tab), without writing anything.
+def save_cv_from_post(cv, post):
+    # Update CV basic information
+    cv.full_name = post.get('full_name', '')
+    cv.email = post.get('email', '')
+    cv.phone = post.get('phone', '')
+    cv.location = post.get('location', '')
+    
+    # Handle date field properly
+    date_of_birth = post.get('date_of_birth')
+    cv.date_of_birth = date_of_birth if date_of_birth else None
+    
+    cv.gender = post.get('gender', '')
+    cv.nationality = post.get('nationality', '')
+    cv.languages = post.get('languages', '')
+    cv.marital_status = post.get('marital_status', '')
+    cv.linkedin_url = post.get('linkedin', '')
+    cv.github_url = post.get('portfolio', '')
+    cv.professional_summary = post.get('professional_summary', '')
+    cv.additional_info = post.get('additional_info', '')
+    
+    # Handle template selection
+    template_id = post.get('cv_template')
+    template = template_registry.get(template_id) if template_id else None
+    if template is not None:
+        cv.template = template  # Keep existing template if invalid
+    
+    # Save basic info and all sections together, writing only what changed,
+    # and refresh the CV's snapshot in the same transaction
+    with transaction.atomic():
+        # Lock the row, so no other save can slip in between this check and the write
+        current = CV.objects.select_for_update().filter(pk=cv.pk).values_list('version', flat=True).get()
+        try:
+            version = int(post['version'])
+        except (KeyError, ValueError):
+            version = cv.version
+        if current != version or current != cv.version:
+            raise autosave.Conflict(current)
+
+        # Sections as stored now, not as prefetched before the transaction
+        cv._prefetched_objects_cache = {}
+        prefetch_related_objects([cv], *SECTION_RELATIONS)
+        sections = sync_sections_from_post(cv, post)
+        cv.snapshot = build_snapshot(cv, sections)
+        # Autosave edits based on the previous version now get a conflict
+        cv.version = current + 1
+        cv.save()
+        search.index_snapshots([cv.snapshot])
+        
+        # Any cached PDF of this CV is now out of date
+        transaction.on_commit(lambda: pdf_cache.invalidate(cv.id))
+
+# CV autosave API - JSON edits of one part of a CV, each naming the CV "version" it is based on.
+# Responses carry the new version; 409 means the CV was saved elsewhere since.
+def autosave_response(request, edit, status=200):
+    try:
+        body = json.loads(request.body or b'{}')
+        version = int(body['version'])
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'Send a JSON object with the "version" of the CV the edit is based on.'}, status=400)
+    try:
+        cv, result = edit(version, body)
+    except autosave.Conflict as exc:
+        return JsonResponse({'error': 'This CV was changed elsewhere. Reload it to continue.', 'version': exc.version}, status=409)
+    except autosave.EditError as exc:
+        return JsonResponse({'errors': exc.errors}, status=400)
+    except ObjectDoesNotExist:
+        return JsonResponse({'error': 'Not found.'}, status=404)
+    return JsonResponse({'version': cv.version, **result}, status=status)
+
+def method_not_allowed(*methods):
+    response = JsonResponse({'error': f'Use {" or ".join(methods)}.'}, status=405)
+    response['Allow'] = ', '.join(methods)
+    return response
+
+# PATCH {"version", "fields": {...}} - change basic info (and "template")
+@login_required
+def cv_api(request, cv_id):
+    if request.method != 'PATCH':
+        return method_not_allowed('PATCH')
+    return autosave_response(request, lambda version, body: autosave.update_cv(
+        cv_id, request.user, version, body.get('fields')))
+
+# POST {"version", "fields": {...}} - add an entry to a section
+@login_required
+def cv_api_section(request, cv_id, section):
+    if section not in SECTION_RELATIONS:
+        return JsonResponse({'error': 'Not found.'}, status=404)
+    if request.method != 'POST':
+        return method_not_allowed('POST')
+    return autosave_response(request, lambda version, body: autosave.add_entry(
+        cv_id, request.user, version, section, body.get('fields')), status=201)
+
+# PATCH {"version", "fields": {...}} - change an entry; DELETE {"version"} - remove it
+@login_required
+def cv_api_entry(request, cv_id, section, entry_id):
+    if section not in SECTION_RELATIONS:
+        return JsonResponse({'error': 'Not found.'}, status=404)
+    if request.method == 'PATCH':
+        return autosave_response(request, lambda version, body: autosave.update_entry(
+            cv_id, request.user, version, section, entry_id, body.get('fields')))
+    if request.method == 'DELETE':
+        return autosave_response(request, lambda version, body: autosave.delete_entry(
+            cv_id, request.user, version, section, entry_id))
+    return method_not_allowed('PATCH', 'DELETE')
+
+# POST {"version", "order": [entry ids]} - reorder a section
+@login_required
+def cv_api_order(request, cv_id, section):
+    if section not in SECTION_RELATIONS:
+        return JsonResponse({'error': 'Not found.'}, status=404)
+    if request.method != 'POST':
+        return method_not_allowed('POST')
+    return autosave_response(request, lambda version, body: autosave.reorder_entries(
+        cv_id, request.user, version, section, body.get('order')))
+
+def pdf_file_response(request, path, filename, etag, asynchronous=False):
+    response = ranged_file_response(request, path, 'application/pdf', filename, etag, asynchronous=asynchronous)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+# The cached PDF of this content as a response, or None when it is not cached. An entry
+# evicted or invalidated between the lookup and opening it counts as not cached.
+def cached_pdf_response(request, cv_id, fingerprint, filename, etag, asynchronous=False):
+    path = pdf_cache.get(cv_id, fingerprint)
+    if path is None:
+        return None
+    try:
+        return pdf_file_response(request, path, filename, etag, asynchronous=asynchronous)
+    except FileNotFoundError:
+        return None
+
+# A freshly rendered PDF that left the cache before it could be served (larger than the
+# whole cache, or its CV was edited meanwhile), sent from memory
+def pdf_bytes_response(pdf_bytes, filename, etag):
+    response = HttpResponse(pdf_bytes, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 @login_required
+@admission.rate_limited('download_cv_pdf')
 def download_cv_pdf(request, cv_id):
     try:
-        cv = CV.objects.get(id=cv_id, user=request.user)
+        cv = load_cv_snapshot(cv_id, request.user)
     except CV.DoesNotExist:
         messages.error(request, 'CV not found.')
         return redirect('dashboard')
     
-    # Create a file-like buffer to receive PDF data
-    buffer = io.BytesIO()
-    
-    # Create the PDF object, using the buffer as its "file"
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=72
-    )
-    
-    # Container for the 'Flowable' ob
-    # jects
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=12,
-        textColor=colors.HexColor('#2c3e50')
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=12,
-        spaceAfter=6,
-        textColor=colors.HexColor('#3498db')
-    )
-    
-    normal_style = styles['Normal']
-    
-    # Header Section
-    elements.append(Paragraph(cv.full_name or "Your Name", title_style))
-    
-    # Contact Information
-    contact_info = []
-    if cv.email:
-        contact_info.append(cv.email)
-    if cv.phone:
-        contact_info.append(cv.phone)
-    if cv.location:
-        contact_info.append(cv.location)
-    
-    if contact_info:
-        elements.append(Paragraph(" • ".join(contact_info), normal_style))
-    
-    # Links
-    links = []
-    if cv.linkedin_url:
-        links.append("LinkedIn")
-    if cv.github_url:
-        links.append("GitHub")
-    
-    if links:
-        elements.append(Paragraph(" • ".join(links), normal_style))
-    
-    elements.append(Spacer(1, 0.2 * inch))
-    
-    # Professional Summary
-    if cv.professional_summary:
-        elements.append(Paragraph("PROFESSIONAL SUMMARY", heading_style))
-        elements.append(Paragraph(cv.professional_summary, normal_style))
-        elements.append(Spacer(1, 0.2 * inch))
-    
-    # Work Experience
-    if cv.experiences.all():
-        elements.append(Paragraph("WORK EXPERIENCE", heading_style))
-        for exp in cv.experiences.all():
-            # Job title and company
-            exp_title = f"<b>{exp.job_title}</b> - {exp.company}"
-            elements.append(Paragraph(exp_title, normal_style))
-            
-            # Dates
-            date_range = f"{exp.start_date} - {exp.end_date or 'Present'}"
-            elements.append(Paragraph(date_range, normal_style))
-            
-            # Description
-            if exp.description:
-                elements.append(Paragraph(exp.description, normal_style))
-            
-            # Achievements
-            if exp.achievements:
-                elements.append(Paragraph(f"<b>Achievements:</b> {exp.achievements}", normal_style))
-            
-            elements.append(Spacer(1, 0.1 * inch))
-        elements.append(Spacer(1, 0.2 * inch))
-    
-    # Education
-    if cv.educations.all():
-        elements.append(Paragraph("EDUCATION", heading_style))
-        for edu in cv.educations.all():
-            edu_title = f"<b>{edu.degree}</b> - {edu.institution}"
-            elements.append(Paragraph(edu_title, normal_style))
-            
-            if edu.field_of_study:
-                elements.append(Paragraph(f"Field of Study: {edu.field_of_study}", normal_style))
-            
-            date_range = f"{edu.start_date} - {edu.end_date}"
-            elements.append(Paragraph(date_range, normal_style))
-            
-            if edu.description:
-                elements.append(Paragraph(edu.description, normal_style))
-            
-            elements.append(Spacer(1, 0.1 * inch))
-        elements.append(Spacer(1, 0.2 * inch))
-    
-    # Skills
-    if cv.skills.all():
-        elements.append(Paragraph("SKILLS", heading_style))
-        
-        # Group skills by category
-        skills_by_category = {}
-        for skill in cv.skills.all():
-            if skill.category not in skills_by_category:
-                skills_by_category[skill.category] = []
-            skills_by_category[skill.category].append(skill.name)
-        
-        for category, skill_list in skills_by_category.items():
-            category_name = category.replace('_', ' ').title()
-            skills_text = f"<b>{category_name}:</b> {', '.join(skill_list)}"
-            elements.append(Paragraph(skills_text, normal_style))
-        
-        elements.append(Spacer(1, 0.2 * inch))
-    
-    # Projects
-    if cv.projects.all():
-        elements.append(Paragraph("PROJECTS", heading_style))
-        for project in cv.projects.all():
-            elements.append(Paragraph(f"<b>{project.name}</b>", normal_style))
-            
-            if project.technologies:
-                elements.append(Paragraph(f"Technologies: {project.technologies}", normal_style))
-            
-            if project.description:
-                elements.append(Paragraph(project.description, normal_style))
-            
-            elements.append(Spacer(1, 0.1 * inch))
-        elements.append(Spacer(1, 0.2 * inch))
-    
-    # Certifications
-    if cv.certifications.all():
-        elements.append(Paragraph("CERTIFICATIONS", heading_style))
-        for cert in cv.certifications.all():
-            cert_text = f"<b>{cert.name}</b> - {cert.issuing_organization}"
-            if cert.issue_date:
-                cert_text += f" ({cert.issue_date})"
-            elements.append(Paragraph(cert_text, normal_style))
-        elements.append(Spacer(1, 0.2 * inch))
+    # Fingerprint everything that goes into the PDF
+    data = cv_to_dict(cv)
+    fingerprint = cv_fingerprint(data)
+    etag = f'"{fingerprint}"'
+    filename = f'{cv.title.replace(" ", "_")}.pdf'
+    
+    # The browser already has this exact PDF
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    
+    # Only render when there is no cached copy of this content
+    response = cached_pdf_response(request, cv.id, fingerprint, filename, etag)
+    if response is not None:
+        return response
+    
+    # Asynchronous mode: queue the render and let the client poll for it
+    wants_async = request.GET.get('async', '1' if settings.PDF_RENDER_ASYNC else '0') == '1'
+    if wants_async and pdf_jobs.async_enabled():
+        try:
+            job = pdf_jobs.submit(request.user.id, cv.id, fingerprint, filename, data)
+        except pdf_jobs.QueueFull:
+            return pdf_queue_full_response()
+        return pdf_job_response(job, status=202)
     
-    # Achievements
-    if cv.achievements.all():
-        elements.append(Paragraph("ACHIEVEMENTS", heading_style))
-        for achievement in cv.achievements.all():
-            achievement_text = f"<b>{achievement.title}</b>"
-            if achievement.issuing_organization:
-                achievement_text += f" - {achievement.issuing_organization}"
-            if achievement.date:
-                achievement_text += f" ({achievement.date})"
-            elements.append(Paragraph(achievement_text, normal_style))
-            
-            if achievement.description:
-                elements.append(Paragraph(achievement.description, normal_style))
-            
-            elements.append(Spacer(1, 0.1 * inch))
+    # Synchronous mode: render in the request, straight into the cache file
+    try:
+        with admission.pdf_build_slot(), instrumentation.pdf_timer(), \
+                pdf_cache.writing(cv.id, fingerprint) as output:
+            write_cv_pdf(data, output)
+    except admission.Overloaded as exc:
+        return pdf_queue_full_response(exc.retry_after)
+    response = cached_pdf_response(request, cv.id, fingerprint, filename, etag)
+    if response is None:
+        response = pdf_bytes_response(render_cv_pdf(data), filename, etag)
+    return response
+
+def pdf_queue_full_response(retry_after=5):
+    return admission.too_many_requests(retry_after, 'Too many PDFs are being generated, please try again shortly.')
+
+def pdf_job_response(job, status=200):
+    payload = job.as_dict()
+    payload['status_url'] = reverse('pdf_job_status', args=[job.id])
+    payload['result_url'] = reverse('pdf_job_result', args=[job.id])
+    return JsonResponse(payload, status=status)
+
+# PDF job status - poll until the status is "done" or "failed"
+@login_required
+def pdf_job_status(request, job_id):
+    job = pdf_jobs.get_job(job_id, request.user.id)
+    if job is None:
+        return JsonResponse({'error': 'Job not found.'}, status=404)
+    return pdf_job_response(job)
+
+# PDF job result - the rendered file once the job is done
+@login_required
+def pdf_job_result(request, job_id):
+    job = pdf_jobs.get_job(job_id, request.user.id)
+    if job is None:
+        return JsonResponse({'error': 'Job not found.'}, status=404)
+    if job.status == pdf_jobs.PENDING:
+        return pdf_job_response(job, status=202)
+    if job.status == pdf_jobs.FAILED:
+        return pdf_job_response(job, status=500)
+    
+    response = cached_pdf_response(request, job.cv_id, job.fingerprint, job.filename, f'"{job.fingerprint}"')
+    if response is None:
+        return JsonResponse({'error': 'The PDF has expired, please download it again.'}, status=410)
+    return response
+
+# Bulk export - staff only, streams a ZIP of PDFs for ?user=<username>, ?ids=1,2,3 or ?all=1
+@staff_member_required
+def bulk_export_cvs(request):
+    username = request.GET.get('user')
+    ids = [int(cv_id) for cv_id in request.GET.get('ids', '').split(',') if cv_id.strip().isdigit()]
     
-    # Build PDF
-    doc.build(elements)
+    if not (username or ids or request.GET.get('all') == '1'):
+        return HttpResponseBadRequest('Choose the CVs to export with ?user=, ?ids= or ?all=1')
     
-    # File response
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{cv.title.replace(" ", "_")}.pdf"'
+    owner = None
+    if username:
+        try:
+            owner = User.objects.get(username=username)
+        except User.DoesNotExist:
+            return HttpResponseBadRequest(f'Unknown user "{username}"')
     
+    cvs = pdf_export.select_cvs(user=owner, ids=ids)
+    response = StreamingHttpResponse(pdf_export.stream_zip(cvs), content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="cv_export.zip"'
     return response
+
+# CV search - staff only, ranked full-text search over every CV: ?q=<words>&page=&per_page=
+@staff_member_required
+def search_cvs(request):
+    if not search.enabled():
+        return JsonResponse({'error': 'Search needs the SQLite FTS5 index'}, status=501)
+    
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+        per_page = min(100, max(1, int(request.GET.get('per_page', 20))))
+    except ValueError:
+        return HttpResponseBadRequest('page and per_page must be numbers')
+    
+    total, results = search.search(query, page=page, per_page=per_page)
+    return JsonResponse({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'results': results,
+    })
+
+# Import CVs - POST a JSON Resume (.json, .jsonl) or CSV file as "file"; returns a JSON report.
+# Staff uploads may assign CVs to other users through the username column; ?skip=<consumed> resumes
+@login_required
+@admission.rate_limited('import_cvs')
+def import_cvs(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST a JSON Resume or CSV file in the "file" field.'}, status=405)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'No file uploaded.'}, status=400)
+    if upload.size > importing.max_upload_bytes():
+        return JsonResponse({
+            'error': f'The file is larger than {importing.max_upload_bytes()} bytes: split it into smaller files.',
+        }, status=413)
+    fmt = request.POST.get('format') or importing.detect_format(upload.name)
+    if fmt not in importing.FORMATS:
+        return JsonResponse({'error': 'Upload a .json, .jsonl or .csv file, or pass format=json|csv.'}, status=400)
+    try:
+        skip = max(0, int(request.POST.get('skip', 0)))
+    except ValueError:
+        return JsonResponse({'error': 'skip must be a number.'}, status=400)
+
+    report = {'consumed': skip, 'imported': 0, 'rejected': 0, 'errors': []}
+    # Read the upload as a text stream, never as one string
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        for result in importing.import_records(
+                stream, fmt, owner=request.user, allow_usernames=request.user.is_staff,
+                template_id=importing.default_template_id(), skip=skip,
+                max_records=importing.max_upload_records()):
+            report['consumed'] = result.consumed
+            report['imported'] += result.imported
+            report['rejected'] += len(result.errors)
+            for number, name, errors in result.errors[:importing.MAX_REPORTED_ERRORS - len(report['errors'])]:
+                report['errors'].append({'record': number, 'full_name': name, 'errors': errors})
+    except importing.TooManyRecords as exc:
+        report['skipped'] = {'first': exc.first, 'last': exc.last}
+        report['error'] = f'{exc} Upload the file again with skip={report["consumed"]} to import them.'
+        return JsonResponse(report, status=413)
+    except ValueError as exc:
+        report['error'] = f'{exc} Fix the file and upload it again with skip={report["consumed"]}.'
+        return JsonResponse(report, status=400)
+    return JsonResponse(report)
+
+# Metrics - Prometheus text format, only served to the addresses in PERF_METRICS_ALLOWED_IPS
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.PERF_METRICS_ALLOWED_IPS:
+        return HttpResponseNotFound()
+    return HttpResponse(instrumentation.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,76 @@
+"""
+Warming up a worker before it takes traffic.
+
+Left alone, a fresh worker compiles each Django template, loads the CV
+template registry and imports ReportLab during its first requests. run() does
+all of that up front. cv_builder/wsgi.py and asgi.py call on_startup(), which
+runs it when WARMUP_ON_STARTUP is on; `manage.py warmup` runs it and reports
+how long each step took.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+
+from . import pdf_renderer, template_registry
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    """Names of the project's own templates (not Django's or third-party apps')."""
+    base_dir = os.path.realpath(settings.BASE_DIR)
+    names = set()
+    for loader in engine.engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            for directory in inner.get_dirs():
+                directory = os.path.realpath(directory)
+                if not directory.startswith(base_dir + os.sep):
+                    continue
+                for root, _, files in os.walk(directory):
+                    names.update(os.path.relpath(os.path.join(root, name), directory) for name in files)
+    return sorted(names)
+
+
+def compile_templates():
+    """Compile every project template into the cached loader; returns how many."""
+    count = 0
+    for engine in engines.all():
+        if isinstance(engine, DjangoTemplates):
+            for name in template_names(engine):
+                engine.get_template(name)
+                count += 1
+    return count
+
+
+def run():
+    """Warm this process; returns (step, detail, seconds) for each step."""
+    steps = []
+    for step, warm, unit in [
+        ('templates', compile_templates, 'compiled'),
+        ('template registry', lambda: len(template_registry.templates()), 'CV templates loaded'),
+        ('pdf renderer', pdf_renderer.warm, 'stylesheets compiled'),
+    ]:
+        start = time.perf_counter()
+        count = warm()
+        steps.append((step, f'{count} {unit}', time.perf_counter() - start))
+    # Do not hand a connection opened here to processes forked from this one
+    connections.close_all()
+    return steps
+
+
+def on_startup():
+    """Warm up when WARMUP_ON_STARTUP is on; a failure is logged, never raised."""
+    if not getattr(settings, 'WARMUP_ON_STARTUP', False):
+        return
+    try:
+        steps = run()
+    except Exception:
+        logger.warning('Warmup failed, the first requests will be slower', exc_info=True)
+        connections.close_all()
+        return
+    logger.info('Warmed up: %s', ', '.join(f'{step} {detail} ({seconds * 1000:.0f} ms)' for step, detail, seconds in steps))
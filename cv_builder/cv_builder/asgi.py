@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cv_builder.settings')
+# Serve the busiest views natively async (see ASYNC_VIEWS in settings)
+os.environ.setdefault('CV_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+# Compile templates and load ReportLab now rather than during the first requests
+from cv_app import warmup  # noqa: E402
+
+warmup.on_startup()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,28 +42,37 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'cv_app.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cv_app.auth_cache.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'cv_builder.urls'
 
+# Templates are compiled once per process by the cached loader, in development too
+# (runserver's autoreloader resets it when a template changes); see also WARMUP_ON_STARTUP
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'cv_app.instrumentation.TimedDjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -73,14 +83,53 @@ WSGI_APPLICATION = 'cv_builder.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite is tuned for concurrent use: WAL lets readers run alongside a writer,
+# IMMEDIATE transactions take the write lock up front (instead of failing with
+# "database is locked" when a read transaction tries to upgrade), and writers
+# wait up to `timeout` seconds for each other. Connections are kept open
+# between requests so the pragmas and page cache are not rebuilt every time.
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
     }
 }
 
 
+# Caches
+# 'default' is local to each process, for data that is only ever derived from the database.
+# 'shared' is read by every worker process; state that one worker must be able to revoke in
+# the others (sessions, invalidation tokens) lives there. Any backend that is shared between
+# processes works (file-based, database, memcached, Redis), never the local-memory one.
+# CV_SHARED_CACHE_DIR moves the file-based one; the test runner points it at a temporary directory.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CV_SHARED_CACHE_DIR', BASE_DIR / 'shared_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+TEST_RUNNER = 'cv_app.test_runner.TestRunner'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -121,3 +170,121 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Rendered PDF cache
+# Downloads are served from here when the CV has not changed since the last render
+
+PDF_CACHE_DIR = BASE_DIR / 'pdf_cache'
+
+PDF_CACHE_MAX_BYTES = 100 * 1024 * 1024
+
+# CV parts (header, summary, each section) whose built flowables are kept per process
+PDF_FLOWABLE_CACHE_SIZE = 2000
+
+# Background PDF rendering
+# With PDF_RENDER_ASYNC on, downloads are queued on a process pool and return a job id
+# (?async=1 / ?async=0 overrides per request). PDF_WORKERS = 0 disables the pool.
+# Job state is kept in PDF_JOB_CACHE_ALIAS, which every web process must share, so that any
+# of them can answer a job's status and result polls.
+
+PDF_RENDER_ASYNC = False
+
+PDF_WORKERS = 2
+
+PDF_JOB_QUEUE_SIZE = 20
+
+PDF_JOB_TIMEOUT = 30
+
+PDF_JOB_CACHE_ALIAS = 'shared'
+
+# Admission control
+# Per user and endpoint token buckets: a burst of requests, then `rate` requests per second.
+# In-request PDF builds share PDF_BUILD_CONCURRENCY slots; up to PDF_BUILD_QUEUE_SIZE requests
+# wait PDF_BUILD_QUEUE_TIMEOUT seconds for one. Rejected requests get a 429 with Retry-After.
+# ADMISSION_SHARED_PATH (a local SQLite file) shares the limits between worker processes.
+
+ADMISSION_RATE_LIMITS = {
+    'download_cv_pdf': {'burst': 20, 'rate': 1.0},
+    'duplicate_cv': {'burst': 5, 'rate': 0.2},
+    'import_cvs': {'burst': 3, 'rate': 0.05},
+}
+
+PDF_BUILD_CONCURRENCY = 2
+
+PDF_BUILD_QUEUE_SIZE = 4
+
+PDF_BUILD_QUEUE_TIMEOUT = 2.0
+
+ADMISSION_SHARED_PATH = None
+
+# Bulk import
+# The import endpoint rejects uploads larger than IMPORT_MAX_UPLOAD_BYTES before reading them,
+# and imports at most IMPORT_MAX_RECORDS records per upload; the response lists the records it
+# skipped, which can be sent again with skip=. The import_cvs command has no limits.
+
+IMPORT_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+IMPORT_MAX_RECORDS = 1000
+
+# Async views
+# Serve dashboard, preview, edit and PDF download from cv_app.async_views.
+# cv_builder/asgi.py turns this on; WSGI deployments keep the sync views.
+
+ASYNC_VIEWS = os.environ.get('CV_ASYNC_VIEWS', '0') == '1'
+
+# Sessions and authentication
+# Sessions are read from the cache and written through to the database, and request.user is
+# served from a per-process cache (cv_app.auth_cache), so logged-in requests usually cost no
+# queries for either. Flash messages travel in a signed cookie rather than the session.
+# Logouts and password changes reach other processes through SESSION_CACHE_ALIAS, which must
+# be shared between them; with a per-process cache the user cache stays off and a warning
+# (cv_app.W001) is raised.
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+SESSION_CACHE_ALIAS = 'shared'
+
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Seconds a process may reuse a user it has loaded; 0 turns the user cache off
+AUTH_USER_CACHE_TIMEOUT = 60
+
+AUTH_USER_CACHE_SIZE = 1000
+
+# Worker warmup
+# cv_builder/wsgi.py and asgi.py compile the templates, load the CV template registry and
+# import ReportLab before the worker takes traffic (cv_app.warmup). Nothing else imports
+# ReportLab until a PDF is rendered, so management commands and tests start faster.
+
+WARMUP_ON_STARTUP = os.environ.get('CV_WARMUP', '1') == '1'
+
+# Dashboard
+# Cards rendered on the first paint and per infinite-scroll page, however many CVs a user has
+
+DASHBOARD_PAGE_SIZE = 24
+
+# Preview fragment cache
+# Section blocks of the CV preview are cached in this cache alias (any backend works);
+# the debug header reports which fragments hit and missed
+
+FRAGMENT_CACHE_ALIAS = 'default'
+
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+FRAGMENT_CACHE_DEBUG_HEADER = DEBUG
+
+# CV template registry
+# Every process keeps all CV templates in memory. Saving or deleting one bumps a version
+# key in this cache alias, which other processes check every TEMPLATE_REGISTRY_CHECK_INTERVAL
+# seconds, so it must be shared between them (cv_app.W002 warns otherwise).
+
+TEMPLATE_REGISTRY_CACHE_ALIAS = 'shared'
+
+TEMPLATE_REGISTRY_CHECK_INTERVAL = 1.0
+
+# Performance instrumentation
+# Fraction of requests that get timed (Server-Timing header + /metrics/ histograms)
+
+PERF_SAMPLE_RATE = 1.0
+
+PERF_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
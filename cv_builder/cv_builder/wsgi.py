@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cv_builder.settings')
 
 application = get_wsgi_application()
+
+# Compile templates and load ReportLab now rather than during the first requests
+from cv_app import warmup  # noqa: E402
+
+warmup.on_startup()